@@ -12,6 +12,7 @@
 import pstats
 import sys
 from datetime import datetime
+from datetime import timedelta
 from pstats import SortKey
 
 from gi.repository import Gio
@@ -49,6 +50,7 @@
 from gajim.common.storage.events.storage import EventStorage
 from gajim.common.task_manager import TaskManager
 from gajim.common.util.http import create_http_request
+from gajim.common.util.http import invalidate_http_sessions
 
 log = logging.getLogger('gajim.c.application')
 
@@ -77,11 +79,16 @@ def _init_core(self) -> bool:
             app.storage.cache = CacheStorage()
             app.storage.cache.init()
 
-            app.storage.events = EventStorage()
+            max_age = app.settings.get('events_max_age')
+            max_events = app.settings.get('events_max_per_chat')
+            app.storage.events = EventStorage(
+                max_age=None if max_age == -1 else timedelta(seconds=max_age),
+                max_events_per_chat=None if max_events == -1 else max_events)
             app.storage.events.init()
 
             app.storage.archive = MessageArchiveStorage()
             app.storage.archive.init()
+            app.storage.archive.cleanup_chat_history()
         except Exception as error:
             app.ged.raise_event(DBMigrationError(exception=error))
             log.exception('Failed to init storage')
@@ -243,9 +250,11 @@ def _on_disconnect(event: AccountDisconnected) -> None:
             client.change_status('offline', kwargs.get('message', ''))
 
     def _shutdown_core(self) -> None:
-        # Commit any outstanding SQL transactions
-        app.storage.archive.cleanup_chat_history()
+        for client in app.get_clients():
+            client.get_module('OMEMO').flush_storage()
+
         app.storage.cache.shutdown()
+        app.storage.events.shutdown()
         app.storage.archive.shutdown()
         app.settings.shutdown()
         self.end_profiling()
@@ -400,13 +409,14 @@ def enable_account(self, account: str) -> None:
         app.get_client(account).change_status('online', '')
 
     def disable_account(self, account: str) -> None:
-        app.settings.set_account_setting(account, 'roster_version', '')
+        app.storage.cache.set_roster_version(account, '')
         app.settings.set_account_setting(account, 'active', False)
 
         # Code in account-disabled handlers may use app.get_client()
         app.ged.raise_event(AccountDisabled(account=account))
 
         app.get_client(account).cleanup()
+        invalidate_http_sessions(account)
         del app.connections[account]
         if account in app.interface.instances:
             del app.interface.instances[account]
@@ -312,6 +312,10 @@ def _on_stanza_sent(self,
                         _signal_name: str,
                         stanza: Any) -> None:
 
+        # Called for every stanza, usually nobody listens (XML console closed)
+        if not app.ged.has_handlers('stanza-sent'):
+            return
+
         app.ged.raise_event(StanzaSent(account=self._account,
                                        stanza=stanza))
 
@@ -320,6 +324,9 @@ def _on_stanza_received(self,
                             _signal_name: str,
                             stanza: Any) -> None:
 
+        if not app.ged.has_handlers('stanza-received'):
+            return
+
         app.ged.raise_event(StanzaReceived(account=self._account,
                                            stanza=stanza))
 
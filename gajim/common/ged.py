@@ -40,6 +40,25 @@ class GlobalEventsDispatcher:
 
     def __init__(self):
         self.handlers: dict[str, list[tuple[int, HandlerFuncT]]] = {}
+        # Handlers per event in call order, rebuilt on every change so
+        # raising an event needs no copy of the handlers list
+        self._handler_cache: dict[str, tuple[HandlerFuncT, ...]] = {}
+
+    def _update_handler_cache(self, event_name: str) -> None:
+        handlers_list = self.handlers.get(event_name)
+        if not handlers_list:
+            self._handler_cache.pop(event_name, None)
+            return
+
+        self._handler_cache[event_name] = tuple(
+            handler for _priority, handler in handlers_list)
+
+    def has_handlers(self, event_name: str) -> bool:
+        '''
+        Returns True if a handler is registered for event_name, use it to
+        avoid creating events nobody listens to
+        '''
+        return event_name in self._handler_cache
 
     def register_event_handler(self,
                                event_name: str,
@@ -48,6 +67,7 @@ def register_event_handler(self,
 
         if event_name not in self.handlers:
             self.handlers[event_name] = [(priority, handler)]
+            self._update_handler_cache(event_name)
             return
 
         handlers_list = self.handlers[event_name]
@@ -57,6 +77,7 @@ def register_event_handler(self,
 
         handlers_list.append((priority, handler))
         handlers_list.sort(key=operator.itemgetter(0))
+        self._update_handler_cache(event_name)
 
     def remove_event_handler(self,
                              event_name: str,
@@ -71,32 +92,41 @@ def remove_event_handler(self,
                     '''Function (%s) with priority "%s" never
                     registered as handler of event "%s".
                     Error: %s''', handler, priority, event_name, error)
+            else:
+                self._update_handler_cache(event_name)
 
     def raise_event(self, event_obj: ApplicationEvent) -> Any:
         event_name = event_obj.name
-        log.debug('Raise event: %s', event_name)
-        if event_name in self.handlers:
-            node_processed = False
-            # Iterate over a copy of the handlers list, so while iterating
-            # the original handlers list can be modified
-            for _priority, handler in list(self.handlers[event_name]):
-                try:
+        handlers = self._handler_cache.get(event_name)
+        if handlers is None:
+            return
+
+        debug = log.isEnabledFor(logging.DEBUG)
+        if debug:
+            log.debug('Raise event: %s', event_name)
+
+        node_processed = False
+        # The tuple is replaced when handlers change, so while iterating
+        # handlers can be registered or removed
+        for handler in handlers:
+            try:
+                if debug:
                     if inspect.ismethod(handler):
                         log.debug('Call handler %s on %s',
                                   handler.__name__,
                                   handler.__self__)
                     else:
                         log.debug('Call handler %s', handler.__name__)
-                    if handler(event_obj):
-                        return True
-                except NodeProcessed:
-                    node_processed = True
-                except Exception:
-                    log.error('Error while running an event handler: %s',
-                              handler)
-                    traceback.print_exc()
-            if node_processed:
-                raise NodeProcessed
+                if handler(event_obj):
+                    return True
+            except NodeProcessed:
+                node_processed = True
+            except Exception:
+                log.error('Error while running an event handler: %s',
+                          handler)
+                traceback.print_exc()
+        if node_processed:
+            raise NodeProcessed
 
 
 class EventHelper:
@@ -569,48 +569,46 @@ def get_os_info() -> str:
     return info
 
 
-def message_needs_highlight(text: str, nickname: str, own_jid: str) -> bool:
+# Search strings match if they are not preceded by a letter, '/' or '-'
+# and not followed by a letter
+HIGHLIGHT_PATTERN = r'(?<![^\W\d_])(?<![/-])(?:%s)(?![^\W\d_])'
+
+
+@functools.lru_cache(maxsize=32)
+def _get_highlight_pattern(highlight_words: str,
+                           nickname: str,
+                           own_jid: str
+                           ) -> re.Pattern[str] | None:
     '''
-    Check whether 'text' contains 'nickname', 'own_jid', or any string of the
-    'muc_highlight_words' setting.
+    Compile all search strings into one pattern. The pattern is cached and
+    only built again if the setting, the nickname or the JID changes.
     '''
 
-    search_strings = app.settings.get('muc_highlight_words').split(';')
+    search_strings = highlight_words.split(';')
     search_strings.append(nickname)
     search_strings.append(own_jid)
 
-    search_strings = [word.lower() for word in search_strings if word]
-    text = text.lower()
-
-    for search_string in search_strings:
-        match = text.find(search_string)
-
-        while match > -1:
-            search_end = match + len(search_string)
-
-            if match == 0 and search_end == len(text):
-                # Text contains search_string only (exact match)
-                return True
+    search_strings = {word.lower() for word in search_strings if word}
+    if not search_strings:
+        return None
 
-            char_before_allowed = bool(
-                match == 0 or
-                (not text[match - 1].isalpha() and
-                text[match - 1] not in ('/', '-')))
+    alternatives = '|'.join(
+        re.escape(word) for word in sorted(search_strings, key=len, reverse=True))
+    return re.compile(HIGHLIGHT_PATTERN % alternatives)
 
-            if char_before_allowed and search_end == len(text):
-                # search_string found at the end of text and
-                # char before search_string is allowed.
-                return True
 
-            if char_before_allowed and not text[search_end].isalpha():
-                # char_before search_string is allowed and
-                # char_after search_string is not alpha.
-                return True
+def message_needs_highlight(text: str, nickname: str, own_jid: str) -> bool:
+    '''
+    Check whether 'text' contains 'nickname', 'own_jid', or any string of the
+    'muc_highlight_words' setting.
+    '''
 
-            start = match + 1
-            match = text.find(search_string, start)
+    pattern = _get_highlight_pattern(
+        app.settings.get('muc_highlight_words'), nickname, own_jid)
+    if pattern is None:
+        return False
 
-    return False
+    return pattern.search(text.lower()) is not None
 
 
 def allow_showing_notification(account: str) -> bool:
@@ -11,6 +11,7 @@
 
 from typing import Any
 
+import time
 import weakref
 from collections import defaultdict
 from collections.abc import Callable
@@ -32,6 +33,7 @@
 from gajim.common.helpers import get_optional_features
 from gajim.common.modules.base import BaseModule
 from gajim.common.task_manager import Task
+from gajim.common.task_manager import TASK_TIMEOUT
 
 
 class Caps(BaseModule):
@@ -60,6 +62,9 @@ def __init__(self, con: types.Client) -> None:
         self._queued_tasks_by_hash: defaultdict[
             str, set[EntityCapsTask]] = defaultdict(set)
         self._queued_tasks_by_jid: dict[JID, EntityCapsTask] = {}
+        # Task which queries a hash, other tasks for the same hash wait
+        # for its result
+        self._running_tasks_by_hash: dict[str, EntityCapsTask] = {}
 
     def _queue_task(self, task: EntityCapsTask) -> None:
         old_task = self._get_task(task.entity.jid)
@@ -79,14 +84,29 @@ def _get_similar_tasks(self, task: EntityCapsTask) -> set[EntityCapsTask]:
 
     def _remove_task(self, task: EntityCapsTask) -> None:
         task.set_obsolete()
+        task.set_finished()
         del self._queued_tasks_by_jid[task.entity.jid]
         self._queued_tasks_by_hash[task.entity.hash].discard(task)
+        if self._running_tasks_by_hash.get(task.entity.hash) is task:
+            del self._running_tasks_by_hash[task.entity.hash]
 
     def _remove_all_tasks(self) -> None:
         for task in self._queued_tasks_by_jid.values():
             task.set_obsolete()
+            task.set_finished()
         self._queued_tasks_by_jid.clear()
         self._queued_tasks_by_hash.clear()
+        self._running_tasks_by_hash.clear()
+
+    def is_hash_queried(self, task: EntityCapsTask) -> bool:
+        '''
+        Returns True if another task already queries the hash of the task,
+        and did not time out
+        '''
+        running = self._running_tasks_by_hash.get(task.entity.hash)
+        if running is None or running is task:
+            return False
+        return time.monotonic() - running.started_at < TASK_TIMEOUT
 
     def _entity_caps(self,
                      _con: types.xmppClient,
@@ -123,6 +143,7 @@ def _entity_caps(self,
 
     def _execute_task(self, task: EntityCapsTask) -> None:
         self._log.info('Request %s from %s', task.entity.hash, task.entity.jid)
+        self._running_tasks_by_hash[task.entity.hash] = task
         self._con.get_module('Discovery').disco_info(
             task.entity.jid,
             node=f'{task.entity.node}#{task.entity.hash}',
@@ -195,12 +216,16 @@ def cleanup(self) -> None:
 
 
 class EntityCapsTask(Task):
+
+    # Finished when the disco info result is received
+    track_completion = True
+
     def __init__(self,
                  account: str,
                  properties: PresenceProperties,
                  callback: Callable[..., Any]
                  ) -> None:
-        Task.__init__(self)
+        Task.__init__(self, account=account)
         self._account = account
         self._callback = weakref.WeakMethod(callback)
 
@@ -213,8 +238,11 @@ def __init__(self,
 
     def execute(self) -> None:
         callback = self._callback()
-        if callback is not None:
-            callback(self)
+        if callback is None:
+            self.set_finished()
+            return
+
+        callback(self)
 
     def preconditions_met(self) -> bool:
         try:
@@ -231,6 +259,11 @@ def preconditions_met(self) -> bool:
                 self.set_obsolete()
                 return False
 
+        if client.get_module('Caps').is_hash_queried(self):
+            # Contacts often share a hash, the result of the running
+            # query most likely makes this task obsolete
+            return False
+
         return client.state.is_available
 
     def __repr__(self) -> str:
@@ -13,6 +13,7 @@
 import tempfile
 from collections import defaultdict
 from collections.abc import Callable
+from collections.abc import Iterable
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -438,6 +439,22 @@ def set_encrypted_data(self, data: bytes) -> None:
         self._temp_path.write_bytes(data)
         self._is_encrypted = True
 
+    def write_encrypted_data(self, chunks: Iterable[bytes]) -> bool:
+        # Writes the payload chunk by chunk, so only one chunk is held
+        # in memory. Returns False if the transfer was cancelled meanwhile.
+        with open(self._temp_path, 'wb') as file:
+            for chunk in chunks:
+                if self._state == FTState.CANCELLED:
+                    break
+                file.write(chunk)
+
+        if self._state == FTState.CANCELLED:
+            self._cleanup()
+            return False
+
+        self._is_encrypted = True
+        return True
+
     def get_data(self) -> bytes:
         return self._path.read_bytes()
 
@@ -6,6 +6,8 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
+from collections.abc import Callable
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
@@ -63,6 +65,16 @@ def __init__(self, con: types.Client) -> None:
         self.available = False
         self._mam_query_ids: dict[str, str] = {}
 
+        # Holds the messages of the currently received result page per
+        # archive jid, they are stored together when the page is complete
+        self._pages: defaultdict[
+            JID, list[tuple[mod.Message, Callable[[int], None]]]
+        ] = defaultdict(list)
+
+        # Holds the stanza-ids of the currently received result page per
+        # archive jid, to drop duplicates before other modules see them
+        self._page_stanza_ids: defaultdict[JID, set[str]] = defaultdict(set)
+
         # Holds archive jids where catch up was successful
         self._catch_up_finished: list[str] = []
 
@@ -97,6 +109,8 @@ def _on_client_state_changed(self,
     def _reset_state(self) -> None:
         self._mam_query_ids.clear()
         self._catch_up_finished.clear()
+        self._pages.clear()
+        self._page_stanza_ids.clear()
 
     def _remove_query_id(self, jid: JID) -> None:
         self._mam_query_ids.pop(jid, None)
@@ -104,6 +118,38 @@ def _remove_query_id(self, jid: JID) -> None:
     def is_catch_up_finished(self, jid: str) -> bool:
         return jid in self._catch_up_finished
 
+    def add_to_page(self,
+                    archive_jid: JID,
+                    message: mod.Message,
+                    callback: Callable[[int], None]
+                    ) -> None:
+        '''
+        Queue a message received from the archive, it is stored when
+        the result page is complete. The callback is called with the
+        pk of the stored message.
+        '''
+        self._pages[archive_jid].append((message, callback))
+
+    def _store_page(self,
+                    archive_jid: JID,
+                    archive_state: mod.MAMArchiveState | None = None
+                    ) -> None:
+
+        page = self._pages.pop(archive_jid, [])
+        self._page_stanza_ids.pop(archive_jid, None)
+        if not page and archive_state is None:
+            return
+
+        self._log.info('Store page: %s, %s messages', archive_jid, len(page))
+
+        pks = app.storage.archive.insert_mam_page(
+            self._account, [message for message, _ in page], archive_state)
+
+        for (_, callback), pk in zip(page, pks, strict=True):
+            if pk == -1:
+                continue
+            callback(pk)
+
     def _from_valid_archive(self,
                             _stanza: Message,
                             properties: MessageProperties
@@ -210,11 +256,26 @@ def _mam_message_received(self,
             self._log.warning(stanza)
             raise nbxmpp.NodeProcessed
 
-        if app.storage.archive.check_if_stanza_id_exists(
-            self._account, properties.remote_jid, stanza_id):
+        if self._is_duplicate(properties, stanza_id):
             self._log.info('Received duplicated message from MAM: %s', stanza_id)
             raise nbxmpp.NodeProcessed
 
+    def _is_duplicate(self,
+                      properties: MessageProperties,
+                      stanza_id: str
+                      ) -> bool:
+
+        page_stanza_ids = self._page_stanza_ids[properties.mam.archive]
+        if stanza_id in page_stanza_ids:
+            return True
+
+        if app.storage.archive.check_if_stanza_id_exists(
+                self._account, properties.remote_jid, stanza_id):
+            return True
+
+        page_stanza_ids.add(stanza_id)
+        return False
+
     def _is_valid_request(self, properties: MessageProperties) -> bool:
         valid_id = self._mam_query_ids.get(properties.mam.archive, None)
         return valid_id == properties.mam.query_id
@@ -414,10 +475,14 @@ def _execute_query(self,
 
         self._remove_query_id(result.jid)
 
+        if is_error(result):
+            self._store_page(result.jid)
+
         raise_if_error(result)
 
         while not result.complete:
-            app.storage.archive.upsert_row(
+            self._store_page(
+                result.jid,
                 mod.MAMArchiveState(
                     account_=self._account,
                     remote_jid_=result.jid,
@@ -434,8 +499,21 @@ def _execute_query(self,
 
             self._remove_query_id(result.jid)
 
+            if is_error(result):
+                self._store_page(result.jid)
+
             raise_if_error(result)
 
+        archive_state = None
+        if result.rsm.last is not None:
+            archive_state = mod.MAMArchiveState(
+                account_=self._account,
+                remote_jid_=result.jid,
+                to_stanza_id=result.rsm.last,
+            )
+
+        self._store_page(result.jid, archive_state)
+
         self._catch_up_finished.append(result.jid)
         self._log.info('Request finished: %s, last mam id: %s',
                        result.jid, result.rsm.last)
@@ -476,6 +554,7 @@ def _on_interval_result(self, task: Task) -> None:
             result = task.finish()
         except (StanzaError, MalformedStanzaError) as error:
             self._remove_query_id(error.jid)
+            self._store_page(error.jid)
             return
 
         self._remove_query_id(result.jid)
@@ -488,7 +567,8 @@ def _on_interval_result(self, task: Task) -> None:
         if result.complete:
             self._log.info('Request finished: %s, last mam id: %s',
                            result.jid, result.rsm.last)
-            app.storage.archive.upsert_row(
+            self._store_page(
+                result.jid,
                 mod.MAMArchiveState(
                     account_=self._account,
                     remote_jid_=result.jid,
@@ -501,6 +581,7 @@ def _on_interval_result(self, task: Task) -> None:
                 query_id=queryid))
 
         else:
+            self._store_page(result.jid)
             self.request_archive_interval(start_date,
                                           end_date,
                                           result.rsm.last,
@@ -6,6 +6,7 @@
 
 import dataclasses
 import datetime as dt
+import functools
 
 import nbxmpp
 import sqlalchemy.exc
@@ -233,6 +234,14 @@ def _message_received(self,
             thread_id_=properties.thread,
         )
 
+        if properties.is_mam_message:
+            self._client.get_module('MAM').add_to_page(
+                properties.mam.archive,
+                message_data,
+                functools.partial(
+                    self._on_message_stored, remote_jid, message_data, True))
+            return
+
         try:
             pk = app.storage.archive.insert_object(
                 message_data, ignore_on_conflict=False)
@@ -240,7 +249,16 @@ def _message_received(self,
             self._log.exception('Insertion Error')
             return
 
-        if correction_id is not None:
+        self._on_message_stored(remote_jid, message_data, False, pk)
+
+    def _on_message_stored(self,
+                           remote_jid: JID,
+                           message_data: mod.Message,
+                           from_mam: bool,
+                           pk: int
+                           ) -> None:
+
+        if message_data.correction_id is not None:
             event = MessageCorrected(account=self._account,
                                      jid=remote_jid,
                                      message_correction=message_data)
@@ -249,8 +267,8 @@ def _message_received(self,
 
         app.ged.raise_event(MessageReceived(account=self._account,
                                             jid=remote_jid,
-                                            m_type=m_type,
-                                            from_mam=properties.is_mam_message,
+                                            m_type=message_data.type,
+                                            from_mam=from_mam,
                                             pk=pk))
 
     def _get_message_timestamp(
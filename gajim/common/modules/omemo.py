@@ -12,6 +12,7 @@
 
 import binascii
 import threading
+import time
 from collections.abc import Callable
 from pathlib import Path
 
@@ -33,7 +34,6 @@
 from nbxmpp.structs import PresenceProperties
 from nbxmpp.structs import StanzaHandler
 from nbxmpp.task import Task
-from omemo_dr.aes import aes_encrypt_file
 from omemo_dr.const import OMEMOTrust
 from omemo_dr.exceptions import DecryptionFailed
 from omemo_dr.exceptions import DuplicateMessage
@@ -66,6 +66,8 @@
 from gajim.common.modules.util import prepare_stanza
 from gajim.common.storage.omemo import OMEMOStorage
 from gajim.common.structs import OutgoingMessage
+from gajim.common.util.crypto import aes_gcm_encrypt_stream
+from gajim.common.util.crypto import AESGCMKey
 from gajim.common.util.decorators import lru_cache_with_ttl
 
 ALLOWED_TAGS = [
@@ -127,7 +129,7 @@ def __init__(self, client: types.Client) -> None:
 
         data_dir = Path(configpaths.get('MY_DATA'))
         db_path = data_dir / f'omemo_{self._own_jid}.db'
-        storage = OMEMOStorage(self._account, db_path, self._log)
+        self._storage = OMEMOStorage(self._account, db_path, self._log)
 
         omemo_config = OMEMOConfig(default_prekey_amount=100,
                                    min_prekey_amount=80,
@@ -136,7 +138,7 @@ def __init__(self, client: types.Client) -> None:
                                    unacknowledged_count=2000)
 
         self._backend = OMEMOSessionManager(
-            self._own_jid, storage, omemo_config, self._account)
+            self._own_jid, self._storage, omemo_config, self._account)
         self._backend.register_signal('republish-bundle',
                                       self._on_republish_bundle)
 
@@ -276,9 +278,16 @@ def encrypt_message(self, message: OutgoingMessage) -> bool:
 
         text = message.get_text()
         assert text is not None
-        omemo_message = self.backend.encrypt(str(remote_jid),
-                                             text,
-                                             groupchat=contact.is_groupchat)
+        start = time.perf_counter()
+        try:
+            omemo_message = self.backend.encrypt(
+                str(remote_jid), text, groupchat=contact.is_groupchat)
+        finally:
+            # Encryption failures for single devices are only logged
+            self._storage.discard_unstored_sessions()
+        self._log.debug('Encryption took %.1f ms, %s',
+                        (time.perf_counter() - start) * 1000,
+                        self._storage.stats)
         if omemo_message is None:
             raise Exception('Encryption error')
 
@@ -316,12 +325,19 @@ def _encrypt_file_thread(transfer: HTTPFileTransfer,
                              **kwargs: Any
                              ) -> None:
 
-        result = aes_encrypt_file(transfer.get_data())
-        transfer.size = len(result.payload)
-        fragment = binascii.hexlify(result.iv + result.key).decode()
+        key = AESGCMKey.generate()
+        try:
+            with open(transfer.path, 'rb') as file:
+                if not transfer.write_encrypted_data(
+                        aes_gcm_encrypt_stream(file, key)):
+                    return
+        except OSError as error:
+            GLib.idle_add(transfer.set_error, 'misc', str(error))
+            return
+
+        fragment = binascii.hexlify(key.iv + key.key).decode()
         transfer.set_uri_transform_func(
             lambda uri: f'aesgcm{uri[5:]}#{fragment}')
-        transfer.set_encrypted_data(result.payload)
         GLib.idle_add(callback, transfer)
 
     def _send_key_transport_message(self,
@@ -330,7 +346,10 @@ def _send_key_transport_message(self,
                                     devices: list[int]
                                     ) -> None:
 
-        omemo_message = self.backend.encrypt_key_transport(jid, devices)
+        try:
+            omemo_message = self.backend.encrypt_key_transport(jid, devices)
+        finally:
+            self._storage.discard_unstored_sessions()
         if omemo_message is None:
             self._log.warning('Key transport message to %s (%s) failed',
                               jid, devices)
@@ -370,7 +389,10 @@ def _message_received(self,
         try:
             plaintext, fingerprint, trust = self.backend.decrypt_message(
                 properties.omemo, from_jid)
-        except (KeyExchangeMessage, DuplicateMessage):
+        except KeyExchangeMessage:
+            raise NodeProcessed
+
+        except DuplicateMessage:
             raise NodeProcessed
 
         except SelfMessage:
@@ -399,6 +421,10 @@ def _message_received(self,
             trust = OMEMOTrust.UNTRUSTED
             fingerprint = None
 
+        finally:
+            # Records changed by a failed decryption must not be kept
+            self._storage.discard_unstored_sessions()
+
         prepare_stanza(stanza, plaintext)
         self._debug_print_stanza(stanza)
         properties.encrypted = EncryptionData(
@@ -650,10 +676,15 @@ def compose_trust_uri(self, jid: JID) -> str:
             verified_identities.insert(0, self._backend.get_our_identity())
         return compose_trust_uri(jid, verified_identities)
 
+    def flush_storage(self) -> None:
+        self._storage.flush()
+
     def cleanup(self) -> None:
         BaseModule.cleanup(self)
         self._backend.destroy()
         del self._backend
+        self._storage.shutdown()
+        del self._storage
 
 
 def compose_trust_uri(jid: JID, devices: list[IdentityT]) -> str:
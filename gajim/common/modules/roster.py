@@ -57,8 +57,7 @@ def load_roster(self) -> None:
         roster = app.storage.cache.load_roster(self._account)
         if not roster:
             self._log.info('Database empty, reset roster version')
-            app.settings.set_account_setting(
-                self._account, 'roster_version', '')
+            app.storage.cache.set_roster_version(self._account, '')
             return
 
         for jid in roster:
@@ -66,15 +65,11 @@ def load_roster(self) -> None:
 
         self._roster = roster
 
-    def _store_roster(self) -> None:
-        app.storage.cache.store_roster(self._account, self._roster)
-
     def get_size(self) -> int:
         return len(self._roster)
 
     def request_roster(self) -> None:
-        version = app.settings.get_account_setting(self._account,
-                                                   'roster_version')
+        version = app.storage.cache.get_roster_version(self._account)
 
         self._log.info('Request version: %s', version)
         self._nbxmpp('Roster').request_roster(
@@ -100,17 +95,19 @@ def _on_request_roster(self, task: Task) -> None:
             # Roster versioning supported but
             # server opted to send us the whole roster
             assert roster.items is not None
-            self._set_roster_from_data(roster.items)
+            self._set_roster_from_data(roster.items, roster.version)
 
-        app.settings.set_account_setting(self._account,
-                                         'roster_version',
-                                         roster.version)
+        else:
+            app.storage.cache.set_roster_version(self._account, roster.version)
 
         app.ged.raise_event(RosterReceived(account=self._account))
 
         self._con.connect_machine()
 
-    def _set_roster_from_data(self, items: list[RosterItem]) -> None:
+    def _set_roster_from_data(self,
+                              items: list[RosterItem],
+                              version: str | None
+                              ) -> None:
         self._roster.clear()
         self._groups = None
 
@@ -119,7 +116,7 @@ def _set_roster_from_data(self, items: list[RosterItem]) -> None:
             self._con.get_module('Contacts').add_contact(item.jid)
             self._roster[item.jid] = item
 
-        self._store_roster()
+        app.storage.cache.store_roster(self._account, self._roster, version)
 
     def _process_roster_push(self,
                              _con: types.xmppClient,
@@ -130,18 +127,18 @@ def _process_roster_push(self,
 
         assert properties.roster is not None
         item = properties.roster.item
+        version = properties.roster.version
+        self._log.info('New version: %s', version)
+
         if item.subscription == 'remove':
             self._roster.pop(item.jid)
+            app.storage.cache.remove_roster_item(
+                self._account, item.jid, version)
         else:
             self._roster[item.jid] = item
+            app.storage.cache.update_roster_item(self._account, item, version)
 
         self._groups = None
-        self._store_roster()
-
-        self._log.info('New version: %s', properties.roster.version)
-        app.settings.set_account_setting(self._account,
-                                         'roster_version',
-                                         properties.roster.version)
 
         app.ged.raise_event(RosterPush(account=self._account,
                                        item=item))
@@ -215,21 +215,31 @@ def _muc_update_received(self, properties: PresenceProperties) -> None:
 
 
 class VCardAvatarsTask(Task):
+
+    # Finished when the vCard request is done
+    track_completion = True
+
     def __init__(self,
                  contact: Any,
                  sha: str,
                  callback: Callable[..., Any]
                  ) -> None:
 
-        Task.__init__(self)
+        Task.__init__(self, account=contact.account)
         self._contact = contact
         self._sha = sha
         self._callback = weakref.WeakMethod(callback)
 
     def execute(self) -> None:
         callback = self._callback()
-        if callback is not None:
-            callback(self._contact, self._sha)
+        if callback is None:
+            self.set_finished()
+            return
+
+        callback(self._contact, self._sha, callback=self._on_finished)
+
+    def _on_finished(self, _task: Any) -> None:
+        self.set_finished()
 
     def preconditions_met(self) -> bool:
         try:
@@ -7,9 +7,11 @@
 from typing import Any
 from typing import cast
 
+import json
 import logging
 import os
 import re
+import threading
 import uuid
 from collections.abc import Callable
 from dataclasses import dataclass
@@ -35,6 +37,7 @@
 from gajim.common.preview_helpers import aes_decrypt
 from gajim.common.preview_helpers import create_thumbnail
 from gajim.common.preview_helpers import filename_from_uri
+from gajim.common.preview_helpers import get_file_hash
 from gajim.common.preview_helpers import get_image_paths
 from gajim.common.preview_helpers import get_previewable_mime_types
 from gajim.common.preview_helpers import guess_mime_type
@@ -56,6 +59,11 @@
 
 AudioSampleT = list[tuple[float, float]]
 
+# Number of samples of the RMS envelope stored in the waveform cache,
+# more than any audio visualizer draws
+WAVEFORM_SAMPLES = 400
+WAVEFORM_VERSION = 1
+
 
 @dataclass
 class AudioPreviewState:
@@ -213,6 +221,8 @@ def __init__(self) -> None:
         # to stop previews by preview_id, see stop_audio_except(preview_id)
         self._audio_stop_functions: dict[int, Callable[..., None]] = {}
 
+        self._waveform_paths: dict[Path, Path] = {}
+
         log.info('Supported mime types for preview')
         log.info(sorted(PREVIEWABLE_MIME_TYPES))
 
@@ -232,6 +242,94 @@ def get_audio_state(self,
         self._audio_sessions[preview_id] = AudioPreviewState()
         return self._audio_sessions[preview_id]
 
+    def _get_waveform_path(self, file_path: Path) -> Path:
+        path = self._waveform_paths.get(file_path)
+        if path is None:
+            file_hash = get_file_hash(file_path)
+            path = self._thumb_dir / f'{file_hash}_waveform.json'
+            self._waveform_paths[file_path] = path
+        return path
+
+    def load_audio_waveform(self,
+                            file_path: Path,
+                            callback: Callable[
+                                [tuple[float, AudioSampleT] | None], Any]
+                            ) -> None:
+        '''
+        Loads duration and RMS envelope of an analyzed audio file in a
+        thread, because the file has to be hashed to find the cached
+        waveform. Calls callback with the result or None on a cache miss.
+        '''
+
+        thread = threading.Thread(target=self._load_audio_waveform_thread,
+                                  args=(file_path, callback))
+        thread.daemon = True
+        thread.start()
+
+    def _load_audio_waveform_thread(self,
+                                    file_path: Path,
+                                    callback: Callable[
+                                        [tuple[float, AudioSampleT] | None],
+                                        Any]
+                                    ) -> None:
+
+        waveform = self._read_audio_waveform(file_path)
+        GLib.idle_add(callback, waveform)
+
+    def _read_audio_waveform(self,
+                             file_path: Path
+                             ) -> tuple[float, AudioSampleT] | None:
+
+        try:
+            path = self._get_waveform_path(file_path)
+            if not path.exists():
+                return None
+
+            data = json.loads(path.read_text())
+            if data['version'] != WAVEFORM_VERSION:
+                return None
+
+            samples = [(float(val1), float(val2))
+                       for val1, val2 in data['samples']]
+            return float(data['duration']), samples
+
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            log.warning('Could not load waveform of %s: %s',
+                        file_path.name, error)
+            return None
+
+    def store_audio_waveform(self,
+                             file_path: Path,
+                             duration: float,
+                             samples: AudioSampleT
+                             ) -> None:
+
+        # The path is known from load_audio_waveform(), hashing the
+        # file again would block the main thread
+        path = self._waveform_paths.get(file_path)
+        if path is None:
+            log.warning('Could not store waveform of %s: unknown hash',
+                        file_path.name)
+            return
+
+        data = {
+            'version': WAVEFORM_VERSION,
+            'duration': duration,
+            'samples': [(round(val1, 5), round(val2, 5))
+                        for val1, val2 in samples],
+        }
+        write_file_async(path,
+                         json.dumps(data).encode(),
+                         self._on_waveform_write_finished,
+                         path)
+
+    @staticmethod
+    def _on_waveform_write_finished(_result: bool,
+                                    error: GLib.Error | None,
+                                    path: Path) -> None:
+        if error is not None:
+            log.error('%s: %s', path.name, error)
+
     def register_audio_stop_func(self,
                                  preview_id: int,
                                  stop_func: Callable[..., None]
@@ -7,9 +7,11 @@
 
 import binascii
 import hashlib
+import itertools
 import logging
 import math
 import mimetypes
+from collections.abc import Sequence
 from io import BytesIO
 from pathlib import Path
 from urllib.parse import ParseResult
@@ -332,6 +334,38 @@ def get_image_paths(uri: str,
     return orig_path, thumb_path
 
 
+def get_file_hash(file_path: Path) -> str:
+    sha = hashlib.sha256()
+    with file_path.open('rb') as file:
+        while chunk := file.read(65536):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def downsample_audio_samples(samples: Sequence[tuple[float, float]],
+                             count: int
+                             ) -> list[tuple[float, float]]:
+    '''
+    Reduces samples to count samples, each one is the mean of a block of
+    consecutive samples. Uses prefix sums so every sample is visited once.
+    '''
+
+    length = len(samples)
+    if length <= count:
+        return list(samples)
+
+    channel1, channel2 = zip(*samples, strict=True)
+    sums1 = list(itertools.accumulate(channel1, initial=0.0))
+    sums2 = list(itertools.accumulate(channel2, initial=0.0))
+
+    bounds = [i * length // count for i in range(count + 1)]
+    return [
+        ((sums1[end] - sums1[start]) / (end - start),
+         (sums2[end] - sums2[start]) / (end - start))
+        for start, end in itertools.pairwise(bounds)
+    ]
+
+
 def split_geo_uri(uri: str) -> Coords:
     # Example:
     # geo:37.786971,-122.399677,122.3;CRS=epsg:32718;U=20;mapcolors=abc
@@ -102,6 +102,8 @@ class _ACCOUNTDEFAULT:
     'autoxatime',
     'chat_handle_position',
     'dark_theme',
+    'events_max_age',
+    'events_max_per_chat',
     'file_transfers_port',
     'gc_sync_threshold_private_default',
     'gc_sync_threshold_public_default',
@@ -115,6 +117,8 @@ class _ACCOUNTDEFAULT:
     'notification_timeout',
     'preview_max_file_size',
     'preview_size',
+    'xml_console_max_bytes',
+    'xml_console_max_stanzas',
 ]
 
 FloatSettings = Literal[
@@ -193,6 +197,8 @@ class _ACCOUNTDEFAULT:
     'enable_negative_priority': False,
     'enable_file_preview': True,
     'escape_key_closes': False,
+    'events_max_age': 604800,
+    'events_max_per_chat': 5000,
     'file_transfers_port': 28011,
     'ft_add_hosts_to_send': '',
     'gc_notify_on_all_messages_private_default': True,
@@ -280,6 +286,8 @@ class _ACCOUNTDEFAULT:
     'video_see_self': True,
     'video_size': '',
     'workspace_order': [],
+    'xml_console_max_bytes': 20971520,
+    'xml_console_max_stanzas': 10000,
 }
 
 BoolAccountSettings = Literal[
@@ -338,7 +346,6 @@ class _ACCOUNTDEFAULT:
     'password',
     'proxy',
     'resource',
-    'roster_version',
     'send_chatstate_default',
     'subscription_request_msg',
     'zeroconf_email',
@@ -458,7 +465,6 @@ class _ACCOUNTDEFAULT:
         'request_user_data': True,
         'resource': 'gajim.$rand',
         'restore_last_status': False,
-        'roster_version': '',
         'savepass': True,
         'send_chatstate_default': 'composing_only',
         'send_idle_time': True,
@@ -669,6 +675,12 @@ class WorkspaceSettings(TypedDict):
             'account in the Accounts window. BE CAREFUL, when you are logged '
             'in with a negative priority, you will NOT receive any message '
             'from your server.'),
+        'events_max_age': _(
+            'Time in seconds chat events (e.g. joins, status changes) are '
+            'kept. -1 means no limit.'),
+        'events_max_per_chat': _(
+            'Number of chat events (e.g. joins, status changes) kept per '
+            'chat, older events are removed. -1 means no limit.'),
         'file_transfers_port': '',
         'ft_add_hosts_to_send': _(
             'List of send hosts (comma separated) in '
@@ -719,5 +731,11 @@ class WorkspaceSettings(TypedDict):
         'use_urgency_hint': _(
             'If enabled, Gajim makes the window flash (the default behaviour '
             'in most Window Managers) when holding pending events.'),
+        'xml_console_max_bytes': _(
+            'Size in bytes of the stanzas the XML Console keeps, older '
+            'stanzas are removed.'),
+        'xml_console_max_stanzas': _(
+            'Number of stanzas the XML Console keeps, older stanzas are '
+            'removed.'),
     },
 }
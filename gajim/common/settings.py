@@ -70,7 +70,7 @@
 
 log = logging.getLogger('gajim.c.settings')
 
-CURRENT_USER_VERSION = 5
+CURRENT_USER_VERSION = 7
 
 CREATE_SQL = '''
     CREATE TABLE settings (
@@ -78,9 +78,17 @@
             settings TEXT
     );
 
-    CREATE TABLE account_settings (
-            account TEXT UNIQUE,
-            settings TEXT
+    CREATE TABLE accounts (
+            account TEXT UNIQUE
+    );
+
+    CREATE TABLE account_setting (
+            account TEXT,
+            scope TEXT,
+            jid TEXT,
+            name TEXT,
+            value TEXT,
+            PRIMARY KEY (account, scope, jid, name)
     );
 
     INSERT INTO settings(name, settings) VALUES ('app', '{{}}');
@@ -382,6 +390,57 @@ def _migrate(self) -> None:
             self._settings['app'].pop('muclumbus_api_http_uri', None)
             self._set_user_version(5)
 
+        if version < 6:
+            # The roster version is stored in the cache with the roster
+            for account_settings in self._account_settings.values():
+                account_settings['account'].pop('roster_version', None)
+
+            self._set_user_version(6)
+
+        if version < 7:
+            self._migrate_account_settings()
+
+    def _migrate_account_settings(self) -> None:
+        '''
+        Store account settings per key instead of one JSON document per
+        account. Everything is done in one transaction, an interrupted
+        migration is run again from the start.
+        '''
+
+        # Pending changes are not part of the migration
+        self._commit()
+
+        self._con.execute('BEGIN')
+        try:
+            self._con.execute('''
+                CREATE TABLE IF NOT EXISTS accounts (
+                    account TEXT UNIQUE
+                )''')
+            self._con.execute('''
+                CREATE TABLE IF NOT EXISTS account_setting (
+                    account TEXT,
+                    scope TEXT,
+                    jid TEXT,
+                    name TEXT,
+                    value TEXT,
+                    PRIMARY KEY (account, scope, jid, name)
+                )''')
+            self._con.execute('DELETE FROM accounts')
+            self._con.execute('DELETE FROM account_setting')
+
+            for account in self._account_settings:
+                self._con.execute(
+                    'INSERT INTO accounts(account) VALUES(?)', (account,))
+                self._write_account_settings(account)
+
+            self._con.execute('DROP TABLE IF EXISTS account_settings')
+            self._con.execute('PRAGMA user_version = 7')
+        except Exception:
+            self._con.rollback()
+            raise
+
+        self._commit()
+
     def _migrate_old_config(self) -> None:
         if self._in_memory:
             return
@@ -581,23 +640,93 @@ def _load_settings(self) -> None:
                                                   object_hook=json_decoder)
 
     def _load_account_settings(self) -> None:
-        account_settings = self._con.execute(
-            'SELECT * FROM account_settings').fetchall()
-        for row in account_settings:
+        if self._has_table('account_settings'):
+            # Loaded from the old format, converted by the migration
+            account_settings = self._con.execute(
+                'SELECT * FROM account_settings').fetchall()
+            for row in account_settings:
+                log.info('Load account settings: %s', row.account)
+                self._account_settings[row.account] = json.loads(
+                    row.settings,
+                    object_hook=json_decoder)
+            return
+
+        accounts = self._con.execute('SELECT account FROM accounts').fetchall()
+        for row in accounts:
             log.info('Load account settings: %s', row.account)
-            self._account_settings[row.account] = json.loads(
-                row.settings,
-                object_hook=json_decoder)
+            self._account_settings[row.account] = {'account': {},
+                                                   'contact': {},
+                                                   'group_chat': {}}
+
+        rows = self._con.execute(
+            'SELECT account, scope, jid, name, value FROM account_setting')
+        for account, scope, jid, name, value in rows:
+            value = json.loads(value, object_hook=json_decoder)
+            settings = self._account_settings[account][scope]
+            if scope == 'account':
+                settings[name] = value
+            else:
+                settings.setdefault(jid, {})[name] = value
+
+    def _has_table(self, name: str) -> bool:
+        result = self._con.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,)).fetchone()
+        return result is not None
 
     def _commit_account_settings(self,
                                  account: str,
                                  schedule: bool = True) -> None:
+        '''
+        Replace all stored settings of an account, use
+        _store_account_setting() for single settings
+        '''
+        self._write_account_settings(account)
+        self._commit(schedule=schedule)
+
+    def _write_account_settings(self, account: str) -> None:
         log.info('Set account settings: %s', account)
         self._con.execute(
-            'UPDATE account_settings SET settings = ? WHERE account = ?',
-            (json.dumps(self._account_settings[account], cls=Encoder), account))
+            'DELETE FROM account_setting WHERE account = ?', (account,))
 
-        self._commit(schedule=schedule)
+        rows: list[tuple[str, str, str, str, str]] = []
+        account_settings = self._account_settings[account]
+        for name, value in account_settings['account'].items():
+            rows.append((account, 'account', '', name,
+                         json.dumps(value, cls=Encoder)))
+
+        for scope in ('contact', 'group_chat'):
+            for jid, settings in account_settings[scope].items():
+                for name, value in settings.items():
+                    rows.append((account, scope, str(jid), name,
+                                 json.dumps(value, cls=Encoder)))
+
+        self._con.executemany(
+            '''INSERT INTO account_setting(account, scope, jid, name, value)
+               VALUES(?, ?, ?, ?, ?)''', rows)
+
+    def _store_account_setting(self,
+                               account: str,
+                               scope: str,
+                               jid: JID | None,
+                               name: str,
+                               value: Any) -> None:
+
+        jid_str = '' if jid is None else str(jid)
+        if value is None:
+            self._con.execute(
+                '''DELETE FROM account_setting
+                   WHERE account = ? AND scope = ? AND jid = ? AND name = ?''',
+                (account, scope, jid_str, name))
+        else:
+            self._con.execute(
+                '''INSERT INTO account_setting(account, scope, jid, name, value)
+                   VALUES(?, ?, ?, ?, ?)
+                   ON CONFLICT(account, scope, jid, name)
+                   DO UPDATE SET value = excluded.value''',
+                (account, scope, jid_str, name, json.dumps(value, cls=Encoder)))
+
+        self._commit(schedule=True)
 
     def _commit_settings(self, name: str, schedule: bool = True) -> None:
         log.info('Set settings: %s', name)
@@ -751,8 +880,7 @@ def add_account(self, account: str) -> None:
                                            'contact': {},
                                            'group_chat': {}}
         self._con.execute(
-            'INSERT INTO account_settings(account, settings) VALUES(?, ?)',
-            (account, json.dumps(self._account_settings[account])))
+            'INSERT INTO accounts(account) VALUES(?)', (account,))
         self._commit()
 
     def remove_account(self, account: str) -> None:
@@ -761,8 +889,9 @@ def remove_account(self, account: str) -> None:
 
         del self._account_settings[account]
         self._con.execute(
-            'DELETE FROM account_settings WHERE account = ?',
-            (account,))
+            'DELETE FROM accounts WHERE account = ?', (account,))
+        self._con.execute(
+            'DELETE FROM account_setting WHERE account = ?', (account,))
         self._commit()
 
     def get_accounts(self) -> list[str]:
@@ -867,13 +996,13 @@ def set_account_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._store_account_setting(account, 'account', None, setting, None)
             self._notify(default, setting, account)
             return
 
         self._account_settings[account]['account'][setting] = value
 
-        self._commit_account_settings(account)
+        self._store_account_setting(account, 'account', None, setting, value)
         self._notify(value, setting, account)
 
     @overload
@@ -1026,7 +1155,7 @@ def set_group_chat_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._store_account_setting(account, 'group_chat', jid, setting, None)
             self._notify(default, setting, account, jid)
             return
 
@@ -1036,7 +1165,7 @@ def set_group_chat_setting(self,
         else:
             group_chat_settings[jid][setting] = value
 
-        self._commit_account_settings(account)
+        self._store_account_setting(account, 'group_chat', jid, setting, value)
         self._notify(value, setting, account, jid)
 
     def set_group_chat_settings(self,
@@ -1141,7 +1270,7 @@ def set_contact_setting(self,
             except KeyError:
                 pass
 
-            self._commit_account_settings(account)
+            self._store_account_setting(account, 'contact', jid, setting, None)
             self._notify(default, setting, account, jid)
             return
 
@@ -1151,7 +1280,7 @@ def set_contact_setting(self,
         else:
             contact_settings[jid][setting] = value
 
-        self._commit_account_settings(account)
+        self._store_account_setting(account, 'contact', jid, setting, value)
         self._notify(value, setting, account, jid)
 
     def set_contact_settings(self,
@@ -0,0 +1,217 @@
+# This file is part of Gajim.
+#
+# SPDX-License-Identifier: GPL-3.0-only
+
+from __future__ import annotations
+
+from typing import TextIO
+
+import re
+import time
+from collections import deque
+from collections.abc import Callable
+from collections.abc import Iterator
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import InitVar
+
+from gajim.common.const import Direction
+
+FilterFuncT = Callable[['StanzaLogEntry'], bool]
+
+
+@dataclass
+class StanzaLogEntry:
+    id: int
+    timestamp: float
+    account: str
+    account_label: str
+    kind: str
+    type: str
+    stanza: InitVar[str]
+    text: str = field(init=False, repr=False)
+    size: int = field(init=False)
+
+    def __post_init__(self, stanza: str) -> None:
+        # Only the formatted text is kept, so size is the memory the
+        # entry holds and max_bytes bounds the log
+        self.text = '<!-- {kind} {time} ({account}) -->\n{stanza}\n\n'.format(
+            kind=self.kind.capitalize(),
+            time=time.strftime('%c', time.localtime(self.timestamp)),
+            account=self.account_label,
+            stanza=stanza)
+        self.size = len(self.text.encode())
+
+
+def get_stanza_type(stanza: str, kind: str) -> str:
+    if stanza.startswith('<presence'):
+        return 'presence'
+    if stanza.startswith('<message'):
+        return 'message'
+    if stanza.startswith('<iq'):
+        return 'iq'
+    if stanza.startswith(('<r', '<a')):
+        return 'stream'
+    return kind
+
+
+class StanzaLog:
+    '''
+    Ring buffer of the stanzas shown in the XML console. The oldest
+    stanzas are dropped once more than max_count stanzas or max_bytes
+    of text are stored.
+    '''
+
+    def __init__(self, max_count: int, max_bytes: int) -> None:
+        self._max_count = max_count
+        self._max_bytes = max_bytes
+        self._entries: deque[StanzaLogEntry] = deque()
+        self._size = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[StanzaLogEntry]:
+        return iter(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def add(self,
+            account: str,
+            account_label: str,
+            kind: str,
+            stanza: str,
+            timestamp: float | None = None
+            ) -> tuple[StanzaLogEntry, list[StanzaLogEntry]]:
+        '''
+        Returns the new entry and the entries which were dropped
+        '''
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        entry = StanzaLogEntry(id=self._next_id,
+                               timestamp=timestamp,
+                               account=account,
+                               account_label=account_label,
+                               kind=kind,
+                               type=get_stanza_type(stanza, kind),
+                               stanza=stanza)
+        self._next_id += 1
+
+        self._entries.append(entry)
+        self._size += entry.size
+        return entry, self._trim()
+
+    def set_limits(self,
+                   max_count: int,
+                   max_bytes: int
+                   ) -> list[StanzaLogEntry]:
+        self._max_count = max_count
+        self._max_bytes = max_bytes
+        return self._trim()
+
+    def _trim(self) -> list[StanzaLogEntry]:
+        removed: list[StanzaLogEntry] = []
+        # Keep at least the newest entry, even if it exceeds max_bytes
+        while len(self._entries) > 1 and (
+                len(self._entries) > self._max_count or
+                self._size > self._max_bytes):
+            entry = self._entries.popleft()
+            self._size -= entry.size
+            removed.append(entry)
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
+
+    def get_index(self, entry_id: int) -> int | None:
+        # Ids are consecutive, so the index can be calculated
+        if not self._entries:
+            return None
+
+        index = entry_id - self._entries[0].id
+        if not 0 <= index < len(self._entries):
+            return None
+        return index
+
+    def get_entry(self, index: int) -> StanzaLogEntry:
+        return self._entries[index]
+
+    def search(self,
+               text: str,
+               direction: Direction,
+               start: tuple[int, int] | None = None,
+               filter_func: FilterFuncT | None = None
+               ) -> tuple[StanzaLogEntry, int] | None:
+        '''
+        Case insensitive search for text, returns the entry and the offset
+        of the match within the entry text.
+
+        :param start:   (entry id, offset) from where to search, matches
+                        have to start after the offset (Direction.NEXT) or
+                        end before it (Direction.PREV). If None the search
+                        starts at the first (Direction.NEXT) or last
+                        (Direction.PREV) entry.
+        '''
+
+        if not text or not self._entries:
+            return None
+
+        # Searching the text itself keeps offsets valid, lower() could
+        # change the length of the text. The lookahead finds overlapping
+        # matches when searching backwards.
+        pattern = re.compile(f'(?={re.escape(text)})', re.IGNORECASE)
+
+        forward = direction == Direction.NEXT
+        index = None
+        offset = None
+        if start is not None:
+            entry_id, offset = start
+            index = self.get_index(entry_id)
+            if index is None:
+                offset = None
+
+        if index is None:
+            index = 0 if forward else len(self._entries) - 1
+
+        step = 1 if forward else -1
+        while 0 <= index < len(self._entries):
+            entry = self._entries[index]
+            if filter_func is None or filter_func(entry):
+                if forward:
+                    match = pattern.search(
+                        entry.text, 0 if offset is None else offset + 1)
+                else:
+                    matches = list(pattern.finditer(
+                        entry.text, 0, len(entry.text)
+                        if offset is None else offset))
+                    match = matches[-1] if matches else None
+
+                if match is not None:
+                    return entry, match.start()
+
+            offset = None
+            index += step
+        return None
+
+    def export(self,
+               file: TextIO,
+               filter_func: FilterFuncT | None = None
+               ) -> int:
+        '''
+        Writes the stored stanzas to file one by one, returns the number
+        of written stanzas
+        '''
+
+        count = 0
+        for entry in list(self._entries):
+            if filter_func is not None and not filter_func(entry):
+                continue
+            file.write(entry.text)
+            count += 1
+        return count
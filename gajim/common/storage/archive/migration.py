@@ -116,6 +116,8 @@ def __init__(self, archive: AlchemyStorage, user_version: int) -> None:
             self._v9()
         if user_version < 10:
             self._v10()
+        if user_version < 11:
+            self._v11()
 
         app.ged.raise_event(DBMigrationFinished())
 
@@ -266,6 +268,13 @@ def _v10(self) -> None:
             'PRAGMA user_version=10'
         ])
 
+    def _v11(self) -> None:
+        self._execute_multiple([
+            *mod.MESSAGE_FTS_SCHEMA,
+            *mod.MESSAGE_FTS_REBUILD,
+            'PRAGMA user_version=11',
+        ])
+
     def _process_archive_row(
         self,
         conn: sa.Connection,
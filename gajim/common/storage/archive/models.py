@@ -730,3 +730,76 @@ def get_referenced_message(self) -> Message | None:
             self.type,
             self.reply.id
         )
+
+
+# Full text index over message.text, the rowid of each entry is the pk
+# of the indexed message. The index is kept in sync with triggers, so
+# it stays consistent with every code path writing to the message table,
+# including cascading deletes. Moderated messages are removed from it.
+
+message_fts = sa.table(
+    'message_fts',
+    sa.column('rowid', sa.Integer),
+    sa.column('text', sa.Text),
+    sa.column('rank', sa.Float),
+)
+
+MESSAGE_FTS_SCHEMA = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        text,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_insert
+        AFTER INSERT ON message
+        WHEN new.text IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM moderation
+            WHERE moderation.stanza_id = new.stanza_id
+            AND moderation.fk_remote_pk = new.fk_remote_pk
+            AND moderation.fk_account_pk = new.fk_account_pk
+        )
+    BEGIN
+        INSERT INTO message_fts(rowid, text) VALUES (new.pk, new.text);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_delete
+        AFTER DELETE ON message
+    BEGIN
+        DELETE FROM message_fts WHERE rowid = old.pk;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_update
+        AFTER UPDATE OF text ON message
+    BEGIN
+        DELETE FROM message_fts WHERE rowid = old.pk;
+        INSERT INTO message_fts(rowid, text)
+        SELECT new.pk, new.text
+        WHERE new.text IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM moderation
+            WHERE moderation.stanza_id = new.stanza_id
+            AND moderation.fk_remote_pk = new.fk_remote_pk
+            AND moderation.fk_account_pk = new.fk_account_pk
+        );
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS message_fts_moderation
+        AFTER INSERT ON moderation
+    BEGIN
+        DELETE FROM message_fts WHERE rowid IN (
+            SELECT pk FROM message
+            WHERE message.stanza_id = new.stanza_id
+            AND message.fk_remote_pk = new.fk_remote_pk
+            AND message.fk_account_pk = new.fk_account_pk
+        );
+    END''',
+]
+
+MESSAGE_FTS_REBUILD = [
+    'DELETE FROM message_fts',
+    '''INSERT INTO message_fts(rowid, text)
+        SELECT pk, text FROM message
+        WHERE text IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM moderation
+            WHERE moderation.stanza_id = message.stanza_id
+            AND moderation.fk_remote_pk = message.fk_remote_pk
+            AND moderation.fk_account_pk = message.fk_account_pk
+        )''',
+    "INSERT INTO message_fts(message_fts) VALUES('optimize')",
+]
@@ -12,11 +12,18 @@
 import logging
 import pprint
 import shutil
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
 from collections.abc import Iterator
 from collections.abc import Sequence
+from dataclasses import dataclass
+from dataclasses import field
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
+from functools import partial
 from pathlib import Path
 
 import sqlalchemy as sa
@@ -27,6 +34,7 @@
 from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
 from sqlalchemy.orm import Session
 
 from gajim.common import app
@@ -40,11 +48,16 @@
 from gajim.common.storage.archive.const import MessageType
 from gajim.common.storage.archive.models import Account
 from gajim.common.storage.archive.models import Base
+from gajim.common.storage.archive.models import Encryption
 from gajim.common.storage.archive.models import MAMArchiveState
 from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.models import message_fts
+from gajim.common.storage.archive.models import MESSAGE_FTS_SCHEMA
 from gajim.common.storage.archive.models import MessageError
 from gajim.common.storage.archive.models import Moderation
+from gajim.common.storage.archive.models import Occupant
 from gajim.common.storage.archive.models import Remote
+from gajim.common.storage.archive.models import SecurityLabel
 from gajim.common.storage.archive.models import Thread
 from gajim.common.storage.base import AlchemyStorage
 from gajim.common.storage.base import timeit
@@ -52,12 +65,54 @@
 from gajim.common.storage.base import with_session
 from gajim.common.util.datetime import FIRST_UTC_DATETIME
 
-CURRENT_USER_VERSION = 10
+CURRENT_USER_VERSION = 11
+
+# Messages removed per transaction by the history cleanup
+CLEANUP_CHUNK_SIZE = 500
 
 
 log = logging.getLogger('gajim.c.storage.archive')
 
 
+@dataclass
+class HistoryCleanupStats:
+    messages: int = 0
+    corrections: int = 0
+    errors: int = 0
+    moderations: int = 0
+    chunks: int = 0
+    duration: float = 0
+    complete: bool = False
+
+    def add(self, other: HistoryCleanupStats) -> None:
+        self.messages += other.messages
+        self.corrections += other.corrections
+        self.errors += other.errors
+        self.moderations += other.moderations
+        self.chunks += 1
+
+
+@dataclass
+class _HistoryCleanup:
+    pending: deque[tuple[str, datetime]]
+    chunk_size: int
+    callback: Callable[[HistoryCleanupStats], Any] | None
+    stats: HistoryCleanupStats = field(default_factory=HistoryCleanupStats)
+    start: float = field(default_factory=time.monotonic)
+
+
+def build_fts_query(query: str) -> str | None:
+    '''
+    Convert a user search string into a FTS5 query, every word is
+    quoted and matched as prefix, all words must match
+    '''
+
+    words = [word.replace('"', '""') for word in query.split()]
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
 class MessageArchiveStorage(AlchemyStorage):
     def __init__(self, in_memory: bool = False, path: Path | None = None) -> None:
         if path is None:
@@ -76,11 +131,23 @@ def __init__(self, in_memory: bool = False, path: Path | None = None) -> None:
         self._account_pks: dict[str, int] = {}
         self._jid_pks: dict[JID, int] = {}
 
+        self._cleanup_cancelled = threading.Event()
+        self._last_cleanup_stats: HistoryCleanupStats | None = None
+
+        # The pk caches are shared with the storage worker thread
+        self._pk_lock = threading.RLock()
+
     def init(self) -> None:
         super().init()
         with self._session as s:
             self._load_jids(s)
 
+    def shutdown(self) -> None:
+        # Stop a running history cleanup after the current chunk, it
+        # continues on the next start
+        self._cleanup_cancelled.set()
+        super().shutdown()
+
     def _log_row(self, row: Any) -> None:
         if self._log.getEffectiveLevel() != logging.DEBUG:
             return
@@ -88,6 +155,8 @@ def _log_row(self, row: Any) -> None:
 
     def _create_table(self, session: Session, engine: Engine) -> None:
         Base.metadata.create_all(engine)
+        for stmt in MESSAGE_FTS_SCHEMA:
+            session.execute(sa.text(stmt))
         session.execute(sa.text(f'PRAGMA user_version={CURRENT_USER_VERSION}'))
 
     def _make_backup(self) -> None:
@@ -113,6 +182,14 @@ def _get_account_pk(self, session: Session, account: str) -> int:
         if pk is not None:
             return pk
 
+        with self._pk_lock:
+            return self._add_account_pk(session, account)
+
+    def _add_account_pk(self, session: Session, account: str) -> int:
+        pk = self._account_pks.get(account)
+        if pk is not None:
+            return pk
+
         jid_str = app.get_jid_from_account(account)
         jid = JID.from_string(jid_str)
 
@@ -131,6 +208,14 @@ def _get_jid_pk(self, session: Session, jid: JID) -> int:
         if pk is not None:
             return pk
 
+        with self._pk_lock:
+            return self._add_jid_pk(session, jid)
+
+    def _add_jid_pk(self, session: Session, jid: JID) -> int:
+        pk = self._jid_pks.get(jid)
+        if pk is not None:
+            return pk
+
         jid_row = Remote(jid=jid)
         session.add(jid_row)
         session.flush()
@@ -212,6 +297,228 @@ def insert_object(
 
         return obj.pk
 
+    @with_session
+    @timeit
+    def insert_mam_page(
+        self,
+        session: Session,
+        account: str,
+        messages: list[Message],
+        archive_state: MAMArchiveState | None = None,
+    ) -> list[int]:
+        '''
+        Insert all messages of a MAM result page and the archive state
+        checkpoint of the page in one transaction.
+
+        Messages with a stanza-id which already exists in the archive or
+        earlier in the page are skipped.
+
+        returns the pk for each message or -1 if it was skipped
+        '''
+
+        fk_account_pk = self._get_account_pk(session, account)
+
+        jids: set[JID] = set()
+        for message in messages:
+            jids.add(message.remote_jid_)
+            if message.occupant_ is not None:
+                real_remote_jid = message.occupant_.real_remote_jid_
+                if isinstance(real_remote_jid, JID):
+                    jids.add(real_remote_jid)
+
+        self._get_jid_pks(session, jids)
+
+        existing = self._get_existing_stanza_ids(session, fk_account_pk, messages)
+
+        pks = [-1] * len(messages)
+        new_messages: list[tuple[int, Message]] = []
+        for index, message in enumerate(messages):
+            fk_remote_pk = self._jid_pks[message.remote_jid_]
+            if message.stanza_id is not None:
+                key = (fk_remote_pk, message.stanza_id)
+                if key in existing:
+                    self._log.info(
+                        'Skip duplicated message from MAM: %s', message.stanza_id
+                    )
+                    continue
+                existing.add(key)
+
+            new_messages.append((index, message))
+
+        self._set_batch_foreign_keys(
+            session, fk_account_pk, [message for _, message in new_messages]
+        )
+
+        try:
+            with session.begin_nested():
+                session.add_all([message for _, message in new_messages])
+                session.flush()
+
+        except IntegrityError:
+            self._log.warning('Failed to insert MAM page, insert messages one by one')
+            for index, message in new_messages:
+                try:
+                    with session.begin_nested():
+                        session.add(message)
+                        session.flush()
+                except IntegrityError:
+                    self._log.warning('Failed to insert message: %s', message)
+                    continue
+
+                pks[index] = message.pk
+
+        else:
+            for index, message in new_messages:
+                pks[index] = message.pk
+
+        if archive_state is not None:
+            self._upsert_row(session, archive_state)
+
+        return pks
+
+    def _get_jid_pks(self, session: Session, jids: set[JID]) -> None:
+        missing = [jid for jid in jids if jid not in self._jid_pks]
+        if not missing:
+            return
+
+        with self._pk_lock:
+            missing = [jid for jid in missing if jid not in self._jid_pks]
+            if not missing:
+                return
+
+            session.execute(
+                insert(Remote).on_conflict_do_nothing(),
+                [{'jid': jid} for jid in missing],
+            )
+
+            stmt = select(Remote.jid, Remote.pk).where(Remote.jid.in_(missing))
+            for jid, pk in session.execute(stmt):
+                self._jid_pks[jid] = pk
+
+    def _get_existing_stanza_ids(
+        self, session: Session, fk_account_pk: int, messages: list[Message]
+    ) -> set[tuple[int, str]]:
+        stanza_ids = {m.stanza_id for m in messages if m.stanza_id is not None}
+        if not stanza_ids:
+            return set()
+
+        stmt = select(Message.fk_remote_pk, Message.stanza_id).where(
+            Message.stanza_id.in_(stanza_ids),
+            Message.fk_account_pk == fk_account_pk,
+        )
+
+        self._explain(session, stmt)
+        return {(row.fk_remote_pk, row.stanza_id) for row in session.execute(stmt)}
+
+    def _set_batch_foreign_keys(
+        self, session: Session, fk_account_pk: int, messages: list[Message]
+    ) -> None:
+        '''
+        Same as _set_foreign_keys() but resolves every distinct encryption,
+        thread, occupant and security label of the batch only once
+        '''
+
+        encryptions: dict[tuple[int, str, int], Encryption] = {}
+        threads: dict[tuple[int, str], Thread] = {}
+        occupants: dict[tuple[int, str], Occupant] = {}
+        labels: dict[tuple[int, str], SecurityLabel] = {}
+
+        for message in messages:
+            fk_remote_pk = self._jid_pks[message.remote_jid_]
+            message.fk_account_pk = fk_account_pk
+            message.fk_remote_pk = fk_remote_pk
+
+            if message.encryption_ is not None:
+                encryption = message.encryption_
+                key = (encryption.protocol, encryption.key, encryption.trust)
+                encryptions.setdefault(key, encryption)
+
+            if message.thread_id_ is not None:
+                threads.setdefault(
+                    (fk_remote_pk, message.thread_id_),
+                    Thread(
+                        fk_account_pk=fk_account_pk,
+                        fk_remote_pk=fk_remote_pk,
+                        id=message.thread_id_,
+                    ),
+                )
+
+            if message.occupant_ is not None:
+                key = (fk_remote_pk, message.occupant_.id)
+                occupants[key] = self._merge_occupant(
+                    occupants.get(key), message.occupant_
+                )
+
+            if message.security_label_ is not None:
+                label = message.security_label_
+                key = (fk_remote_pk, label.label_hash)
+                existing = labels.get(key)
+                if existing is None or existing.updated_at < label.updated_at:
+                    labels[key] = label
+
+        encryption_pks = {
+            key: self._insert_row(session, encryption, return_pk_on_conflict=True)
+            for key, encryption in encryptions.items()
+        }
+
+        thread_pks = {
+            key: self._insert_row(session, thread, return_pk_on_conflict=True)
+            for key, thread in threads.items()
+        }
+
+        occupant_pks = {
+            key: self._upsert_row(session, occupant)
+            for key, occupant in occupants.items()
+        }
+
+        label_pks = {
+            key: self._upsert_row(session, label) for key, label in labels.items()
+        }
+
+        for message in messages:
+            fk_remote_pk = message.fk_remote_pk
+            message.account_ = None  # pyright: ignore
+            message.remote_jid_ = None  # pyright: ignore
+
+            if message.encryption_ is not None:
+                encryption = message.encryption_
+                key = (encryption.protocol, encryption.key, encryption.trust)
+                message.fk_encryption_pk = encryption_pks[key]
+                message.encryption_ = None
+
+            if message.thread_id_ is not None:
+                message.fk_thread_pk = thread_pks[(fk_remote_pk, message.thread_id_)]
+                message.thread_id_ = None
+
+            if message.occupant_ is not None:
+                key = (fk_remote_pk, message.occupant_.id)
+                message.fk_occupant_pk = occupant_pks[key]
+                message.occupant_ = None
+
+            if message.security_label_ is not None:
+                key = (fk_remote_pk, message.security_label_.label_hash)
+                message.fk_security_label_pk = label_pks[key]
+                message.security_label_ = None
+
+            self._log_row(message)
+
+    @staticmethod
+    def _merge_occupant(existing: Occupant | None, occupant: Occupant) -> Occupant:
+        if existing is None:
+            return occupant
+
+        newer, older = occupant, existing
+        if existing.updated_at > occupant.updated_at:
+            newer, older = existing, occupant
+
+        if newer.real_remote_jid_ is VALUE_MISSING:
+            newer.real_remote_jid_ = older.real_remote_jid_
+
+        if newer.avatar_sha is VALUE_MISSING:
+            newer.avatar_sha = older.avatar_sha
+
+        return newer
+
     @with_session
     @timeit
     def insert_row(
@@ -441,6 +748,8 @@ def get_conversation_before_after(
         before: bool,
         timestamp: datetime,
         n_lines: int,
+        *,
+        pk: int | None = None,
     ) -> Sequence[Message]:
         '''
         Load n messages from jid before or after timestamp
@@ -455,6 +764,10 @@ def get_conversation_before_after(
             The point in time from where to search
         :param nlines:
             The maximal count of Message returned
+        :param pk:
+            The pk of the message at timestamp, if given (timestamp, pk)
+            is used as cursor, so messages with the same timestamp
+            are neither skipped nor returned twice
         '''
 
         fk_account_pk = self._get_account_pk(session, account)
@@ -467,11 +780,25 @@ def get_conversation_before_after(
         )
 
         if before:
-            stmt = stmt.where(Message.timestamp < timestamp).order_by(
+            if pk is None:
+                cursor = Message.timestamp < timestamp
+            else:
+                cursor = sa.or_(
+                    Message.timestamp < timestamp,
+                    sa.and_(Message.timestamp == timestamp, Message.pk < pk),
+                )
+            stmt = stmt.where(cursor).order_by(
                 sa.desc(Message.timestamp), sa.desc(Message.pk)
             )
         else:
-            stmt = stmt.where(Message.timestamp > timestamp).order_by(
+            if pk is None:
+                cursor = Message.timestamp > timestamp
+            else:
+                cursor = sa.or_(
+                    Message.timestamp > timestamp,
+                    sa.and_(Message.timestamp == timestamp, Message.pk > pk),
+                )
+            stmt = stmt.where(cursor).order_by(
                 Message.timestamp, Message.pk
             )
 
@@ -512,6 +839,66 @@ def get_last_conversation_row(
         self._explain(session, stmt)
         return session.scalar(stmt)
 
+    @with_session
+    @timeit
+    def get_last_conversation_rows(
+        self, session: Session, chats: Sequence[tuple[str, JID]]
+    ) -> dict[tuple[str, JID], Message]:
+        '''
+        Load the last line of multiple conversations with one query,
+        see get_last_conversation_row().
+
+        :param chats:   A list of (account, jid) tuples
+
+        returns a dict with the last message per (account, jid), conversations
+        without messages are missing
+        '''
+
+        keys: dict[tuple[int, int], tuple[str, JID]] = {}
+        for account, jid in chats:
+            fk_remote_pk = self._jid_pks.get(jid)
+            if fk_remote_pk is None:
+                # Never stored a message of this jid
+                continue
+
+            fk_account_pk = self._get_account_pk(session, account)
+            keys[(fk_account_pk, fk_remote_pk)] = (account, jid)
+
+        if not keys:
+            return {}
+
+        chat_values = sa.values(
+            sa.column('fk_account_pk', sa.Integer),
+            sa.column('fk_remote_pk', sa.Integer),
+            name='chats',
+        ).data(list(keys)).cte()
+
+        # Every chat is looked up through idx_message_corrections, instead of
+        # ranking all messages of all chats with a window function
+        last_message = aliased(Message)
+        last_pk = (
+            select(last_message.pk)
+            .where(
+                last_message.fk_account_pk == chat_values.c.fk_account_pk,
+                last_message.fk_remote_pk == chat_values.c.fk_remote_pk,
+                last_message.correction_id.is_(None),
+            )
+            .order_by(sa.desc(last_message.timestamp), sa.desc(last_message.pk))
+            .limit(1)
+            .correlate(chat_values)
+            .scalar_subquery()
+        )
+
+        stmt = select(Message).where(
+            Message.pk.in_(select(last_pk).select_from(chat_values))
+        )
+
+        self._explain(session, stmt)
+        return {
+            keys[(message.fk_account_pk, message.fk_remote_pk)]: message
+            for message in session.scalars(stmt)
+        }
+
     @with_session
     @timeit
     def get_last_correctable_message(
@@ -613,11 +1000,12 @@ def search_archive(
 
         :param after: A datetime.datetime instance or None
 
+        Results are ordered by relevance, each word of `query` is matched
+        as a prefix. A match in a correction returns the corrected message.
+
         returns a list of namedtuples
         '''
 
-        # TODO: Does not search in corrections
-
         if before is None:
             before = datetime.now(timezone.utc)
 
@@ -632,7 +1020,21 @@ def search_archive(
         if jid is not None:
             fk_remote_pk = self._get_jid_pk(session, jid)
 
-        stmt = select(Message)
+        fts_query = build_fts_query(query)
+        if fts_query is None:
+            stmt = select(Message).where(Message.correction_id.is_(None))
+            order_by = (sa.desc(Message.timestamp), sa.desc(Message.pk))
+
+        else:
+            matches = self._get_fts_matches_stmt(
+                fts_query, fk_account_pk, fk_remote_pk
+            ).subquery()
+            stmt = select(Message).join(matches, Message.pk == matches.c.message_pk)
+            order_by = (
+                matches.c.rank,
+                sa.desc(Message.timestamp),
+                sa.desc(Message.pk),
+            )
 
         if fk_account_pk is not None:
             stmt = stmt.where(Message.fk_account_pk == fk_account_pk)
@@ -644,18 +1046,84 @@ def search_archive(
             lowercase_users = list(map(str.lower, from_users))
             stmt = stmt.where(sa.func.lower(Message.resource).in_(lowercase_users))
 
+        is_moderated = (
+            select(Moderation.pk)
+            .where(
+                Moderation.stanza_id == Message.stanza_id,
+                Moderation.fk_remote_pk == Message.fk_remote_pk,
+                Moderation.fk_account_pk == Message.fk_account_pk,
+            )
+            .exists()
+        )
+
         stmt = (
             stmt.where(
-                Message.text.ilike(f'%{query}%'),
                 Message.timestamp.between(after, before),
+                ~is_moderated,
             )
-            .order_by(sa.desc(Message.timestamp), sa.desc(Message.pk))
+            .order_by(*order_by)
             .execution_options(yield_per=25)
         )
 
         self._explain(session, stmt)
         yield from session.scalars(stmt)
 
+    @staticmethod
+    def _get_fts_matches_stmt(
+        fts_query: str,
+        fk_account_pk: int | None,
+        fk_remote_pk: int | None,
+    ) -> sa.Select[Any]:
+        '''
+        Select (pk, rank) of all messages matching `fts_query`, matches
+        in corrections are mapped to the pk of the corrected message
+        '''
+
+        hit = aliased(Message)
+        original = aliased(Message)
+
+        # Same conditions as in get_corrected_message()
+        original_pk = (
+            select(original.pk)
+            .where(
+                original.id == hit.correction_id,
+                original.fk_remote_pk == hit.fk_remote_pk,
+                original.fk_account_pk == hit.fk_account_pk,
+                original.fk_occupant_pk.is_(hit.fk_occupant_pk),
+                original.direction == hit.direction,
+                original.correction_id.is_(None),
+                sa.or_(
+                    hit.type != MessageType.GROUPCHAT,
+                    hit.fk_occupant_pk.isnot(None),
+                    original.resource == hit.resource,
+                ),
+            )
+            .order_by(sa.desc(original.timestamp))
+            .limit(1)
+            .scalar_subquery()
+        )
+
+        message_pk = sa.case(
+            (hit.correction_id.is_(None), hit.pk),
+            else_=original_pk,
+        ).label('message_pk')
+
+        stmt = (
+            select(message_pk, sa.func.min(message_fts.c.rank).label('rank'))
+            .select_from(message_fts)
+            .join(hit, hit.pk == message_fts.c.rowid)
+            .where(sa.literal_column('message_fts').op('MATCH')(fts_query))
+            .group_by(message_pk)
+        )
+
+        if fk_account_pk is not None:
+            stmt = stmt.where(hit.fk_account_pk == fk_account_pk)
+
+        if fk_remote_pk is not None:
+            stmt = stmt.where(hit.fk_remote_pk == fk_remote_pk)
+
+        return stmt
+
     @with_session
     @timeit
     def get_days_containing_messages(
@@ -929,31 +1397,157 @@ def remove_account(self, session: Session, account: str) -> None:
 
         self._account_pks.pop(account)
 
-    @with_session
-    @timeit
-    def cleanup_chat_history(self, session: Session) -> None:
+    def cleanup_chat_history(
+        self,
+        chunk_size: int = CLEANUP_CHUNK_SIZE,
+        callback: Callable[[HistoryCleanupStats], Any] | None = None,
+    ) -> None:
         '''
-        Remove messages from account where messages are older than max_age
+        Remove messages from account where messages are older than max_age.
+
+        Messages are removed in chunks, every chunk is deleted in its own
+        transaction by its own job on the storage worker. The next chunk
+        is queued when the previous one is done, so other jobs like history
+        requests are not blocked until the whole cleanup is finished.
+        `callback` is called with the stats afterwards.
         '''
+
+        now = datetime.now(timezone.utc)
+        pending: deque[tuple[str, datetime]] = deque()
         for account in app.settings.get_accounts():
             max_age = app.settings.get_account_setting(account, 'chat_history_max_age')
             if max_age == -1:
                 continue
 
-            fk_account_pk = self._get_account_pk(session, account)
+            pending.append((account, now - timedelta(seconds=max_age)))
 
-            now = datetime.now(timezone.utc)
-            threshold = now - timedelta(seconds=max_age)
+        self._cleanup_next_chunk(_HistoryCleanup(pending, chunk_size, callback))
 
-            stmt = select(Message).where(
-                Message.fk_account_pk == fk_account_pk, Message.timestamp < threshold
-            )
+    def _cleanup_next_chunk(self, cleanup: _HistoryCleanup) -> None:
+        if not cleanup.pending or self._cleanup_cancelled.is_set():
+            self._finish_cleanup(cleanup)
+            return
 
-            for message in session.scalars(stmt).unique().all():
-                self._delete_message(session, message)
+        account, threshold = cleanup.pending[0]
+        self.run_async(
+            self._remove_expired_messages,
+            account,
+            threshold,
+            cleanup.chunk_size,
+            callback=partial(self._on_cleanup_chunk_removed, cleanup),
+            error_callback=partial(self._on_cleanup_error, cleanup),
+        )
 
+    def _on_cleanup_chunk_removed(
+        self, cleanup: _HistoryCleanup, removed: HistoryCleanupStats
+    ) -> None:
+        cleanup.stats.add(removed)
+        account, threshold = cleanup.pending[0]
+        log.debug(
+            'Cleanup %s: %s messages removed so far',
+            account,
+            cleanup.stats.messages,
+        )
+        if removed.messages < cleanup.chunk_size:
+            cleanup.pending.popleft()
             log.info('Removed messages older then %s', threshold.isoformat())
 
+        self._cleanup_next_chunk(cleanup)
+
+    def _on_cleanup_error(self, cleanup: _HistoryCleanup, _error: Exception) -> None:
+        cleanup.pending.clear()
+        self._finish_cleanup(cleanup, complete=False)
+
+    def _finish_cleanup(self, cleanup: _HistoryCleanup, complete: bool = True) -> None:
+        stats = cleanup.stats
+        stats.complete = complete and not self._cleanup_cancelled.is_set()
+        stats.duration = time.monotonic() - cleanup.start
+        self._last_cleanup_stats = stats
+        log.info('Cleanup finished: %s', stats)
+        if cleanup.callback is not None:
+            cleanup.callback(stats)
+
+    def get_last_cleanup_stats(self) -> HistoryCleanupStats | None:
+        return self._last_cleanup_stats
+
+    @with_session
+    @timeit
+    def _remove_expired_messages(
+        self, session: Session, account: str, threshold: datetime, limit: int
+    ) -> HistoryCleanupStats:
+        fk_account_pk = self._get_account_pk(session, account)
+
+        stmt = (
+            select(Message.pk)
+            .where(Message.fk_account_pk == fk_account_pk, Message.timestamp < threshold)
+            .order_by(Message.pk)
+            .limit(limit)
+        )
+        pks = session.scalars(stmt).all()
+
+        stats = HistoryCleanupStats()
+        if not pks:
+            return stats
+
+        expired = aliased(Message)
+
+        stmt = delete(MessageError).where(
+            select(expired.pk)
+            .where(
+                expired.pk.in_(pks),
+                expired.id == MessageError.message_id,
+                expired.fk_remote_pk == MessageError.fk_remote_pk,
+                expired.fk_account_pk == MessageError.fk_account_pk,
+            )
+            .exists()
+        )
+        stats.errors = session.execute(stmt).rowcount
+
+        stmt = delete(Moderation).where(
+            select(expired.pk)
+            .where(
+                expired.pk.in_(pks),
+                expired.stanza_id == Moderation.stanza_id,
+                expired.fk_remote_pk == Moderation.fk_remote_pk,
+                expired.fk_account_pk == Moderation.fk_account_pk,
+            )
+            .exists()
+        )
+        stats.moderations = session.execute(stmt).rowcount
+
+        # Same conditions as the Message.corrections relationship
+        stmt = delete(Message).where(
+            Message.correction_id.is_not(None),
+            Message.pk.not_in(pks),
+            select(expired.pk)
+            .where(
+                expired.pk.in_(pks),
+                expired.id == Message.correction_id,
+                expired.fk_remote_pk == Message.fk_remote_pk,
+                expired.fk_account_pk == Message.fk_account_pk,
+                expired.fk_occupant_pk.is_(Message.fk_occupant_pk),
+                expired.direction == Message.direction,
+                sa.case(
+                    (
+                        sa.and_(
+                            expired.type == MessageType.GROUPCHAT,
+                            expired.fk_occupant_pk.is_(None),
+                        ),
+                        expired.resource == Message.resource,
+                    ),
+                    else_=True,
+                ),
+            )
+            .exists()
+        )
+        stats.corrections = session.execute(stmt).rowcount
+
+        # Dependent rows (calls, file transfers, oob, replies) are removed
+        # by ON DELETE CASCADE, the search index by its trigger
+        stmt = delete(Message).where(Message.pk.in_(pks))
+        stats.messages = session.execute(stmt).rowcount
+        return stats
+
     @with_session
     @timeit
     def get_messages_for_export(
@@ -15,10 +15,13 @@
 import math
 import os
 import pprint
+import queue
 import sqlite3
 import sys
+import threading
 import time
 from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime
 from datetime import timezone
 from pathlib import Path
@@ -49,6 +52,13 @@
 P = ParamSpec('P')
 R = TypeVar('R')
 
+# Seconds between idle maintenance runs
+MAINTENANCE_INTERVAL = 600
+# Free pages returned to the file system per idle maintenance run
+INCREMENTAL_VACUUM_PAGES = 256
+# Share of free pages above which a full VACUUM is run on shutdown
+VACUUM_FREE_PAGES_THRESHOLD = 0.25
+
 
 class ValueMissingT:
     pass
@@ -309,6 +319,96 @@ def shutdown(self) -> None:
         del self._con
 
 
+_WorkerJob = tuple[
+    Callable[..., Any],
+    tuple[Any, ...],
+    dict[str, Any],
+    Callable[[Any], Any] | None,
+    Callable[[Exception], Any] | None,
+]
+
+
+class StorageWorker:
+    '''
+    Runs storage jobs one after another on a dedicated thread and hands
+    the results back to the GLib main loop
+    '''
+
+    def __init__(self) -> None:
+        self._queue: queue.SimpleQueue[_WorkerJob | None] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        func: Callable[..., R],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+        callback: Callable[[R], Any] | None,
+        error_callback: Callable[[Exception], Any] | None,
+    ) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='StorageWorker', daemon=True
+                )
+                self._thread.start()
+
+            self._queue.put((func, args, kwargs, callback, error_callback))
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            func, args, kwargs, callback, error_callback = job
+            try:
+                result = func(*args, **kwargs)
+            except Exception as error:
+                log.exception('Storage job %s failed', func.__name__)
+                if error_callback is not None:
+                    GLib.idle_add(_dispatch_result, error_callback, error)
+                continue
+
+            if callback is not None:
+                GLib.idle_add(_dispatch_result, callback, result)
+
+    def shutdown(self) -> None:
+        '''
+        Wait until all queued jobs are processed and stop the thread
+        '''
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+
+            self._thread = None
+            self._queue.put(None)
+
+        thread.join()
+
+
+def _dispatch_result(callback: Callable[[Any], Any], result: Any) -> bool:
+    callback(result)
+    return GLib.SOURCE_REMOVE
+
+
+# All storages share one worker so that jobs are executed in the order
+# they were submitted, even if they touch different databases.
+_worker = StorageWorker()
+
+
+@dataclass
+class MaintenanceStats:
+    page_count: int
+    freelist_count: int
+    freed_pages: int
+    full_vacuum: bool
+    duration: float
+    finished_at: datetime
+
+
 class AlchemyStorage:
     def __init__(
         self,
@@ -322,6 +422,8 @@ def __init__(
         self._session = self._create_session()
         self._commit_source_id = None
         self._pragma = pragma or {}
+        self._maintenance_source_id: int | None = None
+        self._maintenance_stats: MaintenanceStats | None = None
 
     def init(self) -> None:
         if self._path is None or not self._path.exists():
@@ -332,6 +434,11 @@ def init(self) -> None:
 
         self._migrate_storage()
 
+        if self._path is not None and self._maintenance_source_id is None:
+            self._maintenance_source_id = GLib.timeout_add_seconds(
+                MAINTENANCE_INTERVAL, self._on_maintenance_timeout
+            )
+
     def get_session(self) -> Session:
         return self._session
 
@@ -343,6 +450,9 @@ def _set_sqlite_pragma(
     ) -> None:
         cursor = dbapi_connection.cursor()
         cursor.execute('PRAGMA foreign_keys=ON')
+        # Takes effect on new databases, existing ones are converted
+        # with the next full VACUUM
+        cursor.execute('PRAGMA auto_vacuum=INCREMENTAL')
 
         for key, value in self._pragma.items():
             cursor.execute(f'PRAGMA {key}={value}')
@@ -355,7 +465,64 @@ def _run_analyze(self) -> None:
             cursor = connection.cursor()
             cursor.execute('PRAGMA analysis_limit=400')
             cursor.execute('PRAGMA optimize')
-            cursor.execute('VACUUM')
+
+    def _on_maintenance_timeout(self) -> bool:
+        self.run_async(self.run_maintenance)
+        return True
+
+    def run_maintenance(self, allow_full_vacuum: bool = False) -> MaintenanceStats:
+        '''
+        Return free pages to the file system.
+
+        With auto_vacuum=INCREMENTAL a limited number of pages is freed,
+        which is cheap enough to run while Gajim is idle. A full VACUUM
+        rewrites the whole file, it is only run if allowed and the share
+        of free pages is above the threshold, or to convert a database
+        which was created without incremental auto_vacuum.
+        '''
+
+        start = time.monotonic()
+        with self._create_session() as s:
+            connection = s.connection().connection.dbapi_connection
+            assert connection is not None
+            cursor = connection.cursor()
+
+            auto_vacuum = cursor.execute('PRAGMA auto_vacuum').fetchone()[0]
+            page_count = cursor.execute('PRAGMA page_count').fetchone()[0]
+            freelist_count = cursor.execute('PRAGMA freelist_count').fetchone()[0]
+
+            fragmentation = freelist_count / page_count if page_count else 0
+            full_vacuum = allow_full_vacuum and (
+                fragmentation > VACUUM_FREE_PAGES_THRESHOLD
+                or (auto_vacuum != 2 and freelist_count > INCREMENTAL_VACUUM_PAGES)
+            )
+
+            if full_vacuum:
+                cursor.execute('VACUUM')
+            elif auto_vacuum == 2 and freelist_count:
+                cursor.execute(
+                    f'PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES})'
+                ).fetchall()
+
+            freed_pages = (
+                freelist_count
+                - cursor.execute('PRAGMA freelist_count').fetchone()[0]
+            )
+
+        stats = MaintenanceStats(
+            page_count=page_count,
+            freelist_count=freelist_count,
+            freed_pages=freed_pages,
+            full_vacuum=full_vacuum,
+            duration=time.monotonic() - start,
+            finished_at=datetime.now(timezone.utc),
+        )
+        self._maintenance_stats = stats
+        self._log.info('Maintenance finished: %s', stats)
+        return stats
+
+    def get_maintenance_stats(self) -> MaintenanceStats | None:
+        return self._maintenance_stats
 
     def _get_user_version(self) -> int:
         with self._session as s:
@@ -415,6 +582,40 @@ def _migrate_storage(self) -> None:
     def _migrate(self) -> None:
         raise NotImplementedError
 
+    def run_async(
+        self,
+        func: Callable[P, R],
+        *args: P.args,
+        callback: Callable[[R], Any] | None = None,
+        error_callback: Callable[[Exception], Any] | None = None,
+        **kwargs: P.kwargs,
+    ) -> None:
+        '''
+        Execute `func` on the storage worker thread. Jobs are executed in
+        the order they are submitted, `callback` is called with the result
+        from the main loop.
+
+        `func` must not touch GTK, every storage method called from it
+        uses its own session.
+        '''
+
+        if self._path is not None:
+            _worker.submit(func, args, kwargs, callback, error_callback)
+            return
+
+        # In memory databases live inside the connection of the thread
+        # which created them, so the job has to run right away.
+        try:
+            result = func(*args, **kwargs)
+        except Exception as error:
+            self._log.exception('Storage job %s failed', func.__name__)
+            if error_callback is not None:
+                error_callback(error)
+            return
+
+        if callback is not None:
+            callback(result)
+
     def _explain(self, session: Session, stmt: Any) -> None:
         if not os.environ.get('GAJIM_EXPLAIN'):
             return
@@ -428,7 +629,14 @@ def _explain(self, session: Session, stmt: Any) -> None:
         log.debug('\n%s\n%s', stmt, explanation)
 
     def shutdown(self) -> None:
+        if self._maintenance_source_id is not None:
+            GLib.source_remove(self._maintenance_source_id)
+            self._maintenance_source_id = None
+
+        _worker.shutdown()
         self._run_analyze()
+        if self._path is not None:
+            self.run_maintenance(allow_full_vacuum=True)
         self._engine.dispose()
         del self._session
         del self._engine
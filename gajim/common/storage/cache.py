@@ -14,6 +14,8 @@
 from collections import defaultdict
 from collections import namedtuple
 
+from nbxmpp.modules.discovery import parse_disco_info
+from nbxmpp.protocol import Iq
 from nbxmpp.protocol import JID
 from nbxmpp.structs import DiscoInfo
 from nbxmpp.structs import RosterItem
@@ -26,7 +28,7 @@
 
 ContactCacheDictT = dict[tuple[str, JID], dict[str, Any]]
 
-CURRENT_USER_VERSION = 10
+CURRENT_USER_VERSION = 11
 
 CACHE_SQL_STATEMENT = '''
     CREATE TABLE caps_cache (
@@ -41,8 +43,14 @@
             last_seen INTEGER
     );
     CREATE TABLE roster(
+            account TEXT,
+            jid TEXT,
+            item TEXT,
+            PRIMARY KEY (account, jid)
+    );
+    CREATE TABLE roster_version(
             account TEXT PRIMARY KEY UNIQUE,
-            roster TEXT
+            version TEXT
     );
     CREATE TABLE muc(
             account TEXT,
@@ -96,6 +104,9 @@ def __init__(self, in_memory: bool = False):
 
         self._entity_caps_cache: dict[tuple[str, str], DiscoInfo] = {}
         self._disco_info_cache: dict[JID, DiscoInfo] = {}
+        # Serialized DiscoInfo from the database, parsed on first access
+        self._raw_caps_cache: dict[tuple[str, str], str] = {}
+        self._raw_disco_info_cache: dict[str, tuple[str, int]] = {}
         self._muc_cache: ContactCacheDictT = defaultdict(dict)
         self._contact_cache: ContactCacheDictT = defaultdict(dict)
 
@@ -135,14 +146,45 @@ def _migrate(self) -> None:
             self._reinit_storage()
             return
 
+        if user_version < 11:
+            # The roster is stored per item, it is requested again
+            # completely because no version is stored yet
+            statements = [
+                'DROP TABLE roster',
+                '''CREATE TABLE roster(
+                    account TEXT,
+                    jid TEXT,
+                    item TEXT,
+                    PRIMARY KEY (account, jid))''',
+                '''CREATE TABLE roster_version(
+                    account TEXT PRIMARY KEY UNIQUE,
+                    version TEXT)''',
+                'PRAGMA user_version=11',
+            ]
+            self._execute_multiple(statements)
+
+    def _get_plain_cursor(self) -> sqlite3.Cursor:
+        # Creating a namedtuple class for every row is too slow for
+        # loading whole tables
+        cursor = self._con.cursor()
+        cursor.row_factory = None
+        return cursor
+
+    @staticmethod
+    def _parse_disco_info(data: str) -> DiscoInfo | None:
+        try:
+            return parse_disco_info(Iq(node=data))  # pyright: ignore
+        except Exception as error:
+            log.warning('Unable to parse stored DiscoInfo: %s', error)
+            return None
+
     @timeit
     def _load_caps_data(self) -> None:
-        rows = self._con.execute(
-            'SELECT hash_method, hash, data as "data [disco_info]" '
-            'FROM caps_cache')
+        cursor = self._get_plain_cursor()
+        cursor.execute('SELECT hash_method, hash, data FROM caps_cache')
 
-        for row in rows:
-            self._entity_caps_cache[(row.hash_method, row.hash)] = row.data
+        for hash_method, hash_, data in cursor:
+            self._raw_caps_cache[(hash_method, hash_)] = data
 
     @timeit
     def add_caps_entry(self,
@@ -151,8 +193,10 @@ def add_caps_entry(self,
                        hash_: str,
                        caps_data: DiscoInfo) -> None:
         self._entity_caps_cache[(hash_method, hash_)] = caps_data
+        self._raw_caps_cache.pop((hash_method, hash_), None)
 
         self._disco_info_cache[jid] = caps_data
+        self._raw_disco_info_cache.pop(str(jid), None)
 
         self._con.execute('''
             INSERT INTO caps_cache (hash_method, hash, data, last_seen)
@@ -160,8 +204,30 @@ def add_caps_entry(self,
             ''', (hash_method, hash_, caps_data, int(time.time())))
         self._delayed_commit()
 
-    def get_caps_entry(self, hash_method: str, hash_: str):
-        return self._entity_caps_cache.get((hash_method, hash_))
+    def get_caps_entry(self,
+                       hash_method: str,
+                       hash_: str
+                       ) -> DiscoInfo | None:
+
+        key = (hash_method, hash_)
+        caps_data = self._entity_caps_cache.get(key)
+        if caps_data is not None:
+            return caps_data
+
+        data = self._raw_caps_cache.pop(key, None)
+        if data is None:
+            return None
+
+        caps_data = self._parse_disco_info(data)
+        if caps_data is None:
+            self._con.execute(
+                'DELETE FROM caps_cache WHERE hash_method = ? AND hash = ?',
+                key)
+            self._delayed_commit()
+            return None
+
+        self._entity_caps_cache[key] = caps_data
+        return caps_data
 
     @timeit
     def update_caps_time(self, method: str, hash_: str) -> None:
@@ -182,15 +248,35 @@ def _clean_caps_table(self) -> None:
 
     @timeit
     def _fill_disco_info_cache(self) -> None:
-        sql = '''SELECT disco_info as "disco_info [disco_info]",
-                 jid as "jid [jid]", last_seen FROM
-                 last_seen_disco_info'''
-        rows = self._con.execute(sql).fetchall()
-        for row in rows:
-            disco_info = row.disco_info._replace(timestamp=row.last_seen)
-            self._disco_info_cache[row.jid] = disco_info
+        # JIDs are not converted, they are only needed as key
+        sql = 'SELECT jid, disco_info, last_seen FROM last_seen_disco_info'
+        cursor = self._get_plain_cursor()
+        rows = cursor.execute(sql).fetchall()
+        for jid, disco_info, last_seen in rows:
+            self._raw_disco_info_cache[jid] = (disco_info, last_seen)
         log.info('%d DiscoInfo entries loaded', len(rows))
 
+    def _get_disco_info(self, jid: JID) -> DiscoInfo | None:
+        disco_info = self._disco_info_cache.get(jid)
+        if disco_info is not None:
+            return disco_info
+
+        raw = self._raw_disco_info_cache.pop(str(jid), None)
+        if raw is None:
+            return None
+
+        data, last_seen = raw
+        disco_info = self._parse_disco_info(data)
+        if disco_info is None:
+            self._con.execute(
+                'DELETE FROM last_seen_disco_info WHERE jid = ?', (jid,))
+            self._delayed_commit()
+            return None
+
+        disco_info = disco_info._replace(timestamp=last_seen)
+        self._disco_info_cache[jid] = disco_info
+        return disco_info
+
     def get_last_disco_info(self,
                             jid: JID,
                             max_age: int = 0) -> DiscoInfo | None:
@@ -203,7 +289,7 @@ def get_last_disco_info(self,
 
         '''
 
-        disco_info = self._disco_info_cache.get(jid)
+        disco_info = self._get_disco_info(jid)
         if disco_info is not None:
             max_timestamp = time.time() - max_age if max_age else 0
             if max_timestamp > disco_info.timestamp:  # pyright: ignore
@@ -228,9 +314,11 @@ def set_last_disco_info(self,
 
         if cache_only:
             self._disco_info_cache[jid] = disco_info
+            self._raw_disco_info_cache.pop(str(jid), None)
             return
 
-        disco_exists = self.get_last_disco_info(jid) is not None
+        disco_exists = (jid in self._disco_info_cache or
+                        str(jid) in self._raw_disco_info_cache)
         if disco_exists:
             sql = '''UPDATE last_seen_disco_info SET
                      disco_info = ?, last_seen = ?
@@ -246,39 +334,80 @@ def set_last_disco_info(self,
             self._con.execute(sql, (str(jid), disco_info, disco_info.timestamp))
 
         self._disco_info_cache[jid] = disco_info
+        self._raw_disco_info_cache.pop(str(jid), None)
         self._delayed_commit()
 
-    @timeit
-    def store_roster(self, account: str, roster: dict[JID, RosterItem]) -> None:
-        serialized = json.dumps(list(roster.values()), cls=Encoder)
+    def _set_roster_version(self, account: str, version: str | None) -> None:
+        self._con.execute(
+            '''INSERT INTO roster_version (account, version) VALUES (?, ?)
+               ON CONFLICT (account) DO UPDATE SET version = excluded.version
+            ''', (account, version))
 
-        insert_sql = 'INSERT INTO roster(account, roster) VALUES(?, ?)'
-        update_sql = 'UPDATE roster SET roster = ? WHERE account = ?'
+    @timeit
+    def store_roster(self,
+                     account: str,
+                     roster: dict[JID, RosterItem],
+                     version: str | None) -> None:
+        '''
+        Replace the whole roster of an account
+        '''
+        self._con.execute('DELETE FROM roster WHERE account = ?', (account,))
+        self._con.executemany(
+            'INSERT INTO roster (account, jid, item) VALUES (?, ?, ?)',
+            [(account, str(jid), json.dumps(item, cls=Encoder))
+             for jid, item in roster.items()])
+        self._set_roster_version(account, version)
+        self._delayed_commit()
 
-        try:
-            self._con.execute(insert_sql, (account, serialized))
-        except sqlite3.IntegrityError:
-            self._con.execute(update_sql, (serialized, account))
+    @timeit
+    def update_roster_item(self,
+                           account: str,
+                           item: RosterItem,
+                           version: str | None) -> None:
+        self._con.execute(
+            '''INSERT INTO roster (account, jid, item) VALUES (?, ?, ?)
+               ON CONFLICT (account, jid) DO UPDATE SET item = excluded.item
+            ''', (account, str(item.jid), json.dumps(item, cls=Encoder)))
+        self._set_roster_version(account, version)
+        self._delayed_commit()
 
+    @timeit
+    def remove_roster_item(self,
+                           account: str,
+                           jid: JID,
+                           version: str | None) -> None:
+        self._con.execute('DELETE FROM roster WHERE account = ? AND jid = ?',
+                          (account, str(jid)))
+        self._set_roster_version(account, version)
         self._delayed_commit()
 
     @timeit
-    def load_roster(self, account: str) -> dict[JID, RosterItem] | None:
-        select_sql = 'SELECT roster FROM roster WHERE account = ?'
-        result = self._con.execute(select_sql, (account,)).fetchone()
-        if result is None:
-            return None
+    def load_roster(self, account: str) -> dict[JID, RosterItem]:
+        select_sql = 'SELECT item FROM roster WHERE account = ?'
+        cursor = self._get_plain_cursor()
+        cursor.execute(select_sql, (account,))
 
         roster: dict[JID, RosterItem] = {}
-        data = json.loads(result.roster, object_hook=json_decoder)
-        for item in data:
+        for (data,) in cursor:
+            item = json.loads(data, object_hook=json_decoder)
             roster[item.jid] = item
         return roster
 
+    def get_roster_version(self, account: str) -> str | None:
+        sql = 'SELECT version FROM roster_version WHERE account = ?'
+        row = self._con.execute(sql, (account,)).fetchone()
+        return '' if row is None else row.version
+
+    @timeit
+    def set_roster_version(self, account: str, version: str | None) -> None:
+        self._set_roster_version(account, version)
+        self._delayed_commit()
+
     @timeit
     def remove_roster(self, account: str) -> None:
-        delete_sql = 'DELETE FROM roster WHERE account = ?'
-        self._con.execute(delete_sql, (account,))
+        self._con.execute('DELETE FROM roster WHERE account = ?', (account,))
+        self._con.execute('DELETE FROM roster_version WHERE account = ?',
+                          (account,))
         self._commit()
 
     @timeit
@@ -9,6 +9,8 @@
 import datetime
 
 from nbxmpp import JID
+from sqlalchemy import ForeignKey
+from sqlalchemy import Index
 from sqlalchemy import types
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm import Mapped
@@ -28,12 +30,32 @@ class Base(DeclarativeBase):
     }
 
 
+class Account(MappedAsDataclass, Base, kw_only=True):
+    __tablename__ = 'account'
+    __table_args__ = (Index('idx_account', 'name', unique=True),)
+
+    pk: Mapped[int] = mapped_column(init=False, primary_key=True)
+    name: Mapped[str] = mapped_column()
+
+
+class Remote(MappedAsDataclass, Base, kw_only=True):
+    __tablename__ = 'remote'
+    __table_args__ = (Index('idx_remote', 'jid', unique=True),)
+
+    pk: Mapped[int] = mapped_column(init=False, primary_key=True)
+    jid: Mapped[JID] = mapped_column(JIDType)
+
+
 class Event(MappedAsDataclass, Base, kw_only=True):
     __tablename__ = 'event'
+    __table_args__ = (
+        Index('idx_event', 'fk_account_pk', 'fk_remote_pk', 'timestamp'),
+    )
 
     pk: Mapped[int] = mapped_column(primary_key=True, init=False)
-    account: Mapped[str] = mapped_column()
-    jid: Mapped[JID] = mapped_column(JIDType)
+    fk_account_pk: Mapped[int] = mapped_column(
+        ForeignKey('account.pk', ondelete='CASCADE'))
+    fk_remote_pk: Mapped[int] = mapped_column(ForeignKey('remote.pk'))
     event: Mapped[str] = mapped_column()
     timestamp: Mapped[datetime.datetime] = mapped_column(EpochTimestampType)
     data: Mapped[str] = mapped_column()
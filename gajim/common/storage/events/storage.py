@@ -12,6 +12,8 @@
 import logging
 
 import sqlalchemy as sa
+from gi.repository import GLib
+from nbxmpp.protocol import JID
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
@@ -40,40 +42,203 @@
 
 log = logging.getLogger('gajim.c.storage.events')
 
+# Milliseconds events are buffered before they are written
+FLUSH_DELAY = 500
+
+# Events kept per chat, older events are pruned when new ones are stored
+MAX_EVENTS_PER_CHAT = 5000
+
+ChatKeyT = tuple[int, int]
+
+PendingKeyT = tuple[str, JID, str]
+
+
+@dataclasses.dataclass
+class PendingEvent:
+    account: str
+    jid: JID
+    event: Any
+
 
 class EventStorage(AlchemyStorage):
-    def __init__(self):
+    def __init__(
+        self,
+        collapse_show_changes: bool = True,
+        max_age: dt.timedelta | None = None,
+        max_events_per_chat: int | None = MAX_EVENTS_PER_CHAT,
+    ) -> None:
         AlchemyStorage.__init__(
             self,
             log,
             None,
         )
 
+        self._collapse_show_changes = collapse_show_changes
+        self._max_age = max_age
+        self._max_events_per_chat = max_events_per_chat
+
+        self._account_pks: dict[str, int] = {}
+        self._remote_pks: dict[JID, int] = {}
+
+        self._pending: list[PendingEvent | None] = []
+        # Index of the last pending event of a nickname, used to collapse
+        # status/show changes which follow each other
+        self._last_pending: dict[PendingKeyT, int] = {}
+        self._flush_source_id: int | None = None
+
     def _create_table(self, session: Session, engine: Engine) -> None:
         mod.Base.metadata.create_all(engine)
-        session.execute(sa.text('PRAGMA user_version=1'))
+        session.execute(sa.text('PRAGMA user_version=2'))
 
     def _migrate(self) -> None:
         pass
 
+    def store(self, contact: ChatContactT, event_: Any) -> None:
+        '''
+        Queue the event, queued events are written together after
+        FLUSH_DELAY or when they are loaded
+        '''
+
+        pending = PendingEvent(account=contact.account,
+                               jid=contact.jid,
+                               event=event_)
+
+        nick = getattr(event_, 'nick', None)
+        if nick is None:
+            self._pending.append(pending)
+        else:
+            key = (contact.account, contact.jid, nick)
+            index = self._last_pending.get(key)
+            if (self._collapse_show_changes and
+                    index is not None and
+                    self._is_show_change(self._pending[index]) and
+                    self._is_show_change(pending)):
+                # Only the latest status of the occupant is of interest
+                self._pending[index] = None
+
+            self._last_pending[key] = len(self._pending)
+            self._pending.append(pending)
+
+        if self._flush_source_id is None:
+            self._flush_source_id = GLib.timeout_add(FLUSH_DELAY,
+                                                     self._on_flush_timeout)
+
+    @staticmethod
+    def _is_show_change(pending: PendingEvent | None) -> bool:
+        return (pending is not None and
+                isinstance(pending.event, events.MUCUserStatusShowChanged))
+
+    def _on_flush_timeout(self) -> bool:
+        self._flush_source_id = None
+        self.flush()
+        return GLib.SOURCE_REMOVE
+
+    def flush(self) -> None:
+        if self._flush_source_id is not None:
+            GLib.source_remove(self._flush_source_id)
+            self._flush_source_id = None
+
+        pending = [p for p in self._pending if p is not None]
+        self._pending.clear()
+        self._last_pending.clear()
+        if not pending:
+            return
+
+        self._insert_events(pending)
+
+    def _get_account_pk(self, session: Session, account: str) -> int:
+        pk = self._account_pks.get(account)
+        if pk is None:
+            pk = session.scalar(
+                sa.insert(mod.Account).values(name=account).returning(mod.Account.pk)
+            )
+            assert pk is not None
+            self._account_pks[account] = pk
+        return pk
+
+    def _get_remote_pk(self, session: Session, jid: JID) -> int:
+        pk = self._remote_pks.get(jid)
+        if pk is None:
+            pk = session.scalar(
+                sa.insert(mod.Remote).values(jid=jid).returning(mod.Remote.pk)
+            )
+            assert pk is not None
+            self._remote_pks[jid] = pk
+        return pk
+
     @with_session
-    def store(self, session: Session, contact: ChatContactT, event_: Any) -> None:
-        event_dict = dataclasses.asdict(event_)
-        name = event_dict.pop('name')
-        timestamp = event_dict.pop('timestamp')
-
-        event = mod.Event(
-            account=contact.account,
-            jid=contact.jid,
-            event=name,
-            timestamp=timestamp,
-            data=json.dumps(event_dict, cls=Encoder),
+    def _insert_events(self, session: Session, pending: list[PendingEvent]) -> None:
+        rows: list[dict[str, Any]] = []
+        chats: set[ChatKeyT] = set()
+        for item in pending:
+            event_dict = dataclasses.asdict(item.event)
+            name = event_dict.pop('name')
+            timestamp = event_dict.pop('timestamp')
+
+            chat = (
+                self._get_account_pk(session, item.account),
+                self._get_remote_pk(session, item.jid),
+            )
+            chats.add(chat)
+
+            rows.append({
+                'fk_account_pk': chat[0],
+                'fk_remote_pk': chat[1],
+                'event': name,
+                'timestamp': timestamp,
+                'data': json.dumps(event_dict, cls=Encoder),
+            })
+
+        session.execute(sa.insert(mod.Event), rows)
+        self._log.debug('Stored %s events', len(rows))
+
+        for chat in chats:
+            self._prune_chat(session, chat)
+
+    def _prune_chat(self, session: Session, chat: ChatKeyT) -> None:
+        '''
+        Remove events of the chat which exceed the configured age or count,
+        both conditions are answered by the idx_event index
+        '''
+
+        account_pk, remote_pk = chat
+        where = (
+            mod.Event.fk_account_pk == account_pk,
+            mod.Event.fk_remote_pk == remote_pk,
         )
 
-        session.add(event)
+        if self._max_age is not None:
+            cutoff = dt.datetime.now(dt.timezone.utc) - self._max_age
+            session.execute(
+                sa.delete(mod.Event).where(*where, mod.Event.timestamp < cutoff)
+            )
+
+        if self._max_events_per_chat is not None:
+            cutoff = session.scalar(
+                sa.select(mod.Event.timestamp)
+                .where(*where)
+                .order_by(sa.desc(mod.Event.timestamp))
+                .offset(self._max_events_per_chat - 1)
+                .limit(1)
+            )
+            if cutoff is not None:
+                session.execute(
+                    sa.delete(mod.Event).where(*where, mod.Event.timestamp < cutoff)
+                )
 
-    @with_session
     def load(
+        self,
+        contact: ChatContactT,
+        before: bool,
+        timestamp_: float,
+        n_lines: int,
+    ) -> list[events.ApplicationEvent]:
+
+        self.flush()
+        return self._load(contact, before, timestamp_, n_lines)
+
+    @with_session
+    def _load(
         self,
         session: Session,
         contact: ChatContactT,
@@ -81,10 +246,17 @@ def load(
         timestamp_: float,
         n_lines: int,
     ) -> list[events.ApplicationEvent]:
+        account_pk = self._account_pks.get(contact.account)
+        remote_pk = self._remote_pks.get(contact.jid)
+        if account_pk is None or remote_pk is None:
+            # Nothing was stored for this chat yet
+            return []
+
         timestamp = dt.datetime.fromtimestamp(timestamp_, dt.timezone.utc)
 
         stmt = sa.select(mod.Event).where(
-            mod.Event.account == contact.account, mod.Event.jid == contact.jid
+            mod.Event.fk_account_pk == account_pk,
+            mod.Event.fk_remote_pk == remote_pk,
         )
 
         if before:
@@ -97,6 +269,7 @@ def load(
             )
 
         stmt = stmt.limit(n_lines)
+        self._explain(session, stmt)
 
         event_list: list[events.ApplicationEvent] = []
 
@@ -107,3 +280,7 @@ def load(
             event_list.append(event_)
 
         return event_list
+
+    def shutdown(self) -> None:
+        self.flush()
+        AlchemyStorage.shutdown(self)
@@ -13,8 +13,10 @@
 import sqlite3
 import time
 from collections import namedtuple
+from dataclasses import dataclass
 from pathlib import Path
 
+from gi.repository import GLib
 from omemo_dr.const import OMEMOTrust
 from omemo_dr.ecc.djbec import CurvePublicKey
 from omemo_dr.ecc.djbec import DjbECPrivateKey
@@ -44,11 +46,36 @@ def _convert_record(record: bytes) -> SessionRecord:
 sqlite3.register_converter('pk', _convert_identity_key)
 sqlite3.register_converter('session_record', _convert_record)
 
+# Writes within this many milliseconds are committed together
+COMMIT_DELAY = 500
+
+SessionKeyT = tuple[str, int]
+
+
+@dataclass
+class OMEMOStorageStats:
+    session_hits: int = 0
+    session_misses: int = 0
+    session_writes: int = 0
+    commits: int = 0
+
 
 class OMEMOStorage(Store):
     def __init__(self, account: str, db_path: Path, log: LogAdapter) -> None:
         self._log = log
         self._account = account
+
+        # Deserialized session records, the records are handed out to
+        # omemo_dr which changes them in place
+        self._sessions: dict[SessionKeyT, SessionRecord] = {}
+        # Records handed out by load_session() which were not stored
+        # again afterwards
+        self._unstored_sessions: set[SessionKeyT] = set()
+        # Serialized records which are not written to the database yet
+        self._pending_sessions: dict[SessionKeyT, bytes] = {}
+        self._commit_source_id: int | None = None
+        self.stats = OMEMOStorageStats()
+
         self._con = sqlite3.connect(db_path,
                                     detect_types=sqlite3.PARSE_COLNAMES)
         self._con.row_factory = self._namedtuple_factory
@@ -64,6 +91,59 @@ def __init__(self, account: str, db_path: Path, log: LogAdapter) -> None:
             self._con.execute('PRAGMA journal_mode=MEMORY;')
         self._con.commit()
 
+    def _commit(self) -> bool:
+        self._commit_source_id = None
+        self._flush_sessions()
+        self._con.commit()
+        self.stats.commits += 1
+        return False
+
+    def _delayed_commit(self) -> None:
+        if self._commit_source_id is not None:
+            return
+
+        self._commit_source_id = GLib.timeout_add(COMMIT_DELAY, self._commit)
+
+    def _flush_sessions(self) -> None:
+        '''
+        Write pending session records, must be called before any query
+        on the sessions table
+        '''
+
+        if not self._pending_sessions:
+            return
+
+        query = '''INSERT INTO sessions(recipient_id, device_id, record)
+                   VALUES(?,?,?)
+                   ON CONFLICT(recipient_id, device_id)
+                   DO UPDATE SET record = excluded.record'''
+        self._con.executemany(
+            query,
+            [(*key, record) for key, record in self._pending_sessions.items()])
+        self._pending_sessions.clear()
+
+    def flush(self) -> None:
+        if self._commit_source_id is not None:
+            GLib.source_remove(self._commit_source_id)
+        self._commit()
+
+    def discard_unstored_sessions(self) -> None:
+        '''
+        Drop cached records which were loaded but not stored since the
+        last call. omemo_dr changes records in place and stores them after
+        encryption or decryption succeeded. If it fails in between, which
+        omemo_dr does not always report, the changed record would otherwise
+        stay in the cache.
+        '''
+
+        for key in self._unstored_sessions:
+            self._sessions.pop(key, None)
+        self._unstored_sessions.clear()
+
+    def shutdown(self) -> None:
+        self.flush()
+        self._con.close()
+
     def _is_blind_trust_enabled(self) -> bool:
         return app.settings.get_account_setting(self._account,
                                                 'omemo_blind_trust')
@@ -371,7 +451,7 @@ def store_signed_pre_key(self,
         query = 'INSERT INTO signed_prekeys (prekey_id, record) VALUES(?,?)'
         self._con.execute(query, (signed_pre_key_id,
                                   signed_pre_key_record.serialize()))
-        self._con.commit()
+        self._delayed_commit()
 
     def contains_signed_pre_key(self, signed_pre_key_id: int) -> bool:
         query = 'SELECT record FROM signed_prekeys WHERE prekey_id = ?'
@@ -381,7 +461,7 @@ def contains_signed_pre_key(self, signed_pre_key_id: int) -> bool:
     def remove_signed_pre_key(self, signed_pre_key_id: int) -> None:
         query = 'DELETE FROM signed_prekeys WHERE prekey_id = ?'
         self._con.execute(query, (signed_pre_key_id,))
-        self._con.commit()
+        self._delayed_commit()
 
     def get_current_signed_pre_key_id(self) -> int:
         query = 'SELECT MAX(prekey_id) FROM signed_prekeys'
@@ -404,21 +484,43 @@ def remove_old_signed_pre_keys(self, timestamp: int) -> None:
         query = '''DELETE FROM signed_prekeys
                    WHERE timestamp < datetime(?, "unixepoch")'''
         self._con.execute(query, (timestamp,))
-        self._con.commit()
+        self._delayed_commit()
 
     def load_session(self, recipient_id: str, device_id: int) -> SessionRecord:
+        key = (recipient_id, device_id)
+        record = self._sessions.get(key)
+        if record is not None:
+            self.stats.session_hits += 1
+            self._unstored_sessions.add(key)
+            return record
+
+        self.stats.session_misses += 1
+        serialized = self._pending_sessions.get(key)
+        if serialized is not None:
+            record = SessionRecord(serialized=serialized)
+            self._sessions[key] = record
+            self._unstored_sessions.add(key)
+            return record
+
         query = '''SELECT record as "record [session_record]"
                    FROM sessions WHERE recipient_id = ? AND device_id = ?'''
-        result = self._con.execute(query, (recipient_id, device_id)).fetchone()
-        return result.record if result is not None else SessionRecord()
+        result = self._con.execute(query, key).fetchone()
+        if result is None:
+            return SessionRecord()
+
+        self._sessions[key] = result.record
+        self._unstored_sessions.add(key)
+        return result.record
 
     def get_jid_from_device(self, device_id: int) -> str | None:
+        self._flush_sessions()
         query = '''SELECT recipient_id
                    FROM sessions WHERE device_id = ?'''
         result = self._con.execute(query, (device_id, )).fetchone()
         return result.recipient_id if result is not None else None
 
     def get_active_device_tuples(self):
+        self._flush_sessions()
         query = '''SELECT recipient_id, device_id
                    FROM sessions WHERE active = 1'''
         return self._con.execute(query).fetchall()
@@ -429,22 +531,18 @@ def store_session(self,
                       session_record: SessionRecord
                       ) -> None:
 
-        query = '''INSERT INTO sessions(recipient_id, device_id, record)
-                   VALUES(?,?,?)'''
-        try:
-            self._con.execute(query, (recipient_id,
-                                      device_id,
-                                      session_record.serialize()))
-        except sqlite3.IntegrityError:
-            query = '''UPDATE sessions SET record = ?
-                       WHERE recipient_id = ? AND device_id = ?'''
-            self._con.execute(query, (session_record.serialize(),
-                                      recipient_id,
-                                      device_id))
-
-        self._con.commit()
+        key = (recipient_id, device_id)
+        self._sessions[key] = session_record
+        self._unstored_sessions.discard(key)
+        self._pending_sessions[key] = session_record.serialize()
+        self.stats.session_writes += 1
+        self._delayed_commit()
 
     def contains_session(self, recipient_id: str, device_id: int) -> bool:
+        key = (recipient_id, device_id)
+        if key in self._sessions or key in self._pending_sessions:
+            return True
+
         query = '''SELECT record FROM sessions
                    WHERE recipient_id = ? AND device_id = ?'''
         result = self._con.execute(query, (recipient_id, device_id)).fetchone()
@@ -452,14 +550,21 @@ def contains_session(self, recipient_id: str, device_id: int) -> bool:
 
     def delete_session(self, recipient_id: str, device_id: int) -> None:
         self._log.info('Delete session for %s %s', recipient_id, device_id)
+        key = (recipient_id, device_id)
+        self._sessions.pop(key, None)
+        self._pending_sessions.pop(key, None)
         query = 'DELETE FROM sessions WHERE recipient_id = ? AND device_id = ?'
-        self._con.execute(query, (recipient_id, device_id))
-        self._con.commit()
+        self._con.execute(query, key)
+        self._delayed_commit()
 
     def delete_all_sessions(self, recipient_id: str) -> None:
+        for sessions in (self._sessions, self._pending_sessions):
+            for key in [key for key in sessions if key[0] == recipient_id]:
+                del sessions[key]
+
         query = 'DELETE FROM sessions WHERE recipient_id = ?'
         self._con.execute(query, (recipient_id,))
-        self._con.commit()
+        self._delayed_commit()
 
     def get_identity_infos(self,
                            recipient_ids: str | list[str]
@@ -468,6 +573,8 @@ def get_identity_infos(self,
         if isinstance(recipient_ids, str):
             recipient_ids = [recipient_ids]
 
+        self._flush_sessions()
+
         query = '''SELECT recipient_id,
                           public_key as "public_key [pk]",
                           trust,
@@ -509,6 +616,7 @@ def get_identity_infos(self,
         return identity_infos
 
     def set_active_state(self, address: str, devicelist: list[int]) -> None:
+        self._flush_sessions()
         query = '''
         UPDATE sessions SET active = 1
         WHERE recipient_id = ? AND device_id IN ({})'''.format(
@@ -520,18 +628,20 @@ def set_active_state(self, address: str, devicelist: list[int]) -> None:
         WHERE recipient_id = ? AND device_id NOT IN ({})'''.format(
             ', '.join(['?'] * len(devicelist)))
         self._con.execute(query, (address,) + tuple(devicelist))
-        self._con.commit()
+        self._delayed_commit()
 
     def set_inactive(self, address: str, device_id: int) -> None:
+        self._flush_sessions()
         query = '''UPDATE sessions SET active = 0
                    WHERE recipient_id = ? AND device_id = ?'''
         self._con.execute(query, (address, device_id))
-        self._con.commit()
+        self._delayed_commit()
 
     def get_inactive_sessions_keys(self,
                                    recipient_id: str
                                    ) -> list[IdentityKey]:
 
+        self._flush_sessions()
         query = '''SELECT record as "record [session_record]" FROM sessions
                    WHERE active = 0 AND recipient_id = ?'''
         results = self._con.execute(query, (recipient_id,)).fetchall()
@@ -561,7 +671,7 @@ def store_pre_key(self,
                       ) -> None:
         query = 'INSERT INTO prekeys (prekey_id, record) VALUES(?,?)'
         self._con.execute(query, (pre_key_id, pre_key_record.serialize()))
-        self._con.commit()
+        self._delayed_commit()
 
     def contains_pre_key(self, pre_key_id: int) -> bool:
         query = 'SELECT record FROM prekeys WHERE prekey_id = ?'
@@ -571,7 +681,7 @@ def contains_pre_key(self, pre_key_id: int) -> bool:
     def remove_pre_key(self, pre_key_id: int) -> None:
         query = 'DELETE FROM prekeys WHERE prekey_id = ?'
         self._con.execute(query, (pre_key_id,))
-        self._con.commit()
+        self._delayed_commit()
 
     def get_current_pre_key_id(self) -> int | None:
         query = 'SELECT MAX(prekey_id) FROM prekeys'
@@ -615,7 +725,7 @@ def set_our_identity(self,
             serialize()
         private_key = identity_key_pair.get_private_key().serialize()
         self._con.execute(query, (device_id, public_key, private_key))
-        self._con.commit()
+        self._delayed_commit()
 
     def save_identity(self,
                       recipient_id: str,
@@ -630,7 +740,7 @@ def save_identity(self,
                                       identity_key.get_public_key().serialize(),
                                       trust,
                                       1 if trust == OMEMOTrust.BLIND else 0))
-            self._con.commit()
+            self._delayed_commit()
 
     def contains_identity(self,
                           recipient_id: str,
@@ -655,7 +765,7 @@ def delete_identity(self,
                    WHERE recipient_id = ? AND public_key = ?'''
         public_key = identity_key.get_public_key().serialize()
         self._con.execute(query, (recipient_id, public_key))
-        self._con.commit()
+        self._delayed_commit()
 
     def is_trusted_identity(self,
                             recipient_id: str,
@@ -717,7 +827,7 @@ def set_trust(self,
                    AND recipient_id = ?'''
         public_key = identity_key.get_public_key().serialize()
         self._con.execute(query, (trust, public_key, recipient_id))
-        self._con.commit()
+        self._delayed_commit()
 
     def is_trusted(self, recipient_id: str, device_id: int) -> bool:
         record = self.load_session(recipient_id, device_id)
@@ -751,7 +861,7 @@ def set_identity_last_seen(self,
         query = '''UPDATE identities SET timestamp = ?
                    WHERE recipient_id = ? AND public_key = ?'''
         self._con.execute(query, (timestamp, recipient_id, serialized))
-        self._con.commit()
+        self._delayed_commit()
 
     def get_unacknowledged_count(self,
                                  recipient_id: str,
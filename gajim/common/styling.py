@@ -6,10 +6,13 @@
 
 from typing import Any
 
+import functools
 import re
 import string
+from collections.abc import Sequence
 from dataclasses import dataclass
 from dataclasses import field
+from itertools import accumulate
 from re import Match
 
 from gi.repository import GLib
@@ -44,6 +47,9 @@
 SD_POS = 1
 MAX_QUOTE_LEVEL = 20
 
+# Number of parsed texts kept by process()
+PROCESS_CACHE_SIZE = 512
+
 
 @dataclass
 class StyleObject:
@@ -168,31 +174,78 @@ class ParsingResult:
     blocks: list[Block]
 
 
-def find_byte_index(text: str, index: int):
-    byte_index = -1
-    for index_, c in enumerate(text):
-        byte_index += len(c.encode())
-        if index == index_:
-            return byte_index
+def _get_char_length(char: str) -> int:
+    code_point = ord(char)
+    if code_point < 0x80:
+        return 1
+    if code_point < 0x800:
+        return 2
+    if code_point < 0x10000:
+        return 3
+    return 4
+
+
+class ByteOffsets:
+    '''
+    Maps character indices of a text to UTF-8 byte indices. The table is
+    computed once per text and shared by all blocks, spans and URIs.
+    '''
+
+    def __init__(self, text: str) -> None:
+        self._table: Sequence[int]
+        if text.isascii():
+            self._table = range(len(text) + 1)
+        else:
+            self._table = list(
+                accumulate(map(_get_char_length, text), initial=0))
+
+        self._base_index = 0
+        self._base_byte = 0
+
+    def relative_to(self, index: int) -> ByteOffsets:
+        '''
+        Returns a view on the same table, where index and byte offsets
+        start at the character index
+        '''
+
+        view = ByteOffsets.__new__(ByteOffsets)
+        view._table = self._table
+        view._base_index = self._base_index + index
+        view._base_byte = self._table[view._base_index]
+        return view
 
-    raise ValueError(f'index not in string: {text}, {index}')
+    def get(self, index: int) -> int:
+        '''
+        Returns the byte offset at which the character at index starts
+        '''
+
+        return self._table[self._base_index + index] - self._base_byte
 
 
 def process(text: str | bytes, level: int = 0) -> ParsingResult:
+    '''
+    Results are cached, they must not be modified
+    '''
+
     if isinstance(text, bytes):
         text = text.decode()
 
+    return _process(text, level)
+
+
+@functools.lru_cache(maxsize=PROCESS_CACHE_SIZE)
+def _process(text: str, level: int) -> ParsingResult:
+    byte_offsets = ByteOffsets(text)
     blocks = _parse_blocks(text, level)
     for block in blocks:
         if isinstance(block, PlainBlock):
+            block_offsets = byte_offsets.relative_to(block.start)
             offset = 0
-            offset_bytes = 0
             for line in block.text.splitlines(keepends=True):
-                block.spans += _parse_line(line, offset, offset_bytes)
-                block.uris += _parse_uris(line, offset, offset_bytes)
+                block.spans += _parse_line(line, offset, block_offsets)
+                block.uris += _parse_uris(line, offset, block_offsets)
 
                 offset += len(line)
-                offset_bytes += len(line.encode())
 
         if isinstance(block, QuoteBlock):
             result = process(block.unquote(), level=level + 1)
@@ -205,13 +258,12 @@ def process_uris(text: str | bytes) -> list[BaseHyperlink]:
     if isinstance(text, bytes):
         text = text.decode()
 
+    byte_offsets = ByteOffsets(text)
     uris: list[BaseHyperlink] = []
     offset = 0
-    offset_bytes = 0
     for line in text.splitlines(keepends=True):
-        uris += _parse_uris(line, offset, offset_bytes)
+        uris += _parse_uris(line, offset, byte_offsets)
         offset += len(line)
-        offset_bytes += len(line.encode())
 
     return uris
 
@@ -251,7 +303,9 @@ def _parse_blocks(text: str, level: int) -> list[Block]:
     return blocks
 
 
-def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
+def _parse_line(line: str,
+                offset: int,
+                byte_offsets: ByteOffsets) -> list[Span]:
     index: int = 0
     length = len(line)
     stack: list[tuple[str, int]] = []
@@ -276,7 +330,7 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
                 index = _handle_pre_span(line,
                                          index,
                                          offset,
-                                         offset_bytes,
+                                         byte_offsets,
                                          spans)
                 continue
 
@@ -300,7 +354,7 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
                                     start_pos,
                                     index,
                                     offset,
-                                    offset_bytes))
+                                    byte_offsets))
 
         index += 1
 
@@ -309,7 +363,7 @@ def _parse_line(line: str, offset: int, offset_bytes: int) -> list[Span]:
 
 def _parse_uris(line: str,
                 offset: int,
-                offset_bytes: int) -> list[BaseHyperlink]:
+                byte_offsets: ByteOffsets) -> list[BaseHyperlink]:
     uris: list[BaseHyperlink] = []
 
     def make(start: int, end: int, is_jid: bool) -> BaseHyperlink | None:
@@ -327,7 +381,7 @@ def make(start: int, end: int, is_jid: bool) -> BaseHyperlink | None:
                                start,
                                end - 1,
                                offset,
-                               offset_bytes,
+                               byte_offsets,
                                is_jid)
 
     for match in URI_OR_JID_RX.finditer(line):
@@ -342,7 +396,7 @@ def make(start: int, end: int, is_jid: bool) -> BaseHyperlink | None:
 def _handle_pre_span(line: str,
                      index: int,
                      offset: int,
-                     offset_bytes: int,
+                     byte_offsets: ByteOffsets,
                      spans: list[Span]) -> int:
 
     # Scan ahead for the end
@@ -354,7 +408,7 @@ def _handle_pre_span(line: str,
         # empty span
         return index + 1
 
-    spans.append(_make_span(line, PRE, index, end, offset, offset_bytes))
+    spans.append(_make_span(line, PRE, index, end, offset, byte_offsets))
     return end + 1
 
 
@@ -363,15 +417,15 @@ def _make_span(line: str,
                start: int,
                end: int,
                offset: int,
-               offset_bytes: int) -> Span:
+               byte_offsets: ByteOffsets) -> Span:
 
     text = line[start:end + 1]
 
-    start_byte = find_byte_index(line, start) + offset_bytes
-    end_byte = find_byte_index(line, end) + offset_bytes + 1
-
     start += offset
     end += offset + 1
+    start_byte = byte_offsets.get(start)
+    end_byte = byte_offsets.get(end)
+
     span_class = SPAN_CLS_DICT.get(sd)
     assert span_class is not None
 
@@ -386,16 +440,15 @@ def _make_hyperlink(line: str,
                     start: int,
                     end: int,
                     offset: int,
-                    offset_bytes: int,
+                    byte_offsets: ByteOffsets,
                     is_jid: bool) -> BaseHyperlink | None:
 
     text = line[start:end + 1]
 
-    start_byte = find_byte_index(line, start) + offset_bytes
-    end_byte = find_byte_index(line, end) + offset_bytes + 1
-
     start += offset
     end += offset + 1
+    start_byte = byte_offsets.get(start)
+    end_byte = byte_offsets.get(end)
 
     uri = text
     if is_jid:
@@ -4,30 +4,207 @@
 
 from __future__ import annotations
 
+from typing import Any
+
 import functools
+import heapq
+import itertools
 import logging
-import queue
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
 
 from gi.repository import GLib
 
 log = logging.getLogger('gajim.c.m.task_manager')
 
+# Tasks of one account which are executed at the same time
+MAX_IN_FLIGHT = 5
+# Tasks which are started per second and account, and how many can be
+# started at once after being idle
+RATE = 2.0
+BURST = 10
+# Seconds after which a running task does not count as in flight anymore
+TASK_TIMEOUT = 60
+# Seconds after which tasks with unmet preconditions are checked again
+RETRY_INTERVAL = 2
+
+
+@dataclass
+class TaskMetrics:
+    queued: int = 0
+    running: int = 0
+    executed: int = 0
+    obsolete: int = 0
+    timed_out: int = 0
+    wait_time: float = 0
+    max_wait_time: float = 0
+    execution_time: float = 0
+    finished: int = 0
+
+    @property
+    def avg_wait_time(self) -> float:
+        if not self.executed:
+            return 0
+        return self.wait_time / self.executed
+
+    @property
+    def avg_execution_time(self) -> float:
+        if not self.finished:
+            return 0
+        return self.execution_time / self.finished
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._timestamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._timestamp
+        self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+        self._timestamp = now
+
+    def consume(self, now: float) -> bool:
+        self._refill(now)
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def get_delay(self, now: float) -> float:
+        '''
+        Returns the seconds until the next token is available
+        '''
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self._rate
+
 
 class TaskManager:
-    def __init__(self) -> None:
-        self._timeout: int | None = None
-        self._queue: queue.PriorityQueue[Task] = queue.PriorityQueue()
+    '''
+    Executes queued tasks with a limit of tasks in flight per account.
+    Tasks are started at a rate limited by a token bucket per account. The
+    queue is processed again as soon as a task finishes.
+    '''
+
+    def __init__(self,
+                 max_in_flight: int = MAX_IN_FLIGHT,
+                 rate: float = RATE,
+                 burst: int = BURST,
+                 task_timeout: float = TASK_TIMEOUT
+                 ) -> None:
 
-    def _start_worker(self) -> None:
-        self._timeout = GLib.timeout_add_seconds(2, self._process_queue)
+        self._max_in_flight = max_in_flight
+        self._rate = rate
+        self._burst = burst
+        self._task_timeout = task_timeout
+
+        self._source_id: int | None = None
+        self._source_due: float = 0
+        self._counter = itertools.count()
+        self._queues: defaultdict[
+            str | None, list[tuple[int, int, Task]]] = defaultdict(list)
+        self._running: defaultdict[
+            str | None, dict[int, Task]] = defaultdict(dict)
+        self._buckets: dict[str | None, TokenBucket] = {}
+        self._metrics: defaultdict[
+            str | None, TaskMetrics] = defaultdict(TaskMetrics)
+
+    def add_task(self, task: Task) -> None:
+        log.info('Adding task: %r', task)
+        task.queued_at = time.monotonic()
+        self._push(task)
+        self._wake()
+
+    def get_metrics(self, account: str | None = None) -> TaskMetrics:
+        metrics = self._metrics[account]
+        metrics.queued = len(self._queues[account])
+        metrics.running = len(self._running[account])
+        return metrics
+
+    def _push(self, task: Task) -> None:
+        heapq.heappush(self._queues[task.account],
+                       (task.priority, next(self._counter), task))
+
+    def _get_bucket(self, account: str | None) -> TokenBucket:
+        bucket = self._buckets.get(account)
+        if bucket is None:
+            bucket = TokenBucket(self._rate, self._burst)
+            self._buckets[account] = bucket
+        return bucket
+
+    def _wake(self) -> None:
+        self._schedule(0)
+
+    def _schedule(self, delay: float) -> None:
+        due = time.monotonic() + delay
+        if self._source_id is not None:
+            if self._source_due <= due:
+                return
+            GLib.source_remove(self._source_id)
+
+        self._source_due = due
+        self._source_id = GLib.timeout_add(int(delay * 1000),
+                                           self._process_queue)
 
     def _process_queue(self) -> bool:
-        log.info('%s tasks queued', self._queue.qsize())
+        self._source_id = None
+        now = time.monotonic()
+        delays: list[float] = []
+
+        # Executed tasks can add new tasks
+        for account, queue in list(self._queues.items()):
+            delay = self._process_account_queue(account, queue, now)
+            if delay is not None:
+                delays.append(delay)
+
+        if delays:
+            self._schedule(min(delays))
+        return False
+
+    def _process_account_queue(self,
+                               account: str | None,
+                               queue: list[tuple[int, int, Task]],
+                               now: float
+                               ) -> float | None:
+        '''
+        Executes tasks of one account, returns the seconds after which
+        the queue needs to be processed again, or None if it only
+        needs to be processed when a task finishes or is added
+        '''
+
+        self._expire_running(account, now)
+
+        running = self._running[account]
+        bucket = self._get_bucket(account)
+        metrics = self._metrics[account]
         requeue: list[Task] = []
-        while not self._queue.empty():
-            task = self._queue.get_nowait()
+        delay = None
+
+        if queue:
+            log.info('%s tasks queued, %s running for %s',
+                     len(queue), len(running), account)
+
+        while queue:
+            if len(running) >= self._max_in_flight:
+                # A finishing task wakes us, or its timeout expires
+                delay = self._get_timeout_delay(running, now)
+                break
+
+            token_delay = bucket.get_delay(now)
+            if token_delay > 0:
+                delay = token_delay
+                break
+
+            _priority, _count, task = heapq.heappop(queue)
             if task.is_obsolete():
                 log.info('Task obsolete: %r', task)
+                metrics.obsolete += 1
                 continue
 
             if not task.preconditions_met():
@@ -35,45 +212,86 @@ def _process_queue(self) -> bool:
                 # to check again here
                 if task.is_obsolete():
                     log.info('Task obsolete: %r', task)
+                    metrics.obsolete += 1
                 else:
                     requeue.append(task)
                 continue
 
-            log.info('Execute task %r', task)
+            bucket.consume(now)
+            self._execute(task, now)
+
+        for task in requeue:
+            log.info('Requeue task (preconditions not met): %r', task)
+            self._push(task)
+
+        if requeue:
+            delay = RETRY_INTERVAL if delay is None else min(delay,
+                                                             RETRY_INTERVAL)
+        return delay
+
+    def _execute(self, task: Task, now: float) -> None:
+        metrics = self._metrics[task.account]
+        wait_time = now - task.queued_at
+        metrics.executed += 1
+        metrics.wait_time += wait_time
+        metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+
+        log.info('Execute task %r', task)
+        task.started_at = now
+        task.set_finished_callback(self._on_task_finished)
+        if task.track_completion:
+            self._running[task.account][id(task)] = task
+
+        try:
             task.execute()
-            self._requeue_tasks(requeue)
-            return True
+        except Exception:
+            log.exception('Error while executing task %r', task)
+            task.set_finished()
+            return
 
-        if self._requeue_tasks(requeue):
-            # Queue is empty, but there are tasks to requeue
-            # don't stop worker
-            return True
+        if not task.track_completion:
+            task.set_finished()
 
-        # Queue is empty, stop worker
-        self._timeout = None
-        return False
+    def _on_task_finished(self, task: Task) -> None:
+        running = self._running[task.account]
+        was_running = running.pop(id(task), None) is not None
 
-    def _requeue_tasks(self, tasks: list[Task]) -> bool:
-        if not tasks:
-            return False
+        metrics = self._metrics[task.account]
+        metrics.finished += 1
+        metrics.execution_time += time.monotonic() - task.started_at
 
-        for task in tasks:
-            log.info('Requeue task (preconditions not met): %r', task)
-            self._queue.put_nowait(task)
-        return True
+        if was_running and self._queues[task.account]:
+            self._wake()
 
-    def add_task(self, task: Task) -> None:
-        log.info('Adding task: %r', task)
-        self._queue.put_nowait(task)
-        if self._timeout is None:
-            self._start_worker()
+    def _expire_running(self, account: str | None, now: float) -> None:
+        running = self._running[account]
+        for task_id, task in list(running.items()):
+            if now - task.started_at < self._task_timeout:
+                continue
+
+            log.warning('Task did not finish in time: %r', task)
+            del running[task_id]
+            self._metrics[account].timed_out += 1
+
+    def _get_timeout_delay(self, running: dict[int, Task], now: float) -> float:
+        started_at = min(task.started_at for task in running.values())
+        return max(0, started_at + self._task_timeout - now)
 
 
 @functools.total_ordering
 class Task:
-    def __init__(self, priority: int = 0) -> None:
+
+    # If True, execute() only starts the task, and set_finished() has
+    # to be called once it is done. Until then it counts as in flight.
+    track_completion = False
+
+    def __init__(self, priority: int = 0, account: str | None = None) -> None:
         self.priority = priority
+        self.account = account
+        self.queued_at: float = 0
+        self.started_at: float = 0
         self._obsolete = False
+        self._finished_callback: Callable[[Task], Any] | None = None
 
     def is_obsolete(self) -> bool:
         return self._obsolete
@@ -81,6 +299,15 @@ def is_obsolete(self) -> bool:
     def set_obsolete(self) -> None:
         self._obsolete = True
 
+    def set_finished_callback(self, callback: Callable[[Task], Any]) -> None:
+        self._finished_callback = callback
+
+    def set_finished(self) -> None:
+        callback = self._finished_callback
+        self._finished_callback = None
+        if callback is not None:
+            callback(self)
+
     def __lt__(self, other: object) -> bool:
         if not isinstance(other, Task):
             raise NotImplementedError
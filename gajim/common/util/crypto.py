@@ -0,0 +1,51 @@
+# This file is part of Gajim.
+#
+# SPDX-License-Identifier: GPL-3.0-only
+
+from __future__ import annotations
+
+from typing import BinaryIO
+
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import algorithms
+from cryptography.hazmat.primitives.ciphers import Cipher
+from cryptography.hazmat.primitives.ciphers.modes import GCM
+
+AES_GCM_KEY_SIZE = 32
+AES_GCM_IV_SIZE = 12
+AES_GCM_TAG_SIZE = 16
+ENCRYPTION_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass(frozen=True)
+class AESGCMKey:
+    key: bytes
+    iv: bytes
+
+    @classmethod
+    def generate(cls) -> AESGCMKey:
+        return cls(key=os.urandom(AES_GCM_KEY_SIZE),
+                   iv=os.urandom(AES_GCM_IV_SIZE))
+
+
+def aes_gcm_encrypt_stream(file: BinaryIO,
+                           key: AESGCMKey,
+                           chunk_size: int = ENCRYPTION_CHUNK_SIZE
+                           ) -> Iterator[bytes]:
+    '''
+    Reads the file in chunks and yields the encrypted chunks,
+    followed by the authentication tag (aesgcm:// scheme)
+    '''
+
+    encryptor = Cipher(algorithms.AES(key.key),
+                       GCM(key.iv),
+                       backend=default_backend()).encryptor()
+
+    while chunk := file.read(chunk_size):
+        yield encryptor.update(chunk)
+
+    yield encryptor.finalize() + encryptor.tag
@@ -2,7 +2,13 @@
 #
 # SPDX-License-Identifier: GPL-3.0-only
 
+from __future__ import annotations
 
+import logging
+import time
+from dataclasses import dataclass
+
+from gi.repository import Soup
 from nbxmpp.http import HTTPRequest
 from nbxmpp.http import HTTPSession
 from nbxmpp.structs import ProxyData
@@ -11,6 +17,117 @@
 from gajim.common.helpers import determine_proxy
 from gajim.common.helpers import get_account_proxy
 
+log = logging.getLogger('gajim.c.util.http')
+
+# Seconds after which a pooled session without new requests is dropped
+HTTP_SESSION_IDLE_TIMEOUT = 300
+HTTP_MAX_CONNS = 16
+HTTP_MAX_CONNS_PER_HOST = 4
+
+# Features HTTPSession may add to or remove from a Soup.Session
+SESSION_FEATURE_TYPES = (
+    Soup.ContentDecoder,
+    Soup.ContentSniffer,
+)
+
+
+class PooledHTTPSession(HTTPSession):
+    '''
+    HTTPSession which limits the amount of parallel connections,
+    Soup accepts these limits only when the session is constructed
+    '''
+
+    def __init__(self, user_agent: str) -> None:
+        HTTPSession.__init__(self, user_agent)
+
+        # Replace the session configured by HTTPSession with a limited
+        # one which takes over its user agent and features
+        session = self.get_soup_session()
+        limited_session = Soup.Session(
+            max_conns=HTTP_MAX_CONNS,
+            max_conns_per_host=HTTP_MAX_CONNS_PER_HOST,
+            user_agent=session.get_user_agent())
+
+        for feature_type in SESSION_FEATURE_TYPES:
+            enabled = session.has_feature(feature_type)
+            if enabled == limited_session.has_feature(feature_type):
+                continue
+            if enabled:
+                limited_session.add_feature_by_type(feature_type)
+            else:
+                limited_session.remove_feature_by_type(feature_type)
+
+        self._session = limited_session
+
+
+@dataclass
+class _PoolEntry:
+    session: HTTPSession
+    last_used: float
+
+
+class HTTPSessionPool:
+    '''
+    Shares HTTP sessions between requests of the same account and proxy,
+    so connections and TLS sessions to a host can be reused
+    '''
+
+    def __init__(self, idle_timeout: float = HTTP_SESSION_IDLE_TIMEOUT) -> None:
+        self._idle_timeout = idle_timeout
+        self._entries: dict[tuple[str | None, ProxyData | None], _PoolEntry] = {}
+
+    def get_session(self,
+                    account: str | None,
+                    proxy: ProxyData | None
+                    ) -> HTTPSession:
+
+        now = time.monotonic()
+        self._evict_idle(now)
+
+        key = (account, proxy)
+        entry = self._entries.get(key)
+        if entry is None:
+            # The proxy configuration is part of the key, a changed proxy
+            # makes all other sessions of this account obsolete
+            self.invalidate(account)
+            session = self._create_session(proxy)
+            entry = _PoolEntry(session=session, last_used=now)
+            self._entries[key] = entry
+            log.info('Created HTTP session for %s', account or 'no account')
+
+        entry.last_used = now
+        return entry.session
+
+    def invalidate(self, account: str | None) -> None:
+        # Requests which are still running keep a reference to their session
+        # and finish normally, the session is only removed from the pool
+        for key in list(self._entries):
+            if key[0] == account:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_idle(self, now: float) -> None:
+        for key, entry in list(self._entries.items()):
+            if now - entry.last_used > self._idle_timeout:
+                log.info('Remove idle HTTP session for %s',
+                         key[0] or 'no account')
+                del self._entries[key]
+
+    @staticmethod
+    def _create_session(proxy: ProxyData | None) -> HTTPSession:
+        session = PooledHTTPSession(user_agent=f'Gajim {app.version}')
+        if proxy is not None:
+            session.set_proxy_resolver(proxy.get_resolver())
+        return session
+
+
+_pool = HTTPSessionPool()
+
 
 def create_http_session(account: str | None = None,
                         proxy: ProxyData | None = None
@@ -19,10 +136,7 @@ def create_http_session(account: str | None = None,
     session = HTTPSession(user_agent=f'Gajim {app.version}')
 
     if proxy is None:
-        if account is not None:
-            proxy = get_account_proxy(account)
-        else:
-            proxy = determine_proxy()
+        proxy = _get_proxy(account)
 
     if proxy is not None:
         session.set_proxy_resolver(proxy.get_resolver())
@@ -31,5 +145,18 @@ def create_http_session(account: str | None = None,
 
 
 def create_http_request(account: str | None = None) -> HTTPRequest:
-    session = create_http_session(account)
+    session = _pool.get_session(account, _get_proxy(account))
     return session.create_request()
+
+
+def invalidate_http_sessions(account: str | None = None) -> None:
+    if account is None:
+        _pool.clear()
+        return
+    _pool.invalidate(account)
+
+
+def _get_proxy(account: str | None) -> ProxyData | None:
+    if account is not None:
+        return get_account_proxy(account)
+    return determine_proxy()
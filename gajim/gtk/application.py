@@ -855,6 +855,7 @@ def _remove() -> None:
 
             app.window.clear_chat_list_row(params.account, params.jid)
             control = app.window.get_control()
+            control.invalidate_history(params.account, params.jid)
             if not control.is_loaded(params.account, params.jid):
                 return
 
@@ -883,3 +884,5 @@ def _on_forget_groupchat_action(_action: Gio.SimpleAction,
         client.get_module('Bookmarks').remove(params.jid)
 
         app.storage.archive.remove_history_for_jid(params.account, params.jid)
+        app.window.get_control().invalidate_history(
+            params.account, params.jid)
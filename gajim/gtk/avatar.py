@@ -8,7 +8,9 @@
 import hashlib
 import logging
 import math
+import time
 from collections import defaultdict
+from collections import OrderedDict
 from math import pi
 from pathlib import Path
 
@@ -41,8 +43,13 @@
 log = logging.getLogger('gajim.gtk.avatar')
 
 
-AvatarCacheT = dict[JID | str, dict[tuple[int, int, str | None, str | None],
-                                          cairo.ImageSurface]]
+AvatarCacheKeyT = tuple[JID | str, int, int, str | None, str | None]
+
+# Upper bound for the pixel data of all cached avatar surfaces
+AVATAR_CACHE_MAX_BYTES = 48 * 1024 * 1024
+# Surfaces used within this many seconds are most likely on screen and
+# are only evicted if nothing else is left
+AVATAR_CACHE_PROTECT_SECONDS = 5
 
 CIRCLE_RATIO = 0.18
 CIRCLE_FILL_RATIO = 0.80
@@ -385,12 +392,139 @@ def convert_to_greyscale(surface: cairo.ImageSurface) -> cairo.ImageSurface:
     return context.get_target()
 
 
+class AvatarSurfaceCache:
+    '''
+    LRU cache for avatar surfaces, bounded by the size of their pixel data.
+
+    Surfaces are kept in one bucket per pixel size, so the many small
+    roster avatars are not evicted by a few large ones. Eviction starts
+    with the least recently used surface of the largest bucket.
+    '''
+
+    def __init__(self, max_bytes: int = AVATAR_CACHE_MAX_BYTES) -> None:
+        self._max_bytes = max_bytes
+        self._buckets: dict[
+            int, OrderedDict[AvatarCacheKeyT, cairo.ImageSurface]] = {}
+        self._bucket_bytes: defaultdict[int, int] = defaultdict(int)
+        self._last_used: dict[AvatarCacheKeyT, float] = {}
+        self._keys_by_jid: defaultdict[
+            JID | str, set[AvatarCacheKeyT]] = defaultdict(set)
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _get_bucket_id(key: AvatarCacheKeyT) -> int:
+        _jid, size, scale, _show, _transport_icon = key
+        return size * scale
+
+    @staticmethod
+    def _get_surface_bytes(surface: cairo.ImageSurface) -> int:
+        return surface.get_stride() * surface.get_height()
+
+    def get(self, key: AvatarCacheKeyT) -> cairo.ImageSurface | None:
+        bucket = self._buckets.get(self._get_bucket_id(key))
+        surface = None if bucket is None else bucket.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+
+        bucket.move_to_end(key)  # pyright: ignore
+        self._last_used[key] = time.monotonic()
+        self.hits += 1
+        return surface
+
+    def set(self, key: AvatarCacheKeyT, surface: cairo.ImageSurface) -> None:
+        self._remove(key)
+
+        bucket_id = self._get_bucket_id(key)
+        bucket = self._buckets.setdefault(bucket_id, OrderedDict())
+        bucket[key] = surface
+
+        surface_bytes = self._get_surface_bytes(surface)
+        self._bucket_bytes[bucket_id] += surface_bytes
+        self.size += surface_bytes
+        self._last_used[key] = time.monotonic()
+        self._keys_by_jid[key[0]].add(key)
+
+        self._evict()
+
+    def invalidate(self, jid: JID | str) -> None:
+        for key in self._keys_by_jid.pop(jid, set()):
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._bucket_bytes.clear()
+        self._last_used.clear()
+        self._keys_by_jid.clear()
+        self.size = 0
+
+    def get_stats(self) -> dict[str, int]:
+        return {
+            'size': self.size,
+            'max_size': self._max_bytes,
+            'count': len(self._last_used),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+    def _remove(self, key: AvatarCacheKeyT) -> bool:
+        bucket_id = self._get_bucket_id(key)
+        bucket = self._buckets.get(bucket_id)
+        if bucket is None or key not in bucket:
+            return False
+
+        surface = bucket.pop(key)
+        surface_bytes = self._get_surface_bytes(surface)
+        self._bucket_bytes[bucket_id] -= surface_bytes
+        self.size -= surface_bytes
+        del self._last_used[key]
+
+        keys = self._keys_by_jid.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_jid[key[0]]
+        return True
+
+    def _evict(self) -> None:
+        if self.size <= self._max_bytes:
+            return
+
+        protect_after = time.monotonic() - AVATAR_CACHE_PROTECT_SECONDS
+        for protect in (True, False):
+            bucket_ids = sorted(self._bucket_bytes,
+                                key=self._bucket_bytes.__getitem__,
+                                reverse=True)
+            for bucket_id in bucket_ids:
+                bucket = self._buckets[bucket_id]
+                for key in list(bucket):
+                    if self.size <= self._max_bytes:
+                        return
+
+                    if protect and self._last_used[key] > protect_after:
+                        # Everything after this key was used even later
+                        break
+
+                    self._remove(key)
+                    self.evictions += 1
+
+        log.debug('Avatar cache: %s', self.get_stats())
+
+
 class AvatarStorage(metaclass=Singleton):
     def __init__(self):
-        self._cache: AvatarCacheT = defaultdict(dict)
+        self._cache = AvatarSurfaceCache()
 
     def invalidate_cache(self, jid: JID | str) -> None:
-        self._cache.pop(jid, None)
+        self._cache.invalidate(jid)
+
+    def get_cache_stats(self) -> dict[str, int]:
+        return self._cache.get_stats()
 
     def get_pixbuf(self,
                    contact: (types.BareContact |
@@ -425,7 +559,7 @@ def get_surface(self,
         jid = contact.jid
 
         if not default:
-            surface = self._cache[jid].get((size, scale, show, transport_icon))
+            surface = self._cache.get((jid, size, scale, show, transport_icon))
             if surface is not None:
                 return surface
 
@@ -437,7 +571,7 @@ def get_surface(self,
                 if transport_icon is not None:
                     surface = add_transport_to_avatar(surface, transport_icon)
 
-                self._cache[jid][(size, scale, show, transport_icon)] = surface
+                self._cache.set((jid, size, scale, show, transport_icon), surface)
                 return surface
 
         name = contact.name
@@ -451,7 +585,7 @@ def get_surface(self,
         if transport_icon is not None:
             surface = add_transport_to_avatar(surface, transport_icon)
 
-        self._cache[jid][(size, scale, show, transport_icon)] = surface
+        self._cache.set((jid, size, scale, show, transport_icon), surface)
         return surface
 
     def get_muc_surface(self,
@@ -464,7 +598,7 @@ def get_muc_surface(self,
                         style: str = 'circle') -> cairo.ImageSurface:
 
         if not default:
-            surface = self._cache[jid].get((size, scale, None, transport_icon))
+            surface = self._cache.get((jid, size, scale, None, transport_icon))
             if surface is not None:
                 return surface
 
@@ -477,8 +611,8 @@ def get_muc_surface(self,
                             surface, transport_icon)
 
                     surface = clip(surface, style)
-                    self._cache[jid][
-                        (size, scale, None, transport_icon)] = surface
+                    self._cache.set(
+                        (jid, size, scale, None, transport_icon), surface)
                     return surface
 
                 # avatar_sha set, but image is missing
@@ -495,7 +629,7 @@ def get_muc_surface(self,
         if transport_icon is not None:
             surface = add_transport_to_avatar(surface, transport_icon)
 
-        self._cache[jid][(size, scale, None, transport_icon)] = surface
+        self._cache.set((jid, size, scale, None, transport_icon), surface)
         return surface
 
     def get_workspace_surface(self,
@@ -503,7 +637,7 @@ def get_workspace_surface(self,
                               size: int,
                               scale: int) -> cairo.ImageSurface | None:
 
-        surface = self._cache[workspace_id].get((size, scale, None, None))
+        surface = self._cache.get((workspace_id, size, scale, None, None))
         if surface is not None:
             return surface
 
@@ -523,7 +657,7 @@ def get_workspace_surface(self,
         rgba = make_rgba(color or DEFAULT_WORKSPACE_COLOR)
         surface = make_workspace_avatar(
             name, rgba_to_float(rgba), size, scale)
-        self._cache[workspace_id][(size, scale, None, None)] = surface
+        self._cache.set((workspace_id, size, scale, None, None), surface)
         return surface
 
     @staticmethod
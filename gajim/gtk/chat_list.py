@@ -174,7 +174,9 @@ def add_chat(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 *,
+                 load_last_message: bool = True
                  ) -> None:
 
         key = (account, jid)
@@ -187,7 +189,8 @@ def add_chat(self,
                           jid,
                           type_,
                           pinned,
-                          position)
+                          position,
+                          load_last_message=load_last_message)
 
         self._chats[key] = row
         if pinned:
@@ -65,7 +65,9 @@ def __init__(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 *,
+                 load_last_message: bool = True
                  ) -> None:
 
         Gtk.ListBoxRow.__init__(self)
@@ -139,11 +141,15 @@ def __init__(self,
             self._ui.unread_label.get_style_context().add_class(
                 'unread-counter-silent')
 
-        self._display_last_conversation_row()
+        if load_last_message:
+            self.load_last_conversation_row()
 
-    def _display_last_conversation_row(self) -> None:
+    def load_last_conversation_row(self) -> None:
         message = app.storage.archive.get_last_conversation_row(
             self.contact.account, self.contact.jid)
+        self.set_last_conversation_row(message)
+
+    def set_last_conversation_row(self, message: mod.Message | None) -> None:
         if message is None:
             self.show_all()
             return
@@ -425,7 +431,7 @@ def _on_draft_update(self,
     def _show_draft(self, draft: Draft | None) -> None:
         if draft is None:
             self._ui.message_label.get_style_context().remove_class('draft')
-            self._display_last_conversation_row()
+            self.load_last_conversation_row()
             return
 
         self.set_nick('')
@@ -185,13 +185,32 @@ def add_chat(self,
                  jid: JID,
                  type_: str,
                  pinned: bool,
-                 position: int
+                 position: int,
+                 *,
+                 load_last_message: bool = True
                  ) -> None:
 
         chat_list = self._chat_lists.get(workspace_id)
         if chat_list is None:
             chat_list = self.add_chat_list(workspace_id)
-        chat_list.add_chat(account, jid, type_, pinned, position)
+        chat_list.add_chat(account, jid, type_, pinned, position,
+                           load_last_message=load_last_message)
+
+    def load_last_conversation_rows(self) -> None:
+        '''
+        Loads the last message of all chats with one query, used for
+        chats which were added with load_last_message=False
+        '''
+
+        rows = [row for chat_list in self._chat_lists.values()
+                for row in chat_list.get_chat_list_rows()]
+
+        messages = app.storage.archive.get_last_conversation_rows(
+            [(row.account, row.jid) for row in rows])
+
+        for row in rows:
+            row.set_last_conversation_row(
+                messages.get((row.account, row.jid)))
 
     def select_chat(self, account: str, jid: JID) -> None:
         chat_list = self.find_chat(account, jid)
@@ -116,6 +116,7 @@ def _add_actions(self):
 
     def set_startup_finished(self) -> None:
         self._startup_finished = True
+        self._chat_list_stack.load_last_conversation_rows()
 
     def get_chat_list_stack(self) -> ChatListStack:
         return self._chat_list_stack
@@ -267,8 +268,10 @@ def add_chat_for_workspace(self,
                 self._chat_list_stack.select_chat(account, jid)
             return
 
-        self._chat_list_stack.add_chat(workspace_id, account, jid, type_,
-                                       pinned, position)
+        # During startup the last messages of all chats are loaded at once
+        self._chat_list_stack.add_chat(
+            workspace_id, account, jid, type_, pinned, position,
+            load_last_message=self._startup_finished)
 
         if self._startup_finished:
             if select:
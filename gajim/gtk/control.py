@@ -11,6 +11,7 @@
 import logging
 import time
 from collections.abc import Sequence
+from functools import partial
 
 from gi.repository import Gio
 from gi.repository import GLib
@@ -38,6 +39,8 @@
 from gajim.gtk.builder import get_builder
 from gajim.gtk.conversation.jump_to_end_button import JumpToEndButton
 from gajim.gtk.conversation.message_selection import MessageSelection
+from gajim.gtk.conversation.pager import HistoryCursor
+from gajim.gtk.conversation.pager import HistoryPager
 from gajim.gtk.conversation.view import ConversationView
 from gajim.gtk.groupchat_roster import GroupchatRoster
 from gajim.gtk.groupchat_state import GroupchatState
@@ -57,6 +60,11 @@ def __init__(self) -> None:
         self._contact = None
         self._client = None
 
+        # Incremented whenever the view is reset, results of history
+        # requests made before are discarded
+        self._history_generation = 0
+        self._history_pager = HistoryPager(REQUEST_LINES_COUNT)
+
         self._ui = get_builder('chat_control.ui')
 
         self._scrolled_view = ConversationView()
@@ -161,6 +169,7 @@ def clear(self) -> None:
 
         self._contact = None
         self._client = None
+        self._history_generation += 1
         self._scrolled_view.clear()
         self._groupchat_state.clear()
         self._roster.clear()
@@ -170,8 +179,12 @@ def remove_message(self, pk: int) -> None:
         self._scrolled_view.remove_message(pk)
 
     def reset_view(self) -> None:
+        self._history_generation += 1
         self._scrolled_view.reset()
 
+    def invalidate_history(self, account: str, jid: JID) -> None:
+        self._history_pager.invalidate(account, jid)
+
     def get_autoscroll(self) -> bool:
         return self._scrolled_view.get_autoscroll()
 
@@ -183,6 +196,7 @@ def scroll_to_message(
         row = self._scrolled_view.get_row_by_pk(pk)
         if row is None:
             # Clear view and reload conversation around timestamp
+            self._history_generation += 1
             self._scrolled_view.reset()
             self._scrolled_view.block_signals(True)
             messages: list[Message] = []
@@ -216,6 +230,7 @@ def switch_contact(
         self._contact = contact
 
         self._client = app.get_client(contact.account)
+        self._history_generation += 1
 
         self._jump_to_end_button.switch_contact(contact)
         self._scrolled_view.switch_contact(contact)
@@ -523,41 +538,28 @@ def _add_messages(self, messages: list[Message]):
         for msg in messages:
             self._add_db_row(msg)
 
-    def _request_messages(self, before: bool) -> Sequence[Message]:
+    def _get_request_cursors(self,
+                             before: bool
+                             ) -> tuple[HistoryCursor | None, float]:
         if before:
             row = self._scrolled_view.get_first_row()
+            event_row = self._scrolled_view.get_first_event_row()
         else:
             row = self._scrolled_view.get_last_row()
+            event_row = self._scrolled_view.get_last_event_row()
 
-        if row is None:
-            timestamp = dt.datetime.now(dt.timezone.utc)
-        else:
-            timestamp = dt.datetime.fromtimestamp(
-                row.db_timestamp, dt.timezone.utc)
-
-        return app.storage.archive.get_conversation_before_after(
-            self.contact.account,
-            self.contact.jid,
-            before,
-            timestamp,
-            REQUEST_LINES_COUNT)
-
-    def _request_events(self, before: bool) -> list[events.ApplicationEvent]:
-        if before:
-            row = self._scrolled_view.get_first_event_row()
-        else:
-            row = self._scrolled_view.get_last_event_row()
+        cursor = None
+        if row is not None:
+            cursor = HistoryCursor(
+                dt.datetime.fromtimestamp(row.db_timestamp, dt.timezone.utc),
+                row.pk)
 
-        if row is None:
-            timestamp = time.time()
+        if event_row is None:
+            event_timestamp = time.time()
         else:
-            timestamp = row.db_timestamp
+            event_timestamp = event_row.db_timestamp
 
-        assert self._contact is not None
-        return app.storage.events.load(self._contact,
-                                       before,
-                                       timestamp,
-                                       REQUEST_LINES_COUNT)
+        return cursor, event_timestamp
 
     def _request_history(self,
                          _widget: Any,
@@ -566,11 +568,47 @@ def _request_history(self,
 
         self._scrolled_view.block_signals(True)
 
-        messages = self._request_messages(before)
-        event_rows = self._request_events(before)
-        rows = self._sort_request_rows(messages, event_rows, before)
+        cursor, event_timestamp = self._get_request_cursors(before)
+        self._history_pager.request(
+            self.contact,
+            before,
+            cursor,
+            callback=partial(self._on_history_loaded,
+                             self._history_generation,
+                             before,
+                             event_timestamp),
+            error_callback=partial(
+                self._on_history_error, self._history_generation))
+
+    def _on_history_error(self, generation: int, _error: Exception) -> None:
+        if generation != self._history_generation:
+            return
+
+        self._scrolled_view.finish_history_request(False)
+        self._scrolled_view.block_signals(False)
+
+    def _on_history_loaded(self,
+                           generation: int,
+                           before: bool,
+                           event_timestamp: float,
+                           messages: Sequence[Message]
+                           ) -> None:
+
+        if generation != self._history_generation:
+            # The view was cleared or switched to another chat in the
+            # meantime, the rows are not meant for it anymore
+            return
 
         assert self._contact is not None
+
+        # The event storage lives in memory of the main thread and
+        # buffers pending events there, so it is queried here
+        event_rows = app.storage.events.load(self._contact,
+                                             before,
+                                             event_timestamp,
+                                             REQUEST_LINES_COUNT)
+
+        rows = self._sort_request_rows(messages, event_rows, before)
         for row in rows:
             if not isinstance(row, events.ApplicationEvent):
                 self._add_messages([row])
@@ -617,6 +655,11 @@ def _request_history(self,
         if len(rows) < REQUEST_LINES_COUNT:
             self._scrolled_view.set_history_complete(before, True)
 
+        # Only keep a window of rows around the visible part, rows on the
+        # opposite side are requested again when scrolling back
+        self._scrolled_view.reduce_message_count(not before)
+
+        self._scrolled_view.finish_history_request(bool(rows))
         self._scrolled_view.block_signals(False)
 
     @staticmethod
@@ -0,0 +1,237 @@
+# This file is part of Gajim.
+#
+# SPDX-License-Identifier: GPL-3.0-only
+
+from __future__ import annotations
+
+from typing import Any
+from typing import NamedTuple
+
+import datetime as dt
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Sequence
+from functools import partial
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common import ged
+from gajim.common import types
+from gajim.common.ged import EventHelper
+from gajim.common.storage.archive.models import Message
+
+log = logging.getLogger('gajim.gtk.conversation.pager')
+
+# Amount of chats for which pages are kept
+PAGE_CACHE_SIZE = 10
+
+ChatKeyT = tuple[str, JID]
+# Direction and pk of the cursor message, None for the latest page
+PageKeyT = tuple[bool, int | None]
+# Chat, page and generation of the chat when the page was requested
+RequestKeyT = tuple[ChatKeyT, PageKeyT, int]
+PageCallbackT = Callable[[Sequence[Message]], Any]
+ErrorCallbackT = Callable[[Exception], Any]
+
+# Events after which cached pages of a chat can be outdated
+INVALIDATING_EVENTS = [
+    'message-received',
+    'message-sent',
+    'message-deleted',
+    'message-acknowledged',
+    'message-corrected',
+    'message-moderated',
+    'message-error',
+    'receipt-received',
+    'displayed-received',
+    'call-stopped',
+    'file-request-received',
+    'file-request-sent',
+    'http-upload-started',
+]
+
+
+class HistoryCursor(NamedTuple):
+    timestamp: dt.datetime
+    pk: int | None
+
+
+class HistoryPager(EventHelper):
+    '''
+    Loads pages of the message history with a (timestamp, pk) cursor on the
+    storage worker. After a page was delivered the following page is
+    prefetched, and the latest page of recently viewed chats is kept.
+    '''
+
+    def __init__(self, page_size: int) -> None:
+        EventHelper.__init__(self)
+
+        self._page_size = page_size
+        self._pages: OrderedDict[ChatKeyT, dict[PageKeyT, Sequence[Message]]]
+        self._pages = OrderedDict()
+        self._in_flight: dict[
+            RequestKeyT, list[tuple[PageCallbackT, ErrorCallbackT | None]]] = {}
+        # Incremented on invalidation, pages which were requested
+        # before are delivered to their waiters but not cached
+        self._generations: dict[ChatKeyT, int] = {}
+
+        self.register_events(
+            [(name, ged.GUI1, self._on_chat_event)
+             for name in INVALIDATING_EVENTS])
+        self.register_event('raw-mam-message-received',
+                            ged.GUI1,
+                            self._on_mam_message_received)
+
+    def request(self,
+                contact: types.ChatContactT,
+                before: bool,
+                cursor: HistoryCursor | None,
+                callback: PageCallbackT,
+                error_callback: ErrorCallbackT | None = None
+                ) -> None:
+
+        chat_key = (contact.account, contact.jid)
+        page_key = (before, None if cursor is None else cursor.pk)
+
+        page = self._get_page(chat_key, page_key)
+        if page is not None:
+            log.debug('Page cache hit for %s %s', contact.jid, page_key)
+            callback(page)
+            self._prefetch(contact, before, page)
+            return
+
+        self._load(contact, before, cursor, (callback, error_callback))
+
+    def invalidate(self, account: str, jid: JID) -> None:
+        chat_key = (account, jid)
+        self._generations[chat_key] = self._generations.get(chat_key, 0) + 1
+        self._pages.pop(chat_key, None)
+
+    def _invalidate_account(self, account: str) -> None:
+        chat_keys = set(self._pages)
+        chat_keys.update(request_key[0] for request_key in self._in_flight)
+        for chat_key in chat_keys:
+            if chat_key[0] == account:
+                self.invalidate(*chat_key)
+
+    def _get_page(self,
+                  chat_key: ChatKeyT,
+                  page_key: PageKeyT
+                  ) -> Sequence[Message] | None:
+
+        pages = self._pages.get(chat_key)
+        if pages is None:
+            return None
+
+        self._pages.move_to_end(chat_key)
+        if page_key[1] is None:
+            # The latest page stays, it is used again when the chat is
+            # opened the next time
+            return pages.get(page_key)
+        return pages.pop(page_key, None)
+
+    def _store_page(self,
+                    chat_key: ChatKeyT,
+                    page_key: PageKeyT,
+                    page: Sequence[Message]
+                    ) -> None:
+
+        pages = self._pages.setdefault(chat_key, {})
+        pages[page_key] = page
+        self._pages.move_to_end(chat_key)
+        while len(self._pages) > PAGE_CACHE_SIZE:
+            self._pages.popitem(last=False)
+
+    def _prefetch(self,
+                  contact: types.ChatContactT,
+                  before: bool,
+                  page: Sequence[Message]
+                  ) -> None:
+
+        if len(page) < self._page_size:
+            # There is nothing more to load in this direction
+            return
+
+        last = page[-1]
+        chat_key = (contact.account, contact.jid)
+        pages = self._pages.get(chat_key)
+        if pages is not None and (before, last.pk) in pages:
+            return
+
+        self._load(contact, before, HistoryCursor(last.timestamp, last.pk))
+
+    def _load(self,
+              contact: types.ChatContactT,
+              before: bool,
+              cursor: HistoryCursor | None,
+              waiter: tuple[PageCallbackT, ErrorCallbackT | None] | None = None
+              ) -> None:
+
+        chat_key = (contact.account, contact.jid)
+        page_key = (before, None if cursor is None else cursor.pk)
+        request_key = (chat_key, page_key, self._generations.get(chat_key, 0))
+
+        waiters = self._in_flight.get(request_key)
+        if waiters is not None:
+            # The page is already on its way, e.g. from a prefetch
+            if waiter is not None:
+                waiters.append(waiter)
+            return
+
+        self._in_flight[request_key] = [] if waiter is None else [waiter]
+
+        if cursor is None:
+            timestamp = dt.datetime.now(dt.timezone.utc)
+            pk = None
+        else:
+            timestamp, pk = cursor
+
+        app.storage.archive.run_async(
+            app.storage.archive.get_conversation_before_after,
+            contact.account,
+            contact.jid,
+            before,
+            timestamp,
+            self._page_size,
+            pk=pk,
+            callback=partial(self._on_page_loaded, contact, request_key),
+            error_callback=partial(self._on_page_error, request_key))
+
+    def _on_page_loaded(self,
+                        contact: types.ChatContactT,
+                        request_key: RequestKeyT,
+                        page: Sequence[Message]
+                        ) -> None:
+
+        waiters = self._in_flight.pop(request_key, [])
+        chat_key, page_key, generation = request_key
+        before, cursor_pk = page_key
+
+        if generation == self._generations.get(chat_key, 0):
+            if not waiters or cursor_pk is None:
+                self._store_page(chat_key, page_key, page)
+
+        for callback, _error_callback in waiters:
+            callback(page)
+
+        if waiters:
+            self._prefetch(contact, before, page)
+
+    def _on_page_error(self,
+                       request_key: RequestKeyT,
+                       error: Exception
+                       ) -> None:
+
+        waiters = self._in_flight.pop(request_key, [])
+        for _callback, error_callback in waiters:
+            if error_callback is not None:
+                error_callback(error)
+
+    def _on_chat_event(self, event: Any) -> None:
+        self.invalidate(event.account, event.jid)
+
+    def _on_mam_message_received(self, event: Any) -> None:
+        # Archive pages are stored without further events
+        self._invalidate_account(event.account)
@@ -0,0 +1,71 @@
+# This file is part of Gajim.
+#
+# SPDX-License-Identifier: GPL-3.0-only
+
+from __future__ import annotations
+
+from typing import Any
+from typing import Generic
+from typing import TypeVar
+
+from collections.abc import Hashable
+
+RowT = TypeVar('RowT', bound=Hashable)
+
+
+class RowIndex(Generic[RowT]):
+    '''
+    Maps pks, stanza ids and message ids to the rows of a ConversationView,
+    so rows can be looked up without walking the ListBox. The keys of each
+    row are remembered, which allows removing a row without scanning
+    the maps.
+    '''
+
+    def __init__(self) -> None:
+        self._pks: dict[int, RowT] = {}
+        self._stanza_ids: dict[str, RowT] = {}
+        self._message_ids: dict[str, RowT] = {}
+        self._row_keys: dict[RowT, list[tuple[dict[Any, RowT], Any]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._row_keys)
+
+    def __contains__(self, row: object) -> bool:
+        return row in self._row_keys
+
+    def _add(self, mapping: dict[Any, RowT], key: Any, row: RowT) -> None:
+        if key is None:
+            return
+
+        mapping[key] = row
+        self._row_keys.setdefault(row, []).append((mapping, key))
+
+    def add_pk(self, row: RowT, pk: int | None) -> None:
+        self._add(self._pks, pk, row)
+
+    def add_stanza_id(self, row: RowT, stanza_id: str | None) -> None:
+        self._add(self._stanza_ids, stanza_id, row)
+
+    def add_message_id(self, row: RowT, message_id: str | None) -> None:
+        self._add(self._message_ids, message_id, row)
+
+    def remove(self, row: RowT) -> None:
+        for mapping, key in self._row_keys.pop(row, []):
+            # The key may have been taken over by another row since
+            if mapping.get(key) is row:
+                del mapping[key]
+
+    def clear(self) -> None:
+        self._pks.clear()
+        self._stanza_ids.clear()
+        self._message_ids.clear()
+        self._row_keys.clear()
+
+    def get_by_pk(self, pk: int) -> RowT | None:
+        return self._pks.get(pk)
+
+    def get_by_stanza_id(self, stanza_id: str) -> RowT | None:
+        return self._stanza_ids.get(stanza_id)
+
+    def get_by_message_id(self, message_id: str) -> RowT | None:
+        return self._message_ids.get(message_id)
@@ -35,6 +35,7 @@
 from gajim.common.storage.archive.models import Message
 from gajim.common.types import ChatContactT
 
+from gajim.gtk.conversation.row_index import RowIndex
 from gajim.gtk.conversation.rows.base import BaseRow
 from gajim.gtk.conversation.rows.call import CallRow
 from gajim.gtk.conversation.rows.command_output import CommandOutputRow
@@ -53,6 +54,9 @@
 
 log = logging.getLogger('gajim.gtk.conversation_view')
 
+# Rows which are kept around the visible part of the history
+MAX_ROW_COUNT = 200
+
 
 class ConversationView(Gtk.ScrolledWindow):
 
@@ -95,15 +99,17 @@ def __init__(self) -> None:
 
         self._list_box = Gtk.ListBox()
 
-        # Keeps track of the number of rows shown in ConversationView
-        self._row_count: int = 0
-        self._max_row_count: int = 100
+        # Maximum number of rows shown in ConversationView
+        self._max_row_count: int = MAX_ROW_COUNT
+        # Height of rows removed above and below the visible part
+        self._trimmed_above: int = 0
+        self._trimmed_below: int = 0
 
         # Keeps track of date rows we have added to the list
         self._active_date_rows: set[datetime] = set()
 
-        # message_id -> row mapping
-        self._message_id_row_map: dict[str, MessageRow] = {}
+        # pk, stanza id and message id -> row mapping
+        self._row_index: RowIndex[BaseRow] = RowIndex()
 
         self._read_marker_row = None
         self._scroll_hint_row = None
@@ -114,6 +120,9 @@ def __init__(self) -> None:
         self._upper_complete: bool = False
         self._lower_complete: bool = True
         self._requesting: str | None = None
+        # Set when the rows of the request were added, the request ends
+        # with the upper change which includes them
+        self._request_finished: bool = False
         self._block_signals = False
 
         self._signal_handlers_enabled = False
@@ -260,13 +269,15 @@ def _reset(self) -> None:
         self._upper_complete = False
         self._lower_complete = True
         self._requesting = None
+        self._request_finished = False
         self.set_history_complete(True, False)
 
         self._reset_list_box()
 
-        self._row_count = 0
+        self._trimmed_above = 0
+        self._trimmed_below = 0
         self._active_date_rows = set()
-        self._message_id_row_map = {}
+        self._row_index.clear()
         self._read_marker_row = None
         self._scroll_hint_row = None
 
@@ -293,7 +304,9 @@ def _on_adj_upper_changed(self,
         upper = adj.get_upper()
         diff = upper - self._current_upper
 
-        if diff != 0:
+        # Rows added and trimmed can have the same height, the trimmed
+        # part has to be corrected even if upper did not change
+        if diff != 0 or self._trimmed_above or self._trimmed_below:
             self._current_upper = upper
             if self._autoscroll:
                 adj.set_value(adj.get_upper() - adj.get_page_size())
@@ -302,7 +315,14 @@ def _on_adj_upper_changed(self,
                 # https://gitlab.gnome.org/GNOME/gtk/merge_requests/395
                 self.set_kinetic_scrolling(True)
                 if self._requesting == 'before':
-                    adj.set_value(adj.get_value() + diff)
+                    # Rows removed below do not move the visible part
+                    adj.set_value(
+                        adj.get_value() + diff + self._trimmed_below)
+                elif self._trimmed_above:
+                    adj.set_value(adj.get_value() - self._trimmed_above)
+
+        self._trimmed_above = 0
+        self._trimmed_below = 0
 
         if upper == adj.get_page_size():
             # There is no scrollbar
@@ -312,7 +332,17 @@ def _on_adj_upper_changed(self,
             self._autoscroll = True
             self._emit('autoscroll-changed', self._autoscroll)
 
-        self._requesting = None
+        # Upper also changes while a request is pending, e.g. if a preview
+        # is resized, the request ends only with the requested rows
+        if self._request_finished:
+            self._requesting = None
+            self._request_finished = False
+
+    def finish_history_request(self, rows_added: bool) -> None:
+        if rows_added:
+            self._request_finished = True
+        else:
+            self._requesting = None
 
     def _on_adj_value_changed(self,
                               adj: Gtk.Adjustment,
@@ -516,16 +546,14 @@ def add_message_from_db(self, message: Message) -> None:
 
         message_id = message.id
 
-        if message_id is not None:
-            self._message_id_row_map[message_id] = message_row
+        self._row_index.add_message_id(message_row, message_id)
 
         if message.corrections:
             # Store the same MessageRow object also with the message id
             # of the last correction, because we need it for XEP-0184 Receipts
             # which does not reference the original message id.
-            corr_message_id = message.get_last_correction().id
-            if corr_message_id is not None:
-                self._message_id_row_map[corr_message_id] = message_row
+            self._row_index.add_message_id(
+                message_row, message.get_last_correction().id)
 
         if message.direction == ChatDirection.INCOMING:
             assert self._read_marker_row is not None
@@ -539,6 +567,8 @@ def add_message_from_db(self, message: Message) -> None:
         self._insert_message(message_row)
 
     def _insert_message(self, message: BaseRow) -> None:
+        self._index_row(message)
+        message.connect('destroy', self._on_row_destroy)
         self._list_box.add(message)
         self._add_date_row(message.timestamp)
         self._check_for_merge(message)
@@ -548,6 +578,15 @@ def _insert_message(self, message: BaseRow) -> None:
             if message.timestamp > self._read_marker_row.timestamp:
                 self._read_marker_row.hide()
 
+    def _index_row(self, row: BaseRow) -> None:
+        self._row_index.add_pk(row, row.pk)
+        if isinstance(row, MessageRow):
+            self._row_index.add_pk(row, row.orig_pk)
+            self._row_index.add_stanza_id(row, row.stanza_id)
+
+    def _on_row_destroy(self, row: BaseRow) -> None:
+        self._row_index.remove(row)
+
     def _add_date_row(self, timestamp: datetime) -> None:
         start_of_day = get_start_of_day(timestamp.astimezone())
         if start_of_day in self._active_date_rows:
@@ -619,49 +658,60 @@ def _update_descendants(self, message: MessageRow) -> None:
             return
 
     def reduce_message_count(self, before: bool) -> bool:
-        success = False
-        row_count = len(self._list_box.get_children())
-        while row_count > self._max_row_count:
-            if before:
-                if self._reduce_messages_before():
-                    row_count -= 1
-                    success = True
-            else:
-                self._reduce_messages_after()
-                row_count -= 1
-                success = True
+        '''
+        Destroy rows above (before) or below the visible part of the
+        history, so only a window of _max_row_count rows exists. The removed
+        part is loaded again via request-history when scrolled back to it.
+        '''
 
-        return success
+        rows = [row for row in cast(list[BaseRow], self._list_box.get_children())
+                if not isinstance(row, ReadMarkerRow | ScrollHintRow)]
 
-    def _reduce_messages_before(self) -> bool:
-        success = False
+        count = len(rows) - self._max_row_count
+        if count <= 0:
+            return False
 
-        # We want to keep relevant DateRows when removing rows
-        row1 = self._get_row_at_index(2)
-        row2 = self._get_row_at_index(3)
-
-        if row1.type == 'date' and row2.type == 'date':
-            # First two rows are date rows,
-            # it’s safe to remove the fist row
-            row1.destroy()
-            success = True
-
-        if row1.type == 'date' and row2.type != 'date':
-            # First one is a date row, keep it and
-            # remove the second row instead
-            row2.destroy()
-            success = True
-
-        if row1.type != 'date':
-            # Not a date row, safe to remove
-            row1.destroy()
-            success = True
+        removable = [row for row in rows if not isinstance(row, DateRow)]
+        if before:
+            to_remove = set(removable[:count])
+        else:
+            to_remove = set(removable[-count:])
 
-        return success
+        # Remove date rows which are not followed by any row of their day
+        remaining = [row for row in rows if row not in to_remove]
+        for index, row in enumerate(remaining):
+            if not isinstance(row, DateRow):
+                continue
+            next_index = index + 1
+            if (next_index == len(remaining) or
+                    isinstance(remaining[next_index], DateRow)):
+                to_remove.add(row)
+
+        trimmed_height = 0
+        for row in to_remove:
+            trimmed_height += row.get_allocated_height()
+            if isinstance(row, DateRow):
+                self._active_date_rows.discard(row.timestamp)
+            row.destroy()
+
+        # The adjustment is corrected once the new upper is known
+        if before:
+            self._trimmed_above = trimmed_height
+            # Only date rows can be left above the first message, it has
+            # no ancestor to be merged with anymore
+            first_row = next(
+                (row for row in remaining
+                 if row not in to_remove and not isinstance(row, DateRow)),
+                None)
+            if isinstance(first_row, MessageRow):
+                first_row.set_merged(False)
+        else:
+            self._trimmed_below = trimmed_height
 
-    def _reduce_messages_after(self) -> None:
-        row = self._get_row_at_index(len(self._list_box.get_children()) - 1)
-        row.destroy()
+        self.set_history_complete(before, False)
+        log.debug('Removed %s rows %s the visible part',
+                  len(to_remove), 'above' if before else 'below')
+        return True
 
     def remove_message(self, pk: int) -> None:
         row = self.get_row_by_pk(pk)
@@ -683,15 +733,11 @@ def acknowledge_message(self, event: events.MessageAcknowledged) -> None:
             return
 
         row.set_acknowledged(event.stanza_id)
+        self._row_index.add_stanza_id(row, event.stanza_id)
         self._check_for_merge(row)
 
     def scroll_to_message_and_highlight(self, pk: int) -> None:
-        highlight_row = None
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if row.pk == pk:
-                highlight_row = row
-                break
-
+        highlight_row = self._row_index.get_by_pk(pk)
         if highlight_row is not None:
             highlight_row.get_style_context().remove_class(
                 'conversation-row-highlight')
@@ -711,7 +757,7 @@ def scroll_to_end(self) -> None:
         adj.set_value(adj.get_upper() - adj.get_page_size())
 
     def _get_row_by_message_id(self, id_: str) -> MessageRow | None:
-        return self._message_id_row_map.get(id_)
+        return cast(MessageRow | None, self._row_index.get_by_message_id(id_))
 
     def _get_message_row_by_direction(
         self,
@@ -759,21 +805,14 @@ def get_next_message_row(
             pk, direction=Direction.NEXT)
 
     def get_row_by_pk(self, pk: int) -> MessageRow | None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if not isinstance(row, MessageRow):
-                continue
-            if pk in {row.pk, row.orig_pk}:
-                return row
-
+        row = self._row_index.get_by_pk(pk)
+        if isinstance(row, MessageRow):
+            return row
         return None
 
     def get_row_by_stanza_id(self, stanza_id: str) -> MessageRow | None:
-        for row in cast(list[BaseRow], self._list_box.get_children()):
-            if not isinstance(row, MessageRow):
-                continue
-            if row.stanza_id == stanza_id:
-                return row
-        return None
+        return cast(MessageRow | None,
+                    self._row_index.get_by_stanza_id(stanza_id))
 
     def iter_rows(self) -> Generator[BaseRow, None, None]:
         yield from cast(list[BaseRow], self._list_box.get_children())
@@ -812,10 +851,11 @@ def correct_message(self, message_correction: Message) -> None:
         if message_row is None:
             return
 
-        if message_correction.id is not None:
-            self._message_id_row_map[message_correction.id] = message_row
+        self._row_index.add_message_id(message_row, message_correction.id)
 
         message_row.refresh()
+        # The row shows the correction now, which has its own pk
+        self._row_index.add_pk(message_row, message_row.pk)
 
         assert self._read_marker_row is not None
         timestamp = message_row.timestamp + timedelta(microseconds=1)
@@ -4,12 +4,18 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
+from bisect import bisect_left
 from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
 
 from gi.repository import Gio
 from gi.repository import GLib
 
+from gajim.common import configpaths
 from gajim.common.i18n import _
 from gajim.common.i18n import get_default_lang
 from gajim.common.i18n import get_short_lang_code
@@ -20,6 +26,11 @@
 
 REPLACEMENT_CHARACTER = 0xFFFD
 
+# Increase if the output of parse_emoji_data() changes
+EMOJI_CACHE_VERSION = 1
+
+EmojiDataT = dict[str, dict[str, str]]
+
 SKIN_TONE_MODIFIERS = {
     # The descriptions match the official short names, see:
     # https://github.com/unicode-org/cldr/blob/main/common/annotations/en.xml
@@ -67,16 +78,88 @@ def replace_skin_tone_placeholder(c_sequence: list[int],
     return c_mod_sequence
 
 
-def get_emoji_data() -> dict[str, dict[str, str]]:
+class EmojiIndex:
+    '''
+    Prefix index over the keywords of the emoji data. Keywords are kept
+    sorted, so all keywords starting with a prefix form one range, which
+    is found with a binary search.
+    '''
+
+    def __init__(self, emoji_data: EmojiDataT) -> None:
+        self._keywords = sorted(emoji_data)
+        self._entries = [emoji_data[keyword] for keyword in self._keywords]
+
+        # Short names which are also keywords, matches on them rank first
+        short_names = sorted(
+            (keyword, emoji)
+            for keyword, entries in emoji_data.items()
+            for short_name, emoji in entries.items()
+            if keyword == short_name)
+        self._short_names = [short_name for short_name, _emoji in short_names]
+        self._short_name_emojis = [emoji for _short_name, emoji in short_names]
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    @staticmethod
+    def _iter_prefix_range(keys: list[str], prefix: str) -> Iterator[int]:
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            yield index
+            index += 1
+
+    def search(self, prefix: str, limit: int) -> list[tuple[str, str]]:
+        '''
+        Returns up to `limit` (`emoji`, `label`) tuples for keywords starting
+        with `prefix`. Short name matches come before keyword matches.
+        '''
+        sn_matches: dict[str, str] = {}
+        for index in self._iter_prefix_range(self._short_names, prefix):
+            emoji = self._short_name_emojis[index]
+            if emoji not in sn_matches:
+                sn_matches[emoji] = f'{emoji} {self._short_names[index]}'
+                if len(sn_matches) >= limit:
+                    return list(sn_matches.items())
+
+        kw_matches: dict[str, str] = {}
+        for index in self._iter_prefix_range(self._keywords, prefix):
+            keyword = self._keywords[index]
+            for short_name, emoji in self._entries[index].items():
+                # Only add a keyword match if there is no short name match
+                if emoji in sn_matches or emoji in kw_matches:
+                    continue
+                kw_matches[emoji] = f'{emoji} {short_name}  [{keyword}]'
+                if len(sn_matches) + len(kw_matches) >= limit:
+                    return [*sn_matches.items(), *kw_matches.items()]
+
+        return [*sn_matches.items(), *kw_matches.items()]
+
+
+_emoji_data: EmojiDataT | None = None
+_emoji_index: EmojiIndex | None = None
+
+
+def get_emoji_data() -> EmojiDataT:
     '''
     Returns dict of `keyword` -> dict of `short_name` -> `emoji`, where
     `keyword` and `short_name` are as defined in
     <https://unicode.org/reports/tr35/tr35-general.html#Annotations>, and
     `emoji` is an emoji grapheme cluster.
 
-    Short names are included among keywords.
+    Short names are included among keywords. The data is loaded on the
+    first call.
     '''
-    return emoji_data
+    global _emoji_data
+    if _emoji_data is None:
+        _emoji_data = load_emoji_data()
+    return _emoji_data
+
+
+def get_emoji_index() -> EmojiIndex:
+    global _emoji_index
+    if _emoji_index is None:
+        _emoji_index = EmojiIndex(get_emoji_data())
+    return _emoji_index
 
 
 def try_load_raw_emoji_data(locale: str) -> GLib.Bytes | None:
@@ -193,21 +276,70 @@ def get_locale_fallbacks(desired: str) -> list[str]:
     return result
 
 
-app_locale = get_default_lang()
-log.info('Loading emoji data; application locale is %s', app_locale)
-short_locale = get_short_lang_code(app_locale)
-locales = get_locale_fallbacks(short_locale)
-try:
-    log.debug('Trying locales %s', locales)
-    raw_emoji_data: GLib.Bytes | None = None
-    for loc in locales:
-        raw_emoji_data = try_load_raw_emoji_data(loc)
-        if raw_emoji_data:
-            break
-    else:
-        raise RuntimeError(f'No resource could be loaded; tried {locales}')
+def get_cache_version(bytes_data: GLib.Bytes, app_locale: str) -> str:
+    '''
+    Returns a version string for parsed emoji data. Translations of
+    skin tone modifiers depend on the application locale.
+    '''
+    data = bytes_data.get_data()
+    assert data is not None
+    digest = hashlib.sha256(data).hexdigest()
+    return f'{EMOJI_CACHE_VERSION}:{app_locale}:{digest}'
+
 
-    emoji_data = parse_emoji_data(raw_emoji_data, loc)
-except Exception as err:
-    log.warning('Unable to load emoji data: %s', err)
-    emoji_data = {}
+def load_cached_emoji_data(path: Path, version: str) -> EmojiDataT | None:
+    try:
+        with path.open(encoding='utf-8') as file:
+            cache = json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as error:
+        log.warning('Unable to read emoji data cache %s: %s', path, error)
+        return None
+
+    if not isinstance(cache, dict) or cache.get('version') != version:
+        log.info('Emoji data cache %s is outdated', path)
+        return None
+    return cache['data']
+
+
+def store_cached_emoji_data(path: Path,
+                            version: str,
+                            emoji_data: EmojiDataT
+                            ) -> None:
+    tmp_path = path.with_suffix('.tmp')
+    try:
+        with tmp_path.open('w', encoding='utf-8') as file:
+            json.dump({'version': version, 'data': emoji_data}, file)
+        tmp_path.replace(path)
+    except OSError as error:
+        log.warning('Unable to write emoji data cache %s: %s', path, error)
+
+
+def load_emoji_data() -> EmojiDataT:
+    app_locale = get_default_lang()
+    log.info('Loading emoji data; application locale is %s', app_locale)
+    short_locale = get_short_lang_code(app_locale)
+    locales = get_locale_fallbacks(short_locale)
+    try:
+        log.debug('Trying locales %s', locales)
+        raw_emoji_data: GLib.Bytes | None = None
+        for loc in locales:
+            raw_emoji_data = try_load_raw_emoji_data(loc)
+            if raw_emoji_data:
+                break
+        else:
+            raise RuntimeError(f'No resource could be loaded; tried {locales}')
+
+        version = get_cache_version(raw_emoji_data, app_locale)
+        cache_path = configpaths.get('MY_CACHE') / f'emoji_data_{loc}.json'
+        emoji_data = load_cached_emoji_data(cache_path, version)
+        if emoji_data is None:
+            emoji_data = parse_emoji_data(raw_emoji_data, loc)
+            store_cached_emoji_data(cache_path, version, emoji_data)
+
+    except Exception as err:
+        log.warning('Unable to load emoji data: %s', err)
+        return {}
+
+    return emoji_data
@@ -110,6 +110,16 @@ def _on_export(self) -> None:
         time_str = current_time.strftime('%Y-%m-%d-%H-%M-%S')
         export_dir = Path(directory) / f'export_{time_str}'
 
+        app.storage.archive.run_async(
+            self._export,
+            account,
+            export_dir,
+            callback=self._on_export_finished,
+            error_callback=self._on_export_error)
+
+    def _export(self, account: str, export_dir: Path) -> str | None:
+        # Runs on the storage worker thread, returns an error text
+        # if a file could not be created
         jids = app.storage.archive.get_conversation_jids(account)
 
         for jid in jids:
@@ -121,13 +131,10 @@ def _on_export(self) -> None:
             try:
                 file_path.mkdir(parents=True, exist_ok=True)
             except OSError as err:
-                self.get_page('error').set_text(
-                    _('An error occurred while trying to create a '
-                      'file at %(path)s: %(error)s') % {
-                          'path': file_path,
-                          'error': str(err)})
-                self.show_page('error', Gtk.StackTransitionType.SLIDE_LEFT)
-                return
+                return _('An error occurred while trying to create a '
+                         'file at %(path)s: %(error)s') % {
+                             'path': file_path,
+                             'error': str(err)}
 
             with open(file_path / 'history.txt', 'w', encoding='utf-8') as file:
                 file.write(f'History for {jid}\n\n')
@@ -137,8 +144,19 @@ def _on_export(self) -> None:
 
                     file.write(self._get_export_line(message))
 
+        return None
+
+    def _on_export_finished(self, error_text: str | None) -> None:
+        if error_text is not None:
+            self.get_page('error').set_text(error_text)
+            self.show_page('error', Gtk.StackTransitionType.SLIDE_LEFT)
+            return
+
         self.show_page('success', Gtk.StackTransitionType.SLIDE_LEFT)
 
+    def _on_export_error(self, _error: Exception) -> None:
+        self.show_page('error', Gtk.StackTransitionType.SLIDE_LEFT)
+
     def _get_nickname(self, message: Message) -> str:
         if message.direction == ChatDirection.OUTGOING:
             return _('You')
@@ -24,11 +24,14 @@
 from gajim.common import app
 from gajim.common.i18n import _
 from gajim.common.preview import AudioSampleT
+from gajim.common.preview import WAVEFORM_SAMPLES
+from gajim.common.preview_helpers import downsample_audio_samples
 from gajim.common.util.text import format_duration
 
 from gajim.gtk.builder import get_builder
 from gajim.gtk.preview_audio_analyzer import AudioAnalyzer
 from gajim.gtk.preview_audio_visualizer import AudioVisualizerWidget
+from gajim.gtk.util import ensure_not_destroyed
 from gajim.gtk.util import get_cursor
 
 log = logging.getLogger('gajim.gtk.preview_audio')
@@ -91,11 +94,12 @@ def __init__(self, file_path: Path) -> None:
         self._state = app.preview_manager.get_audio_state(self._id)
         self._audio_analyzer = None
 
+        self._destroyed = False
+
         if not self._state.is_audio_analyzed:
-            # Analyze the audio to determine samples and duration,
-            # calls self._update_audio_data when done.
-            self._audio_analyzer = AudioAnalyzer(
-                file_path, self._update_duration, self._update_samples)
+            # Calls self._on_waveform_loaded when done
+            app.preview_manager.load_audio_waveform(
+                file_path, self._on_waveform_loaded)
         else:
             self._update_ui()
 
@@ -164,13 +168,36 @@ def _update_ui(self) -> None:
             len(f'-{formatted}/{formatted}'))
         self._update_timestamp_label()
 
+    @ensure_not_destroyed
+    def _on_waveform_loaded(self,
+                            waveform: tuple[float, AudioSampleT] | None
+                            ) -> None:
+
+        if waveform is not None:
+            self._state.duration, self._state.samples = waveform
+            self._state.is_audio_analyzed = True
+
+        if self._state.is_audio_analyzed:
+            self._update_ui()
+            return
+
+        # Analyze the audio to determine samples and duration,
+        # calls self._update_samples when done.
+        self._audio_analyzer = AudioAnalyzer(
+            self._file_path, self._update_duration, self._update_samples)
+
     def _update_samples(self,
                         samples: AudioSampleT,
                         ) -> None:
-        self._state.samples = samples
+        self._state.samples = downsample_audio_samples(
+            samples, WAVEFORM_SAMPLES)
         self._state.is_audio_analyzed = True
         self._update_ui()
 
+        if self._state.duration > 0 and self._state.samples:
+            app.preview_manager.store_audio_waveform(
+                self._file_path, self._state.duration, self._state.samples)
+
     def _update_duration(self, duration: float):
         self._state.duration = duration
         self._update_ui()
@@ -606,6 +633,8 @@ def _on_forward_clicked(self, _button: Gtk.Button) -> None:
         self._seek_unconditionally(new_pos)
 
     def _on_destroy(self, _widget: Gtk.Widget) -> None:
+        self._destroyed = True
+
         if self._playbin is not None:
             self._playbin.set_state(Gst.State.NULL)
             bus = self._playbin.get_bus()
@@ -6,13 +6,13 @@
 
 import logging
 import math
-from statistics import mean
 
 import cairo
 from gi.repository import Gdk
 from gi.repository import Gtk
 
 from gajim.common.preview import AudioSampleT
+from gajim.common.preview_helpers import downsample_audio_samples
 
 log = logging.getLogger('gajim.gtk.preview_audio_visualizer')
 
@@ -99,21 +99,9 @@ def _on_style_updated(self,
         self.queue_draw()
 
     def _process_samples(self) -> None:
-        # Create a subset by taking the average of three samples
-        # around every nth sample
-        num_divisions = int(self._width / (self._peak_width * 2))
-        n = math.floor(len(self._samples) / num_divisions) + 1
-
-        if n >= 2:
-            samples: AudioSampleT = []
-            samples1, samples2 = zip(*self._samples, strict=True)
-            for i in range(2, int(len(self._samples) - n / 2), n):
-                index = int(i + n / 2)
-                avg1 = mean(samples1[index - 1:index + 1])
-                avg2 = mean(samples2[index - 1:index + 1])
-                samples.append((avg1, avg2))
-        else:
-            samples = self._samples
+        # Create a subset with one sample per peak drawn
+        num_divisions = max(1, int(self._width / (self._peak_width * 2)))
+        samples = downsample_audio_samples(self._samples, num_divisions)
 
         # Normalize both channels using the same scale
         max_elem = max(max(samples))  # noqa: PLW3301
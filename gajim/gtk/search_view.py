@@ -11,6 +11,7 @@
 import logging
 import re
 from collections.abc import Iterator
+from functools import partial
 
 import cairo
 from gi.repository import GObject
@@ -53,6 +54,8 @@ def __init__(self) -> None:
         self._account: str | None = None
         self._jid: JID | None = None
         self._results_iterator: Iterator[Message] | None = None
+        self._search_generation = 0
+        self._fetching_results = False
 
         self._first_date: dt.datetime | None = None
         self._last_date: dt.datetime | None = None
@@ -98,6 +101,11 @@ def _clear(self) -> None:
         self._clear_results()
 
     def _clear_results(self) -> None:
+        # Discard results of searches which are still running
+        self._search_generation += 1
+        self._results_iterator = None
+        self._fetching_results = False
+
         # Unset the header_func to reduce load when clearing
         self._ui.results_listbox.set_header_func(None)
 
@@ -159,15 +167,60 @@ def _on_search(self, entry: Gtk.Entry) -> None:
             account = self._account
             jid = self._jid
 
-        self._results_iterator = app.storage.archive.search_archive(
-                account,
-                jid,
-                text,
-                from_users=from_filters,
-                before=before_filters,
-                after=after_filters)
+        self._fetching_results = True
+        app.storage.archive.run_async(
+            self._search,
+            account,
+            jid,
+            text,
+            from_users=from_filters,
+            before=before_filters,
+            after=after_filters,
+            callback=partial(self._on_search_finished, self._search_generation),
+            error_callback=partial(
+                self._on_results_error, self._search_generation))
 
-        self._add_results()
+    @staticmethod
+    def _search(account: str | None,
+                jid: JID | None,
+                text: str,
+                *,
+                from_users: list[str] | None,
+                before: dt.datetime | None,
+                after: dt.datetime | None
+                ) -> tuple[Iterator[Message], list[Message]]:
+
+        # Runs on the storage worker thread, the iterator must only be
+        # advanced there
+        iterator = app.storage.archive.search_archive(
+            account,
+            jid,
+            text,
+            from_users=from_users,
+            before=before,
+            after=after)
+        return iterator, SearchView._fetch_results(iterator)
+
+    @staticmethod
+    def _fetch_results(iterator: Iterator[Message]) -> list[Message]:
+        return list(itertools.islice(iterator, 25))
+
+    def _on_search_finished(self,
+                            generation: int,
+                            result: tuple[Iterator[Message], list[Message]]
+                            ) -> None:
+
+        if generation != self._search_generation:
+            return
+
+        self._results_iterator, db_rows = result
+        self._on_results_fetched(generation, db_rows)
+
+    def _on_results_error(self, generation: int, _error: Exception) -> None:
+        if generation != self._search_generation:
+            return
+
+        self._fetching_results = False
 
     @staticmethod
     def _strip_filters(text: str,
@@ -184,8 +237,27 @@ def _strip_filters(text: str,
         return new_text, filters or None
 
     def _add_results(self) -> None:
-        assert self._results_iterator is not None
-        for db_row in itertools.islice(self._results_iterator, 25):
+        if self._results_iterator is None or self._fetching_results:
+            return
+
+        self._fetching_results = True
+        app.storage.archive.run_async(
+            self._fetch_results,
+            self._results_iterator,
+            callback=partial(self._on_results_fetched, self._search_generation),
+            error_callback=partial(
+                self._on_results_error, self._search_generation))
+
+    def _on_results_fetched(self,
+                            generation: int,
+                            db_rows: list[Message]
+                            ) -> None:
+
+        if generation != self._search_generation:
+            return
+
+        self._fetching_results = False
+        for db_row in db_rows:
             result_row = ResultRow(db_row)
             self._ui.results_listbox.add(result_row)
 
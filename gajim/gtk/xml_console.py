@@ -4,7 +4,10 @@
 
 from typing import Any
 
+import logging
 import time
+from collections import deque
+from pathlib import Path
 
 import nbxmpp
 from gi.repository import Gdk
@@ -22,18 +25,27 @@
 from gajim.common.events import StanzaSent
 from gajim.common.i18n import _
 from gajim.common.logging_helpers import get_log_console_handler
+from gajim.common.stanza_log import StanzaLog
+from gajim.common.stanza_log import StanzaLogEntry
 
 from gajim.gtk.builder import get_builder
 from gajim.gtk.const import Setting
 from gajim.gtk.const import SettingKind
 from gajim.gtk.const import SettingType
 from gajim.gtk.dialogs import ErrorDialog
+from gajim.gtk.filechoosers import FileSaveDialog
 from gajim.gtk.settings import SettingsDialog
 from gajim.gtk.util import at_the_end
 from gajim.gtk.util import EventHelper
 from gajim.gtk.util import MaxWidthComboBoxText
 from gajim.gtk.util import scroll_to_end
 
+log = logging.getLogger('gajim.gtk.xml_console')
+
+# Stanzas which are rendered in the text view, all stanzas are kept in
+# the StanzaLog
+RENDER_LIMIT = 300
+
 
 class XMLConsoleWindow(Gtk.ApplicationWindow, EventHelper):
     def __init__(self) -> None:
@@ -52,6 +64,16 @@ def __init__(self) -> None:
         self._sent_stanzas = SentSzanzas()
         self._last_selected_ts = 0
         self._last_search: str = ''
+        self._last_match: tuple[int, int] | None = None
+
+        self._stanza_log = StanzaLog(
+            app.settings.get('xml_console_max_stanzas'),
+            app.settings.get('xml_console_max_bytes'))
+        # (stanza id, number of characters) of the rendered stanzas
+        self._rendered: deque[tuple[int, int]] = deque()
+        # False while an older part of the log is shown
+        self._follow_log = True
+        self._scroll_pending = False
 
         self._presence = True
         self._message = True
@@ -118,6 +140,11 @@ def __init__(self) -> None:
         self.connect('destroy', self._on_destroy)
         self._ui.connect_signals(self)
 
+        app.settings.connect_signal('xml_console_max_stanzas',
+                                    self._on_stanza_limits_changed)
+        app.settings.connect_signal('xml_console_max_bytes',
+                                    self._on_stanza_limits_changed)
+
         self.register_events([
             ('stanza-received', ged.GUI1, self._on_stanza_received),
             ('stanza-sent', ged.GUI1, self._on_stanza_sent),
@@ -127,13 +154,14 @@ def __init__(self) -> None:
 
     def _on_destroy(self, *args: Any) -> None:
         get_log_console_handler().set_callback(None)
+        app.settings.disconnect_signals(self)
         self._ui.popover.destroy()
         app.check_finalize(self)
 
     def _on_adj_upper_changed(self,
                               adj: Gtk.Adjustment,
                               _pspec: GObject.ParamSpec) -> None:
-        if adj.get_upper() == adj.get_page_size():
+        if adj.get_upper() == adj.get_page_size() and self._follow_log:
             self._ui.jump_to_end_button.set_visible(False)
 
     def _on_adj_value_changed(self,
@@ -141,12 +169,28 @@ def _on_adj_value_changed(self,
                               _pspec: GObject.ParamSpec) -> None:
         bottom = adj.get_upper() - adj.get_page_size()
         autoscroll = bottom - adj.get_value() < 1
-        self._ui.jump_to_end_button.set_visible(not autoscroll)
+        self._ui.jump_to_end_button.set_visible(
+            not autoscroll or not self._follow_log)
 
     def _on_jump_to_end_clicked(self, _button: Gtk.Button) -> None:
+        if not self._follow_log:
+            self._render_window(len(self._stanza_log) - 1)
+            self._schedule_scroll_to_end()
+            return
+
         vadjustment = self._ui.scrolled.get_vadjustment()
         vadjustment.set_value(vadjustment.get_upper())
 
+    def _schedule_scroll_to_end(self) -> None:
+        if self._scroll_pending:
+            return
+        self._scroll_pending = True
+        GLib.idle_add(self._scroll_to_end)
+
+    def _scroll_to_end(self) -> bool:
+        self._scroll_pending = False
+        return scroll_to_end(self._ui.scrolled)
+
     def _on_value_change(self, combo: Gtk.ComboBox) -> None:
         self._selected_send_account = combo.get_active_id()
 
@@ -339,40 +383,48 @@ def _on_search_clicked(self, button: Gtk.ToolButton) -> None:
 
     def _find(self, direction: Direction) -> None:
         search_str = self._ui.search_entry.get_text()
-        textbuffer = self._ui.protocol_view.get_buffer()
-        cursor_mark = textbuffer.get_insert()
-        current_pos = textbuffer.get_iter_at_mark(cursor_mark)
+        if search_str != self._last_search:
+            self._last_match = None
+        self._last_search = search_str
 
-        if current_pos.get_offset() == textbuffer.get_char_count():
-            current_pos = textbuffer.get_start_iter()
+        result = self._stanza_log.search(search_str,
+                                         direction,
+                                         start=self._last_match,
+                                         filter_func=self._is_visible)
+        if result is None:
+            # Start from the beginning on the next search
+            self._last_match = None
+            return
 
-        last_pos_mark = textbuffer.get_mark('last_pos')
-        if last_pos_mark is not None:
-            current_pos = textbuffer.get_iter_at_mark(last_pos_mark)
+        entry, offset = result
+        self._last_match = (entry.id, offset)
 
-        if search_str != self._last_search:
-            current_pos = textbuffer.get_start_iter()
-
-        if direction == Direction.NEXT:
-            match = current_pos.forward_search(
-                search_str,
-                Gtk.TextSearchFlags.VISIBLE_ONLY |
-                Gtk.TextSearchFlags.CASE_INSENSITIVE,
-                None)
-        else:
-            current_pos.backward_cursor_position()
-            match = current_pos.backward_search(
-                search_str,
-                Gtk.TextSearchFlags.VISIBLE_ONLY |
-                Gtk.TextSearchFlags.CASE_INSENSITIVE,
-                None)
-
-        if match is not None:
-            match_start, match_end = match
-            textbuffer.select_range(match_start, match_end)
+        entry_offset = self._get_buffer_offset(entry.id)
+        if entry_offset is None:
+            index = self._stanza_log.get_index(entry.id)
+            assert index is not None
+            self._render_window(index)
+            entry_offset = self._get_buffer_offset(entry.id)
+            assert entry_offset is not None
+
+        textbuffer = self._ui.protocol_view.get_buffer()
+        match_start = textbuffer.get_iter_at_offset(entry_offset + offset)
+        match_end = textbuffer.get_iter_at_offset(
+            entry_offset + offset + len(search_str))
+        textbuffer.select_range(match_start, match_end)
+
+        mark = textbuffer.get_mark('last_pos')
+        if mark is None:
             mark = textbuffer.create_mark('last_pos', match_end, True)
-            self._ui.protocol_view.scroll_to_mark(mark, 0, True, 0.5, 0.5)
-        self._last_search = search_str
+        else:
+            textbuffer.move_mark(mark, match_end)
+        self._ui.protocol_view.scroll_to_mark(mark, 0, True, 0.5, 0.5)
+
+    def _is_visible(self, entry: StanzaLogEntry) -> bool:
+        if self._selected_account not in ('AllAccounts', entry.account):
+            return False
+        return (getattr(self, f'_{entry.kind}') and
+                getattr(self, f'_{entry.type}'))
 
     @staticmethod
     def _get_accounts() -> list[tuple[str | None, str]]:
@@ -454,8 +506,29 @@ def _on_filter_destroyed(self, _widget: Gtk.Widget) -> None:
         self._filter_dialog = None
 
     def _on_clear(self, _button: Gtk.Button) -> None:
+        self._stanza_log.clear()
+        self._rendered.clear()
+        self._follow_log = True
+        self._last_match = None
         self._ui.protocol_view.get_buffer().set_text('')
 
+    def _on_export(self, _button: Gtk.Button) -> None:
+        def _on_accepted(paths: list[str]) -> None:
+            path = Path(paths[0])
+            try:
+                with path.open('w', encoding='utf-8') as file:
+                    count = self._stanza_log.export(file)
+            except OSError as error:
+                ErrorDialog(_('Could not export XML Console log'), str(error))
+                return
+
+            log.info('Exported %s stanzas to %s', count, path)
+
+        FileSaveDialog(_on_accepted,
+                       transient_for=self,
+                       path=app.settings.get('last_save_dir'),
+                       file_name='xml_console.log')
+
     def _set_account(self, value: str, _data: Any) -> None:
         self._selected_account = value
         self._set_titlebar()
@@ -516,31 +589,79 @@ def _print_stanza(self,
         if not stanza:
             return
 
-        is_at_the_end = at_the_end(self._ui.scrolled)
+        entry, removed = self._stanza_log.add(
+            event.account, account_label, kind, stanza)
+        self._remove_dropped_entries(removed)
+
+        if not self._follow_log:
+            return
+
+        if not self._scroll_pending and not at_the_end(self._ui.scrolled):
+            # Keep the view stable while older stanzas are read, the jump
+            # to end button renders the newest stanzas again
+            self._follow_log = False
+            self._ui.jump_to_end_button.set_visible(True)
+            return
+
+        self._insert_entry(entry)
+        if len(self._rendered) > RENDER_LIMIT:
+            self._remove_first_rendered()
+
+        self._schedule_scroll_to_end()
+
+    def _on_stanza_limits_changed(self, *args: Any) -> None:
+        removed = self._stanza_log.set_limits(
+            app.settings.get('xml_console_max_stanzas'),
+            app.settings.get('xml_console_max_bytes'))
+        self._remove_dropped_entries(removed)
 
+    def _remove_dropped_entries(self, removed: list[StanzaLogEntry]) -> None:
+        # Stanzas are dropped from the start of the log, so they can only
+        # be rendered at the start of the buffer
+        for removed_entry in removed:
+            if self._rendered and self._rendered[0][0] == removed_entry.id:
+                self._remove_first_rendered()
+
+    def _insert_entry(self, entry: StanzaLogEntry) -> None:
         buffer_ = self._ui.protocol_view.get_buffer()
-        end_iter = buffer_.get_end_iter()
-
-        type_ = kind
-        if stanza.startswith('<presence'):
-            type_ = 'presence'
-        elif stanza.startswith('<message'):
-            type_ = 'message'
-        elif stanza.startswith('<iq'):
-            type_ = 'iq'
-        elif stanza.startswith(('<r', '<a')):
-            type_ = 'stream'
-
-        text = '<!-- {kind} {time} ({account}) -->\n{stanza}\n\n'.format(
-            kind=kind.capitalize(),
-            time=time.strftime('%c'),
-            account=account_label,
-            stanza=stanza)
         buffer_.insert_with_tags_by_name(
-            end_iter, text, type_, kind, event.account)
+            buffer_.get_end_iter(),
+            entry.text,
+            entry.type,
+            entry.kind,
+            entry.account)
+        self._rendered.append((entry.id, len(entry.text)))
+
+    def _remove_first_rendered(self) -> None:
+        _entry_id, length = self._rendered.popleft()
+        buffer_ = self._ui.protocol_view.get_buffer()
+        buffer_.delete(buffer_.get_start_iter(),
+                       buffer_.get_iter_at_offset(length))
 
-        if is_at_the_end:
-            GLib.idle_add(scroll_to_end, self._ui.scrolled)
+    def _render_window(self, index: int) -> None:
+        '''
+        Renders RENDER_LIMIT stanzas around the stanza at index
+        '''
+
+        buffer_ = self._ui.protocol_view.get_buffer()
+        buffer_.set_text('')
+        self._rendered.clear()
+
+        count = len(self._stanza_log)
+        start = max(0, min(index - RENDER_LIMIT // 2, count - RENDER_LIMIT))
+        end = min(count, start + RENDER_LIMIT)
+        for i in range(start, end):
+            self._insert_entry(self._stanza_log.get_entry(i))
+
+        self._follow_log = end == count
+
+    def _get_buffer_offset(self, entry_id: int) -> int | None:
+        offset = 0
+        for rendered_id, length in self._rendered:
+            if rendered_id == entry_id:
+                return offset
+            offset += length
+        return None
 
 
 class SentSzanzas:
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# Measures the time CacheStorage spends loading DiscoInfo at startup,
+# compared to parsing every stored entry like before
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nbxmpp.modules.discovery import parse_disco_info  # noqa: E402
+from nbxmpp.protocol import Iq  # noqa: E402
+from nbxmpp.protocol import JID  # noqa: E402
+
+from gajim.common import app  # noqa: E402, F401
+from gajim.common.storage.cache import CacheStorage  # noqa: E402
+
+logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+
+DISCO_INFO = '''
+<iq xmlns="jabber:client" type="result" from="{jid}" id="1">
+    <query xmlns="http://jabber.org/protocol/disco#info">
+        <identity category="client" type="pc" name="Client {index}"/>
+        {features}
+    </query>
+</iq>'''
+
+
+def fill_storage(storage: CacheStorage, entries: int) -> list[JID]:
+    logging.info('Store %s DiscoInfo and %s caps entries', entries, entries)
+    features = '\n'.join(
+        f'<feature var="urn:xmpp:feature:{i}"/>' for i in range(30))
+
+    jids: list[JID] = []
+    for index in range(entries):
+        jid = JID.from_string(f'user{index}@example.org/res')
+        stanza = DISCO_INFO.format(jid=jid, index=index, features=features)
+        disco_info = parse_disco_info(Iq(node=stanza))
+        disco_info = disco_info._replace(timestamp=time.time())
+        storage.set_last_disco_info(jid, disco_info)
+        storage.add_caps_entry(jid, 'sha-1', str(index), disco_info)
+        jids.append(jid)
+
+    storage._commit()
+    return jids
+
+
+def load(storage: CacheStorage) -> float:
+    storage._disco_info_cache.clear()
+    storage._entity_caps_cache.clear()
+
+    start = time.perf_counter()
+    storage._fill_disco_info_cache()
+    storage._load_caps_data()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=5000)
+    args = parser.parse_args()
+
+    storage = CacheStorage(in_memory=True)
+    storage.init()
+    jids = fill_storage(storage, args.entries)
+
+    startup = load(storage)
+
+    start = time.perf_counter()
+    storage.get_last_disco_info(jids[0])
+    first_access = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index, jid in enumerate(jids):
+        storage.get_last_disco_info(jid)
+        storage.get_caps_entry('sha-1', str(index))
+    parse_all = time.perf_counter() - start + first_access
+
+    logging.info('Startup load (lazy):           %.1f ms', startup * 1000)
+    logging.info('Startup load (parse all):      %.1f ms',
+                 (startup + parse_all) * 1000)
+    logging.info('Saved at startup:              %.1f ms', parse_all * 1000)
+    logging.info('First access of one entry:     %.3f ms', first_access * 1000)
+
+    storage.shutdown()
+
+
+if __name__ == '__main__':
+    main()
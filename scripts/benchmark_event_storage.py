@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# Measures EventStorage.load() latency with and without the idx_event index
+
+from typing import Any
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import sqlalchemy as sa  # noqa: E402
+from nbxmpp.protocol import JID  # noqa: E402
+
+from gajim.common import app  # noqa: E402, F401
+from gajim.common.storage.events.storage import EventStorage  # noqa: E402
+
+logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+
+ACCOUNT = 'benchmark'
+BATCH_SIZE = 100_000
+
+
+def fill_storage(storage: EventStorage, rows: int, chats: int) -> list[Any]:
+    logging.info('Insert %s rows into %s chats', rows, chats)
+    start = datetime.now(timezone.utc) - timedelta(seconds=rows)
+    contacts = [
+        SimpleNamespace(account=ACCOUNT,
+                        jid=JID.from_string(f'room{i}@conference.org'))
+        for i in range(chats)
+    ]
+
+    data = '{"is_self": false, "nick": "nick", "status_codes": null}'
+    with storage.get_session() as session, session.begin():
+        account_pk = storage._get_account_pk(session, ACCOUNT)
+        remote_pks = [storage._get_remote_pk(session, contact.jid)
+                      for contact in contacts]
+
+    engine = storage.get_engine()
+    for offset in range(0, rows, BATCH_SIZE):
+        count = min(BATCH_SIZE, rows - offset)
+        batch = [
+            (account_pk,
+             random.choice(remote_pks),
+             'muc-user-joined',
+             (start + timedelta(seconds=offset + i)).timestamp(),
+             data)
+            for i in range(count)
+        ]
+        with engine.begin() as con:
+            con.exec_driver_sql(
+                'INSERT INTO event (fk_account_pk, fk_remote_pk, event, '
+                'timestamp, data) VALUES (?, ?, ?, ?, ?)', batch)
+
+    with engine.begin() as con:
+        con.exec_driver_sql('ANALYZE')
+
+    return contacts
+
+
+def measure(storage: EventStorage, contacts: list[Any], runs: int) -> float:
+    now = time.time()
+    durations: list[float] = []
+    for _ in range(runs):
+        contact = random.choice(contacts)
+        start = time.perf_counter()
+        storage.load(contact, True, now, 50)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark loading events from the event storage')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--chats', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    event_storage = EventStorage(max_events_per_chat=None)
+    event_storage.init()
+    chat_contacts = fill_storage(event_storage, args.rows, args.chats)
+
+    with_index = measure(event_storage, chat_contacts, args.runs)
+    logging.info('load() with idx_event: %.2f ms (median)', with_index)
+
+    with event_storage.get_engine().begin() as connection:
+        connection.execute(sa.text('DROP INDEX idx_event'))
+
+    without_index = measure(event_storage, chat_contacts, args.runs)
+    logging.info('load() without idx_event: %.2f ms (median)', without_index)
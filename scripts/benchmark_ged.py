@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# Measures the per stanza overhead of raising StanzaReceived events,
+# compared to building and dispatching the event for every stanza
+# like before
+
+from typing import Any
+
+import argparse
+import inspect
+import logging
+import sys
+import timeit
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nbxmpp import NodeProcessed  # noqa: E402
+from nbxmpp.protocol import Message  # noqa: E402
+
+from gajim.common import app  # noqa: E402, F401
+from gajim.common import ged  # noqa: E402
+from gajim.common.events import ApplicationEvent  # noqa: E402
+from gajim.common.events import StanzaReceived  # noqa: E402
+
+logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+log = logging.getLogger('gajim.c.ged')
+
+ACCOUNT = 'testacc1'
+
+
+def legacy_raise_event(dispatcher: ged.GlobalEventsDispatcher,
+                       event_obj: ApplicationEvent) -> Any:
+
+    event_name = event_obj.name
+    log.debug('Raise event: %s', event_name)
+    if event_name in dispatcher.handlers:
+        node_processed = False
+        for _priority, handler in list(dispatcher.handlers[event_name]):
+            try:
+                if inspect.ismethod(handler):
+                    log.debug('Call handler %s on %s',
+                              handler.__name__,
+                              handler.__self__)
+                else:
+                    log.debug('Call handler %s', handler.__name__)
+                if handler(event_obj):
+                    return True
+            except NodeProcessed:
+                node_processed = True
+            except Exception:
+                log.error('Error while running an event handler: %s',
+                          handler)
+                traceback.print_exc()
+        if node_processed:
+            raise NodeProcessed
+    return None
+
+
+class Console:
+    def on_stanza_received(self, _event: StanzaReceived) -> None:
+        pass
+
+
+def measure(dispatcher: ged.GlobalEventsDispatcher,
+            stanza: Message,
+            stanzas: int,
+            repeat: int) -> tuple[float, float]:
+
+    def legacy() -> None:
+        for _ in range(stanzas):
+            legacy_raise_event(dispatcher,
+                               StanzaReceived(account=ACCOUNT, stanza=stanza))
+
+    def current() -> None:
+        for _ in range(stanzas):
+            if not dispatcher.has_handlers('stanza-received'):
+                continue
+            dispatcher.raise_event(
+                StanzaReceived(account=ACCOUNT, stanza=stanza))
+
+    legacy_time = min(timeit.repeat(legacy, number=1, repeat=repeat))
+    current_time = min(timeit.repeat(current, number=1, repeat=repeat))
+    return legacy_time / stanzas, current_time / stanzas
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stanzas', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    dispatcher = ged.GlobalEventsDispatcher()
+    stanza = Message(to='romeo@montague.lit', body='Hello')
+
+    # Other events have handlers, like in a running client
+    for index in range(50):
+        dispatcher.register_event_handler(
+            f'event-{index}', ged.GUI1, Console().on_stanza_received)
+
+    legacy, current = measure(dispatcher, stanza, args.stanzas, args.repeat)
+    logging.info('XML console closed')
+    logging.info('  build and raise event: %.3f µs per stanza', legacy * 1e6)
+    logging.info('  check for handlers:    %.3f µs per stanza', current * 1e6)
+
+    dispatcher.register_event_handler(
+        'stanza-received', ged.GUI1, Console().on_stanza_received)
+
+    legacy, current = measure(dispatcher, stanza, args.stanzas, args.repeat)
+    logging.info('XML console open')
+    logging.info('  legacy dispatch:       %.3f µs per stanza', legacy * 1e6)
+    logging.info('  cached handlers:       %.3f µs per stanza', current * 1e6)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# Compares message_needs_highlight with the former find() based matcher
+
+import argparse
+import logging
+import random
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gajim.common import app  # noqa: E402
+from gajim.common.helpers import message_needs_highlight  # noqa: E402
+from gajim.common.settings import Settings  # noqa: E402
+
+logging.basicConfig(level='INFO', format='%(levelname)s: %(message)s')
+
+NICKNAME = 'Romeo'
+OWN_JID = 'romeo@montague.lit'
+
+WORDS = [
+    'hello', 'anyone', 'release', 'build', 'thanks', 'window', 'server',
+    'https://example.org/issues/1234', 'crash', 'log', 'works', 'for', 'me',
+    'romeon', 'gajimx', 'the', 'a', 'is', 'does', 'not', 'with', 'update',
+]
+
+
+def legacy_needs_highlight(text: str,
+                           highlight_words: str,
+                           nickname: str,
+                           own_jid: str) -> bool:
+
+    search_strings = highlight_words.split(';')
+    search_strings.append(nickname)
+    search_strings.append(own_jid)
+
+    search_strings = [word.lower() for word in search_strings if word]
+    text = text.lower()
+
+    for search_string in search_strings:
+        match = text.find(search_string)
+
+        while match > -1:
+            search_end = match + len(search_string)
+
+            if match == 0 and search_end == len(text):
+                return True
+
+            char_before_allowed = bool(
+                match == 0 or
+                (not text[match - 1].isalpha() and
+                 text[match - 1] not in ('/', '-')))
+
+            if char_before_allowed and search_end == len(text):
+                return True
+
+            if char_before_allowed and not text[search_end].isalpha():
+                return True
+
+            start = match + 1
+            match = text.find(search_string, start)
+
+    return False
+
+
+def generate_corpus(count: int) -> list[str]:
+    rng = random.Random(0)
+    corpus: list[str] = []
+    for _ in range(count):
+        length = rng.choice((3, 8, 20, 60, 300))
+        corpus.append(' '.join(rng.choice(WORDS) for _ in range(length)))
+    return corpus
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', type=Path,
+                        help='Text file with one group chat message per line')
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--highlight-words', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus is not None:
+        corpus = args.corpus.read_text(encoding='utf-8').splitlines()
+    else:
+        corpus = generate_corpus(args.messages)
+
+    highlight_words = ';'.join(
+        ['gajim', 'release'] +
+        [f'keyword{i}' for i in range(args.highlight_words)])
+    app.settings = Settings(in_memory=True)
+    app.settings.init()
+    app.settings.set('muc_highlight_words', highlight_words)
+
+    for text in corpus:
+        assert (message_needs_highlight(text, NICKNAME, OWN_JID) ==
+                legacy_needs_highlight(text, highlight_words, NICKNAME, OWN_JID))
+
+    legacy = min(timeit.repeat(
+        lambda: [legacy_needs_highlight(text, highlight_words, NICKNAME, OWN_JID)
+                 for text in corpus],
+        number=1, repeat=args.repeat))
+    compiled = min(timeit.repeat(
+        lambda: [message_needs_highlight(text, NICKNAME, OWN_JID)
+                 for text in corpus],
+        number=1, repeat=args.repeat))
+
+    logging.info('%s messages, %s highlight words',
+                 len(corpus), args.highlight_words + 2)
+    logging.info('find() loops:     %.1f ms', legacy * 1000)
+    logging.info('compiled pattern: %.1f ms', compiled * 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import io
+import os
+import unittest
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import algorithms
+from cryptography.hazmat.primitives.ciphers import Cipher
+from cryptography.hazmat.primitives.ciphers.modes import GCM
+
+from gajim.common.util.crypto import aes_gcm_encrypt_stream
+from gajim.common.util.crypto import AES_GCM_TAG_SIZE
+from gajim.common.util.crypto import AESGCMKey
+
+
+def decrypt(key: AESGCMKey, payload: bytes) -> bytes:
+    data = payload[:-AES_GCM_TAG_SIZE]
+    tag = payload[-AES_GCM_TAG_SIZE:]
+    decryptor = Cipher(algorithms.AES(key.key),
+                       GCM(key.iv, tag=tag),
+                       backend=default_backend()).decryptor()
+    return decryptor.update(data) + decryptor.finalize()
+
+
+class Test(unittest.TestCase):
+
+    def test_aes_gcm_encrypt_stream(self) -> None:
+        key = AESGCMKey.generate()
+        for size in (0, 1, 1000, 4096, 10000):
+            data = os.urandom(size)
+            chunks = list(aes_gcm_encrypt_stream(io.BytesIO(data),
+                                                 key,
+                                                 chunk_size=1024))
+            self.assertTrue(all(len(chunk) <= 1024 + AES_GCM_TAG_SIZE
+                                for chunk in chunks))
+
+            payload = b''.join(chunks)
+            self.assertEqual(len(payload), size + AES_GCM_TAG_SIZE)
+            self.assertEqual(decrypt(key, payload), data)
+
+
+if __name__ == '__main__':
+    unittest.main()
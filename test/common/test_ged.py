@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import unittest
+from dataclasses import dataclass
+from dataclasses import field
+
+from nbxmpp import NodeProcessed
+
+from gajim.common import app  # noqa: F401  (avoid circular imports)
+from gajim.common import ged
+from gajim.common.events import ApplicationEvent
+
+
+@dataclass
+class DummyEvent(ApplicationEvent):
+    name: str = field(init=False, default='dummy-event')
+
+
+class GlobalEventsDispatcherTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._ged = ged.GlobalEventsDispatcher()
+        self._calls: list[str] = []
+
+    def _handler_gui(self, _event: DummyEvent) -> None:
+        self._calls.append('gui')
+
+    def _handler_core(self, _event: DummyEvent) -> None:
+        self._calls.append('core')
+
+    def test_has_handlers(self) -> None:
+        self.assertFalse(self._ged.has_handlers('dummy-event'))
+
+        self._ged.register_event_handler(
+            'dummy-event', ged.GUI1, self._handler_gui)
+        self.assertTrue(self._ged.has_handlers('dummy-event'))
+
+        self._ged.remove_event_handler(
+            'dummy-event', ged.GUI1, self._handler_gui)
+        self.assertFalse(self._ged.has_handlers('dummy-event'))
+
+        self._ged.raise_event(DummyEvent())
+        self.assertEqual(self._calls, [])
+
+    def test_priority(self) -> None:
+        self._ged.register_event_handler(
+            'dummy-event', ged.GUI1, self._handler_gui)
+        self._ged.register_event_handler(
+            'dummy-event', ged.CORE, self._handler_core)
+        self._ged.register_event_handler(
+            'dummy-event', ged.CORE, self._handler_core)
+
+        self._ged.raise_event(DummyEvent())
+        self.assertEqual(self._calls, ['core', 'gui'])
+
+    def test_remove_while_raising(self) -> None:
+        def _remove(_event: DummyEvent) -> None:
+            self._ged.remove_event_handler(
+                'dummy-event', ged.GUI1, self._handler_gui)
+
+        self._ged.register_event_handler('dummy-event', ged.CORE, _remove)
+        self._ged.register_event_handler(
+            'dummy-event', ged.GUI1, self._handler_gui)
+
+        # Handlers are removed for the next event
+        self._ged.raise_event(DummyEvent())
+        self.assertEqual(self._calls, ['gui'])
+        self._ged.raise_event(DummyEvent())
+        self.assertEqual(self._calls, ['gui'])
+
+    def test_stop_and_node_processed(self) -> None:
+        def _stop(_event: DummyEvent) -> bool:
+            return True
+
+        def _node_processed(_event: DummyEvent) -> None:
+            raise NodeProcessed
+
+        self._ged.register_event_handler(
+            'dummy-event', ged.CORE, _node_processed)
+        self._ged.register_event_handler(
+            'dummy-event', ged.GUI1, self._handler_gui)
+
+        with self.assertRaises(NodeProcessed):
+            self._ged.raise_event(DummyEvent())
+        self.assertEqual(self._calls, ['gui'])
+
+        self._ged.register_event_handler('dummy-event', ged.PRECORE, _stop)
+        self.assertTrue(self._ged.raise_event(DummyEvent()))
+        self.assertEqual(self._calls, ['gui'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from nbxmpp.structs import ProxyData
+
+from gajim.common.util.http import HTTPSessionPool
+
+PROXY1 = ProxyData(type='socks5', host='localhost:9050',
+                   username=None, password=None)
+PROXY2 = ProxyData(type='http', host='localhost:3128',
+                   username=None, password=None)
+
+
+@patch.object(HTTPSessionPool, '_create_session',
+              new=staticmethod(lambda proxy: MagicMock()))
+class HTTPSessionPoolTest(unittest.TestCase):
+    def test_reuse_session(self) -> None:
+        pool = HTTPSessionPool()
+        session = pool.get_session('account1', PROXY1)
+        self.assertIs(pool.get_session('account1', PROXY1), session)
+        self.assertIsNot(pool.get_session('account2', PROXY1), session)
+        self.assertIsNot(pool.get_session(None, None), session)
+        self.assertEqual(len(pool), 3)
+
+    def test_proxy_change(self) -> None:
+        pool = HTTPSessionPool()
+        session = pool.get_session('account1', PROXY1)
+        other_session = pool.get_session('account2', PROXY1)
+
+        new_session = pool.get_session('account1', PROXY2)
+        self.assertIsNot(new_session, session)
+        self.assertEqual(len(pool), 2)
+        self.assertIs(pool.get_session('account2', PROXY1), other_session)
+
+    def test_invalidate(self) -> None:
+        pool = HTTPSessionPool()
+        session = pool.get_session('account1', None)
+        pool.invalidate('account1')
+        self.assertEqual(len(pool), 0)
+        self.assertIsNot(pool.get_session('account1', None), session)
+
+    def test_idle_eviction(self) -> None:
+        pool = HTTPSessionPool(idle_timeout=10)
+        with patch('gajim.common.util.http.time.monotonic') as monotonic:
+            monotonic.return_value = 100
+            session = pool.get_session('account1', None)
+            pool.get_session('account2', None)
+
+            monotonic.return_value = 105
+            self.assertIs(pool.get_session('account1', None), session)
+
+            monotonic.return_value = 112
+            pool.get_session(None, None)
+            self.assertEqual(len(pool), 2)
+
+            monotonic.return_value = 200
+            self.assertIsNot(pool.get_session('account1', None), session)
+            self.assertEqual(len(pool), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
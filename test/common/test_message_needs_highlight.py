@@ -1,6 +1,7 @@
 import unittest
 
 from gajim.common import app
+from gajim.common.helpers import _get_highlight_pattern
 from gajim.common.helpers import message_needs_highlight
 
 app.settings.set('muc_highlight_words', 'test;gajim')
@@ -57,3 +58,22 @@ def test_highlight(self):
         self.assertFalse(message_needs_highlight(f_text_url_1, NICK, JID))
         self.assertFalse(message_needs_highlight(f_text_url_2, NICK, JID))
         self.assertFalse(message_needs_highlight(f_text_url_3, NICK, JID))
+
+    def test_highlight_words_changed(self):
+        _get_highlight_pattern.cache_clear()
+        self.assertFalse(message_needs_highlight('Hello world', NICK, JID))
+        self.assertFalse(message_needs_highlight('Hello again', NICK, JID))
+        self.assertEqual(_get_highlight_pattern.cache_info().misses, 1)
+
+        app.settings.set('muc_highlight_words', 'test;gajim;world')
+        self.assertTrue(message_needs_highlight('Hello world', NICK, JID))
+        self.assertTrue(message_needs_highlight('Hello Juliet', 'Juliet', JID))
+        self.assertEqual(_get_highlight_pattern.cache_info().misses, 3)
+
+        app.settings.set('muc_highlight_words', 'test;gajim')
+        self.assertFalse(message_needs_highlight('Hello world', NICK, JID))
+
+    def test_special_characters(self):
+        self.assertTrue(message_needs_highlight('Hi r.o+m?', 'R.O+M?', JID))
+        self.assertFalse(message_needs_highlight('Hi rXo+m?', 'R.O+M?', JID))
+        self.assertFalse(message_needs_highlight('Hi', '', ''))
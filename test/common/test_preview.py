@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from typing import Any
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from gajim.common import configpaths
+from gajim.common.preview import PreviewManager
+from gajim.common.preview import WAVEFORM_VERSION
+from gajim.common.preview_helpers import get_file_hash
+
+
+def _write_file(path: Path,
+                data: bytes,
+                callback: Any,
+                user_data: Any) -> None:
+
+    path.write_bytes(data)
+    callback(True, None, user_data)
+
+
+class AudioWaveformTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp_dir.cleanup)
+        directory = Path(self._tmp_dir.name)
+
+        with patch.object(configpaths, 'get', return_value=directory):
+            self._manager = PreviewManager()
+
+        patcher = patch('gajim.common.preview.write_file_async', _write_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self._audio_path = directory / 'audio.ogg'
+        self._audio_path.write_bytes(b'audio')
+        self._waveform_path = (directory / 'downloads.thumb' /
+                               f'{get_file_hash(self._audio_path)}'
+                               '_waveform.json')
+        self._waveform_path.parent.mkdir(exist_ok=True)
+
+    def _load(self) -> Any:
+        callback = MagicMock()
+        with patch('gajim.common.preview.GLib.idle_add') as idle_add:
+            self._manager._load_audio_waveform_thread(
+                self._audio_path, callback)
+        idle_add.assert_called_once()
+        func, waveform = idle_add.call_args.args
+        self.assertIs(func, callback)
+        return waveform
+
+    def test_round_trip(self) -> None:
+        # Cache miss, the path is known afterwards
+        self.assertIsNone(self._load())
+
+        samples = [(0.123456, 0.5), (1.0, 0.25)]
+        self._manager.store_audio_waveform(self._audio_path, 2.5, samples)
+        self.assertTrue(self._waveform_path.exists())
+
+        self.assertEqual(self._load(), (2.5, [(0.12346, 0.5), (1.0, 0.25)]))
+
+    def test_store_without_hash(self) -> None:
+        # Storing must not hash the file on the main thread
+        self._manager.store_audio_waveform(self._audio_path, 2.5, [(1, 1)])
+        self.assertFalse(self._waveform_path.exists())
+
+    def test_version_mismatch(self) -> None:
+        self._waveform_path.write_text(json.dumps({
+            'version': WAVEFORM_VERSION + 1,
+            'duration': 2.5,
+            'samples': [(1.0, 1.0)],
+        }))
+        self.assertIsNone(self._load())
+
+    def test_corrupt_json(self) -> None:
+        self._waveform_path.write_text('{"version": ')
+        self.assertIsNone(self._load())
+
+        self._waveform_path.write_text(json.dumps({
+            'version': WAVEFORM_VERSION,
+            'duration': 2.5,
+            'samples': [1.0],
+        }))
+        self.assertIsNone(self._load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+
+from gajim.common.preview_helpers import downsample_audio_samples
+from gajim.common.preview_helpers import get_file_hash
+
+
+class PreviewHelpersTest(unittest.TestCase):
+    def test_downsample_audio_samples(self) -> None:
+        samples = [(float(i), float(i * 2)) for i in range(10)]
+
+        self.assertEqual(downsample_audio_samples(samples, 20), samples)
+        self.assertEqual(downsample_audio_samples(samples, 10), samples)
+
+        self.assertEqual(downsample_audio_samples(samples, 5),
+                         [(0.5, 1.0), (2.5, 5.0), (4.5, 9.0),
+                          (6.5, 13.0), (8.5, 17.0)])
+
+        # Blocks differ in size by at most one sample
+        result = downsample_audio_samples(samples, 3)
+        self.assertEqual(result, [(1.0, 2.0), (4.0, 8.0), (7.5, 15.0)])
+
+        self.assertEqual(downsample_audio_samples(samples, 1), [(4.5, 9.0)])
+        self.assertEqual(downsample_audio_samples([], 5), [])
+
+    def test_get_file_hash(self) -> None:
+        data = b'x' * 100000
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'audio.ogg'
+            path.write_bytes(data)
+            self.assertEqual(get_file_hash(path),
+                             hashlib.sha256(data).hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
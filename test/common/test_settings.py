@@ -0,0 +1,143 @@
+from typing import Any
+
+import json
+import unittest
+from unittest.mock import patch
+
+from nbxmpp.protocol import JID
+
+from gajim.common.settings import Settings
+
+ACCOUNT = 'testacc1'
+CONTACT_JID = JID.from_string('contact@example.org')
+ROOM_JID = JID.from_string('room@conference.example.org')
+
+
+class SettingsStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._settings = Settings(in_memory=True)
+        self._settings.init()
+        self._settings.add_account(ACCOUNT)
+
+    def _reload(self) -> None:
+        self._settings._commit()
+        self._settings._account_settings.clear()
+        self._settings._load_account_settings()
+
+    def _get_rows(self) -> list[tuple[str, str, str, str]]:
+        return self._settings._con.execute(
+            'SELECT scope, jid, name, value FROM account_setting '
+            'ORDER BY scope, jid, name').fetchall()
+
+    def test_store_single_settings(self) -> None:
+        self._settings.set_account_setting(ACCOUNT, 'name', 'user')
+        self._settings.set_account_setting(ACCOUNT, 'resource', 'pc')
+        self._settings.set_contact_setting(
+            ACCOUNT, CONTACT_JID, 'encryption', 'OMEMO')
+        self._settings.set_group_chat_setting(
+            ACCOUNT, ROOM_JID, 'print_status', True)
+
+        self.assertEqual(self._get_rows(), [
+            ('account', '', 'name', '"user"'),
+            ('account', '', 'resource', '"pc"'),
+            ('contact', str(CONTACT_JID), 'encryption', '"OMEMO"'),
+            ('group_chat', str(ROOM_JID), 'print_status', 'true'),
+        ])
+
+        self._settings.set_account_setting(ACCOUNT, 'resource', 'laptop')
+        self._settings.set_contact_setting(
+            ACCOUNT, CONTACT_JID, 'encryption', None)
+
+        self.assertEqual(self._get_rows(), [
+            ('account', '', 'name', '"user"'),
+            ('account', '', 'resource', '"laptop"'),
+            ('group_chat', str(ROOM_JID), 'print_status', 'true'),
+        ])
+
+        self._reload()
+        self.assertEqual(
+            self._settings.get_account_setting(ACCOUNT, 'resource'), 'laptop')
+        self.assertTrue(self._settings.get_group_chat_setting(
+            ACCOUNT, ROOM_JID, 'print_status'))
+        self.assertEqual(self._settings.get_contact_setting(
+            ACCOUNT, CONTACT_JID, 'encryption'), '')
+
+    def test_remove_account(self) -> None:
+        self._settings.set_account_setting(ACCOUNT, 'name', 'user')
+        self._settings.remove_account(ACCOUNT)
+
+        self.assertEqual(self._get_rows(), [])
+        self._reload()
+        self.assertEqual(self._settings.get_accounts(), [])
+
+    def _create_old_account_settings(self,
+                                     settings: dict[str, Any],
+                                     drop_new_tables: bool = True) -> None:
+
+        con = self._settings._con
+        if drop_new_tables:
+            con.executescript('''
+                DROP TABLE accounts;
+                DROP TABLE account_setting;
+            ''')
+
+        con.executescript('''
+            CREATE TABLE account_settings (
+                account TEXT UNIQUE,
+                settings TEXT
+            );
+            PRAGMA user_version=5;
+        ''')
+        con.execute('INSERT INTO account_settings VALUES (?, ?)',
+                    (ACCOUNT, json.dumps(settings)))
+
+        self._settings._account_settings.clear()
+        self._settings._load_account_settings()
+
+    def test_migrate_account_settings(self) -> None:
+        settings = {
+            'account': {'name': 'user', 'roster_version': 'ver1'},
+            'contact': {str(CONTACT_JID): {'encryption': 'OMEMO'}},
+            'group_chat': {str(ROOM_JID): {'print_status': False}},
+        }
+
+        self._create_old_account_settings(settings)
+        self._settings._migrate()
+        self.assertEqual(self._settings._get_user_version(), 7)
+
+        self._reload()
+        del settings['account']['roster_version']
+        self.assertEqual(self._settings._account_settings[ACCOUNT], settings)
+
+    def test_migrate_account_settings_interrupted(self) -> None:
+        settings: dict[str, Any] = {
+            'account': {'name': 'user'},
+            'contact': {},
+            'group_chat': {},
+        }
+
+        # Rows of an earlier migration attempt are replaced
+        self._settings.set_account_setting(ACCOUNT, 'resource', 'pc')
+        self._create_old_account_settings(settings, drop_new_tables=False)
+
+        with (patch.object(self._settings,
+                           '_write_account_settings',
+                           side_effect=RuntimeError),
+              self.assertRaises(RuntimeError)):
+            self._settings._migrate()
+
+        # Nothing of the failed attempt was committed
+        self.assertEqual(self._settings._get_user_version(), 6)
+        self.assertTrue(self._settings._has_table('account_settings'))
+
+        self._settings._migrate()
+        self.assertEqual(self._settings._get_user_version(), 7)
+        self.assertFalse(self._settings._has_table('account_settings'))
+        self.assertEqual(self._get_rows(), [('account', '', 'name', '"user"')])
+
+        self._reload()
+        self.assertEqual(self._settings._account_settings[ACCOUNT], settings)
+
+
+if __name__ == '__main__':
+    unittest.main()
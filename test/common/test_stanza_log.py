@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import unittest
+
+from gajim.common.const import Direction
+from gajim.common.stanza_log import StanzaLog
+
+ACCOUNT = 'testacc1'
+
+
+def add(stanza_log: StanzaLog, stanza: str, kind: str = 'incoming') -> int:
+    entry, _removed = stanza_log.add(ACCOUNT, 'Test', kind, stanza, 0)
+    return entry.id
+
+
+class StanzaLogTest(unittest.TestCase):
+    def test_max_count(self) -> None:
+        stanza_log = StanzaLog(max_count=3, max_bytes=100000)
+        for i in range(3):
+            add(stanza_log, f'<iq id="{i}"/>')
+
+        entry, removed = stanza_log.add(ACCOUNT, 'Test', 'outgoing', '<r/>')
+        self.assertEqual(entry.type, 'stream')
+        self.assertEqual([e.id for e in removed], [0])
+        self.assertEqual([e.id for e in stanza_log], [1, 2, 3])
+        self.assertIsNone(stanza_log.get_index(0))
+        self.assertEqual(stanza_log.get_index(3), 2)
+
+        # Lowering the limit drops the oldest stanzas right away
+        removed = stanza_log.set_limits(max_count=1, max_bytes=100000)
+        self.assertEqual([e.id for e in removed], [1, 2])
+        self.assertEqual([e.id for e in stanza_log], [3])
+
+    def test_max_bytes(self) -> None:
+        stanza_log = StanzaLog(max_count=100, max_bytes=1000)
+        for _ in range(20):
+            add(stanza_log, '<message>' + 'x' * 100 + '</message>')
+
+        self.assertLessEqual(stanza_log.size, 1000)
+        self.assertEqual(stanza_log.size,
+                         sum(entry.size for entry in stanza_log))
+
+        # Entries hold no other copy of the stanza than the counted text
+        entry = next(iter(stanza_log))
+        self.assertEqual(entry.size, len(entry.text.encode()))
+        self.assertFalse(hasattr(entry, 'stanza'))
+
+        # The newest stanza is kept even if it is too large
+        add(stanza_log, '<message>' + 'x' * 2000 + '</message>')
+        self.assertEqual(len(stanza_log), 1)
+
+        removed = stanza_log.set_limits(max_count=100, max_bytes=0)
+        self.assertEqual(removed, [])
+
+        stanza_log.clear()
+        self.assertEqual(len(stanza_log), 0)
+        self.assertEqual(stanza_log.size, 0)
+
+    def test_search(self) -> None:
+        stanza_log = StanzaLog(max_count=100, max_bytes=100000)
+        first = add(stanza_log, '<message><body>Hello hello</body></message>')
+        add(stanza_log, '<presence/>')
+        last = add(stanza_log, '<iq><query>HELLO</query></iq>', 'outgoing')
+
+        matches: list[tuple[int, int]] = []
+        start = None
+        while True:
+            result = stanza_log.search('hello', Direction.NEXT, start)
+            if result is None:
+                break
+            entry, offset = result
+            start = (entry.id, offset)
+            matches.append(start)
+
+        self.assertEqual([entry_id for entry_id, _ in matches],
+                         [first, first, last])
+
+        # Search backwards from the last match
+        result = stanza_log.search('hello', Direction.PREV, matches[-1])
+        assert result is not None
+        self.assertEqual((result[0].id, result[1]), matches[1])
+
+        result = stanza_log.search('hello', Direction.PREV)
+        assert result is not None
+        self.assertEqual((result[0].id, result[1]), matches[-1])
+
+        # Filtered stanzas are skipped
+        result = stanza_log.search(
+            'hello',
+            Direction.NEXT,
+            filter_func=lambda entry: entry.kind == 'outgoing')
+        assert result is not None
+        self.assertEqual(result[0].id, last)
+
+        self.assertIsNone(stanza_log.search('', Direction.NEXT))
+        self.assertIsNone(stanza_log.search('unknown', Direction.NEXT))
+
+    def test_search_offset(self) -> None:
+        # lower() turns İ into two characters, the offset has to point
+        # into the text as it is shown
+        stanza_log = StanzaLog(max_count=100, max_bytes=100000)
+        add(stanza_log, '<message><body>İİ Hello</body></message>')
+
+        for direction in (Direction.NEXT, Direction.PREV):
+            result = stanza_log.search('hello', direction)
+            assert result is not None
+            entry, offset = result
+            self.assertEqual(entry.text[offset:offset + 5], 'Hello')
+
+    def test_export(self) -> None:
+        stanza_log = StanzaLog(max_count=100, max_bytes=100000)
+        add(stanza_log, '<presence/>')
+        add(stanza_log, '<iq/>', 'outgoing')
+
+        file = io.StringIO()
+        self.assertEqual(stanza_log.export(file), 2)
+        self.assertEqual(file.getvalue(),
+                         ''.join(entry.text for entry in stanza_log))
+
+        file = io.StringIO()
+        count = stanza_log.export(
+            file, filter_func=lambda entry: entry.type == 'iq')
+        self.assertEqual(count, 1)
+        self.assertIn('<iq/>', file.getvalue())
+        self.assertNotIn('<presence/>', file.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -527,6 +527,24 @@ def test_styling(self):
             result = styling.process(params['input'])
             self.assertEqual(result.blocks, params['tokens'])
 
+    def test_byte_offsets(self):
+        text = 'ü *strong* 😀 _emph_\n> quote\n€ ~strike~ https://example.org/ü'
+        encoded = text.encode()
+        result = styling.process(text)
+
+        for block in result.blocks:
+            if not isinstance(block, PlainBlock):
+                continue
+
+            block_start = len(text[:block.start].encode())
+            for obj in [*block.spans, *block.uris]:
+                start = block_start + obj.start_byte
+                end = block_start + obj.end_byte
+                self.assertEqual(encoded[start:end].decode(), obj.text)
+
+        self.assertIs(styling.process(text), result)
+        self.assertIs(styling.process(encoded), result)
+
     def test_uris(self):
         for uri in URIS:
             text = self.wrap(uri)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import unittest
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from gajim.common.task_manager import Task
+from gajim.common.task_manager import TaskManager
+
+
+class FakeTask(Task):
+    track_completion = True
+
+    def __init__(self,
+                 account: str,
+                 priority: int = 0,
+                 ready: bool = True) -> None:
+        Task.__init__(self, priority=priority, account=account)
+        self.ready = ready
+        self.executed = False
+
+    def execute(self) -> None:
+        self.executed = True
+
+    def preconditions_met(self) -> bool:
+        return self.ready
+
+
+class TaskManagerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._now = 1000.0
+        self._glib = MagicMock()
+        patchers = [
+            patch('gajim.common.task_manager.GLib', self._glib),
+            patch('gajim.common.task_manager.time.monotonic',
+                  lambda: self._now),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self._manager = TaskManager(
+            max_in_flight=2, rate=1, burst=3, task_timeout=60)
+
+    def _get_scheduled_delay(self) -> int:
+        return self._glib.timeout_add.call_args[0][0]
+
+    def test_in_flight_limit(self) -> None:
+        tasks = [FakeTask('acc1') for _ in range(3)]
+        for task in tasks:
+            self._manager.add_task(task)
+
+        self._manager._process_queue()
+        self.assertEqual([task.executed for task in tasks],
+                         [True, True, False])
+
+        metrics = self._manager.get_metrics('acc1')
+        self.assertEqual(metrics.queued, 1)
+        self.assertEqual(metrics.running, 2)
+
+        # Finishing a task wakes the scheduler immediately
+        self._glib.timeout_add.reset_mock()
+        self._now += 0.5
+        tasks[0].set_finished()
+        self.assertEqual(self._get_scheduled_delay(), 0)
+
+        self._manager._process_queue()
+        self.assertTrue(tasks[2].executed)
+
+        metrics = self._manager.get_metrics('acc1')
+        self.assertEqual(metrics.executed, 3)
+        self.assertEqual(metrics.finished, 1)
+        self.assertEqual(metrics.max_wait_time, 0.5)
+        self.assertEqual(metrics.avg_execution_time, 0.5)
+
+    def test_accounts_are_independent(self) -> None:
+        tasks1 = [FakeTask('acc1') for _ in range(3)]
+        tasks2 = [FakeTask('acc2') for _ in range(2)]
+        for task in tasks1 + tasks2:
+            self._manager.add_task(task)
+
+        self._manager._process_queue()
+        self.assertEqual(sum(task.executed for task in tasks1), 2)
+        self.assertTrue(all(task.executed for task in tasks2))
+
+    def test_rate_limit(self) -> None:
+        manager = TaskManager(max_in_flight=10, rate=2, burst=2)
+        tasks = [FakeTask('acc1') for _ in range(4)]
+        for task in tasks:
+            task.track_completion = False
+            manager.add_task(task)
+
+        manager._process_queue()
+        self.assertEqual(sum(task.executed for task in tasks), 2)
+        # The next token is available after half a second
+        self.assertEqual(self._get_scheduled_delay(), 500)
+
+        self._now += 0.5
+        manager._process_queue()
+        self.assertEqual(sum(task.executed for task in tasks), 3)
+
+        self._now += 0.5
+        manager._process_queue()
+        self.assertTrue(all(task.executed for task in tasks))
+
+    def test_priority_and_obsolete(self) -> None:
+        low = FakeTask('acc1', priority=1)
+        high = FakeTask('acc1', priority=0)
+        obsolete = FakeTask('acc1', priority=0)
+        obsolete.set_obsolete()
+        for task in (low, obsolete, high):
+            self._manager.add_task(task)
+
+        self._manager._process_queue()
+        self.assertTrue(high.executed)
+        self.assertTrue(low.executed)
+        self.assertFalse(obsolete.executed)
+        self.assertEqual(self._manager.get_metrics('acc1').obsolete, 1)
+
+    def test_preconditions_not_met(self) -> None:
+        task = FakeTask('acc1', ready=False)
+        self._manager.add_task(task)
+
+        self._manager._process_queue()
+        self.assertFalse(task.executed)
+        self.assertEqual(self._get_scheduled_delay(), 2000)
+
+        task.ready = True
+        self._now += 2
+        self._manager._process_queue()
+        self.assertTrue(task.executed)
+
+    def test_task_timeout(self) -> None:
+        tasks = [FakeTask('acc1') for _ in range(3)]
+        for task in tasks:
+            self._manager.add_task(task)
+
+        self._manager._process_queue()
+        self.assertFalse(tasks[2].executed)
+        self.assertEqual(self._get_scheduled_delay(), 60000)
+
+        self._now += 60
+        self._manager._process_queue()
+        self.assertTrue(tasks[2].executed)
+        self.assertEqual(self._manager.get_metrics('acc1').timed_out, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import time
+import unittest
+
+from nbxmpp.modules.discovery import parse_disco_info
+from nbxmpp.protocol import Iq
+from nbxmpp.protocol import JID
+from nbxmpp.structs import DiscoInfo
+from nbxmpp.structs import RosterItem
+
+from gajim.common import app  # noqa: F401  (avoid circular imports)
+from gajim.common.storage.cache import CacheStorage
+
+DISCO_INFO = '''
+<iq xmlns="jabber:client" type="result" from="{jid}" id="1">
+    <query xmlns="http://jabber.org/protocol/disco#info">
+        <identity category="conference" type="text" name="Room"/>
+        <feature var="http://jabber.org/protocol/muc"/>
+    </query>
+</iq>'''
+
+
+def make_disco_info(jid: str) -> DiscoInfo:
+    disco_info = parse_disco_info(Iq(node=DISCO_INFO.format(jid=jid)))
+    return disco_info._replace(timestamp=time.time())
+
+
+class CacheStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._storage = CacheStorage(in_memory=True)
+        self._storage.init()
+
+    def tearDown(self) -> None:
+        self._storage.shutdown()
+
+    def _reload(self) -> None:
+        # Simulate a restart, the database rows are loaded again
+        self._storage._disco_info_cache.clear()
+        self._storage._entity_caps_cache.clear()
+        self._storage._fill_disco_info_cache()
+        self._storage._load_caps_data()
+
+    def test_disco_info_parsed_on_access(self) -> None:
+        jid = JID.from_string('room@conference.example.org')
+        disco_info = make_disco_info(str(jid))
+        self._storage.set_last_disco_info(jid, disco_info)
+
+        self._reload()
+        self.assertEqual(self._storage._disco_info_cache, {})
+        self.assertIn(jid, self._storage._raw_disco_info_cache)
+
+        loaded = self._storage.get_last_disco_info(jid)
+        assert loaded is not None
+        self.assertEqual(loaded.features, disco_info.features)
+        self.assertEqual(loaded.timestamp, disco_info.timestamp)
+        self.assertNotIn(jid, self._storage._raw_disco_info_cache)
+        self.assertIs(self._storage.get_last_disco_info(jid), loaded)
+
+        self.assertIsNone(self._storage.get_last_disco_info(
+            JID.from_string('unknown@example.org')))
+
+    def test_update_unparsed_disco_info(self) -> None:
+        jid = JID.from_string('room@conference.example.org')
+        self._storage.set_last_disco_info(jid, make_disco_info(str(jid)))
+        self._reload()
+
+        # The row exists, it must be updated instead of inserted
+        disco_info = make_disco_info(str(jid))
+        self._storage.set_last_disco_info(jid, disco_info)
+        self._reload()
+
+        loaded = self._storage.get_last_disco_info(jid)
+        assert loaded is not None
+        self.assertEqual(loaded.timestamp, disco_info.timestamp)
+
+    def test_caps_parsed_on_access(self) -> None:
+        jid = JID.from_string('user@example.org/res')
+        caps_data = make_disco_info(str(jid))
+        self._storage.add_caps_entry(jid, 'sha-1', 'abc', caps_data)
+
+        self._reload()
+        self.assertEqual(self._storage._entity_caps_cache, {})
+
+        loaded = self._storage.get_caps_entry('sha-1', 'abc')
+        assert loaded is not None
+        self.assertEqual(loaded.features, caps_data.features)
+        self.assertIs(self._storage.get_caps_entry('sha-1', 'abc'), loaded)
+        self.assertIsNone(self._storage.get_caps_entry('sha-1', 'def'))
+
+    def test_invalid_disco_info(self) -> None:
+        jid = JID.from_string('room@conference.example.org')
+        self._storage._con.execute(
+            'INSERT INTO last_seen_disco_info (jid, disco_info, last_seen) '
+            'VALUES (?, ?, ?)', (str(jid), '<iq', int(time.time())))
+        self._reload()
+
+        self.assertIsNone(self._storage.get_last_disco_info(jid))
+        self._storage.set_last_disco_info(jid, make_disco_info(str(jid)))
+        self.assertIsNotNone(self._storage.get_last_disco_info(jid))
+
+    def test_invalid_caps(self) -> None:
+        self._storage._con.execute(
+            'INSERT INTO caps_cache (hash_method, hash, data, last_seen) '
+            'VALUES (?, ?, ?, ?)', ('sha-1', 'abc', '<iq', int(time.time())))
+        self._reload()
+
+        # The row is deleted, it is not parsed again on the next start
+        self.assertIsNone(self._storage.get_caps_entry('sha-1', 'abc'))
+        self._reload()
+        self.assertEqual(self._storage._raw_caps_cache, {})
+
+    def test_roster(self) -> None:
+        account = 'testacc1'
+        jid1 = JID.from_string('user1@example.org')
+        jid2 = JID.from_string('user2@example.org')
+        roster = {
+            jid1: RosterItem(jid=jid1, subscription='both', groups={'A'}),
+            jid2: RosterItem(jid=jid2, name='User 2', subscription='to'),
+        }
+
+        self.assertEqual(self._storage.load_roster(account), {})
+        self.assertEqual(self._storage.get_roster_version(account), '')
+
+        self._storage.store_roster(account, roster, 'v1')
+        self.assertEqual(self._storage.load_roster(account), roster)
+        self.assertEqual(self._storage.get_roster_version(account), 'v1')
+
+        item = RosterItem(jid=jid1, subscription='both', groups={'B'})
+        self._storage.update_roster_item(account, item, 'v2')
+        jid3 = JID.from_string('user3@example.org')
+        item3 = RosterItem(jid=jid3, subscription='none')
+        self._storage.update_roster_item(account, item3, 'v3')
+        self._storage.remove_roster_item(account, jid2, 'v4')
+
+        self.assertEqual(self._storage.load_roster(account),
+                         {jid1: item, jid3: item3})
+        self.assertEqual(self._storage.get_roster_version(account), 'v4')
+
+        # Other accounts are not affected
+        self._storage.store_roster('testacc2', {}, 'v1')
+        self.assertEqual(len(self._storage.load_roster(account)), 2)
+
+        self._storage.remove_roster(account)
+        self.assertEqual(self._storage.load_roster(account), {})
+        self.assertEqual(self._storage.get_roster_version(account), '')
+        self.assertEqual(self._storage.get_roster_version('testacc2'), 'v1')
+
+    def test_migrate_roster_table(self) -> None:
+        con = self._storage._con
+        con.executescript('''
+            DROP TABLE roster;
+            DROP TABLE roster_version;
+            CREATE TABLE roster(
+                account TEXT PRIMARY KEY UNIQUE,
+                roster TEXT
+            );
+            PRAGMA user_version=10;
+        ''')
+        con.execute("INSERT INTO roster VALUES ('testacc1', '[]')")
+
+        self._storage._migrate()
+        self.assertEqual(self._storage.user_version, 11)
+        self.assertEqual(self._storage.load_roster('testacc1'), {})
+        self.assertEqual(self._storage.get_roster_version('testacc1'), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
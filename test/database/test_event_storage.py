@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import cast
+
+import unittest
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from types import SimpleNamespace
+
+import sqlalchemy as sa
+from nbxmpp.protocol import JID
+
+from gajim.common import app  # noqa: F401  (avoid circular imports)
+from gajim.common import events
+from gajim.common.storage.events import models as mod
+from gajim.common.storage.events.storage import EventStorage
+
+
+class EventStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._storage = EventStorage()
+        self._storage.init()
+
+        self._room = cast(Any, SimpleNamespace(
+            account='testacc1', jid=JID.from_string('room@conference.org')))
+        self._timestamp = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    def _count_rows(self) -> int:
+        with self._storage.get_session() as s:
+            return s.scalar(sa.select(sa.func.count(mod.Event.pk))) or 0
+
+    def _show_event(self,
+                    nick: str,
+                    show: str,
+                    seconds: int
+                    ) -> events.MUCUserStatusShowChanged:
+
+        return events.MUCUserStatusShowChanged(
+            timestamp=self._timestamp + timedelta(seconds=seconds),
+            is_self=False,
+            nick=nick,
+            status='',
+            show_value=show)
+
+    def test_buffered_store(self) -> None:
+        for i in range(10):
+            self._storage.store(self._room, events.MUCUserJoined(
+                timestamp=self._timestamp + timedelta(seconds=i),
+                is_self=False,
+                nick=f'nick{i}',
+                status_codes=None))
+
+        self.assertEqual(self._count_rows(), 0)
+
+        self._storage.flush()
+        self.assertEqual(self._count_rows(), 10)
+
+        rows = self._storage.load(
+            self._room, True, datetime.now(timezone.utc).timestamp(), 50)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(cast(events.MUCUserJoined, rows[0]).nick, 'nick9')
+
+    def test_load_flushes_pending(self) -> None:
+        self._storage.store(self._room, self._show_event('nick1', 'away', 1))
+
+        rows = self._storage.load(
+            self._room, True, datetime.now(timezone.utc).timestamp(), 50)
+        self.assertEqual(len(rows), 1)
+
+    def test_collapse_show_changes(self) -> None:
+        self._storage.store(self._room, self._show_event('nick1', 'away', 1))
+        self._storage.store(self._room, self._show_event('nick2', 'away', 2))
+        self._storage.store(self._room, self._show_event('nick1', 'xa', 3))
+        self._storage.store(self._room, self._show_event('nick1', 'dnd', 4))
+
+        rows = cast(list[events.MUCUserStatusShowChanged], self._storage.load(
+            self._room, False, self._timestamp.timestamp(), 50))
+        self.assertEqual([(row.nick, row.show_value) for row in rows],
+                         [('nick2', 'away'), ('nick1', 'dnd')])
+
+    def test_keep_show_changes_around_other_events(self) -> None:
+        self._storage.store(self._room, self._show_event('nick1', 'away', 1))
+        self._storage.store(self._room, events.MUCUserLeft(
+            timestamp=self._timestamp + timedelta(seconds=2),
+            is_self=False,
+            nick='nick1',
+            status_codes=None,
+            reason=None,
+            actor=None))
+        self._storage.store(self._room, self._show_event('nick1', 'dnd', 3))
+
+        rows = self._storage.load(
+            self._room, False, self._timestamp.timestamp(), 50)
+        self.assertEqual(len(rows), 3)
+
+    def test_no_collapse(self) -> None:
+        storage = EventStorage(collapse_show_changes=False)
+        storage.init()
+        storage.store(self._room, self._show_event('nick1', 'away', 1))
+        storage.store(self._room, self._show_event('nick1', 'dnd', 2))
+
+        rows = storage.load(
+            self._room, False, self._timestamp.timestamp(), 50)
+        self.assertEqual(len(rows), 2)
+
+    def _joined_event(self, nick: str, seconds: int) -> events.MUCUserJoined:
+        return events.MUCUserJoined(
+            timestamp=self._timestamp + timedelta(seconds=seconds),
+            is_self=False,
+            nick=nick,
+            status_codes=None)
+
+    def test_prune_by_count(self) -> None:
+        storage = EventStorage(max_events_per_chat=5)
+        storage.init()
+        other_room = cast(Any, SimpleNamespace(
+            account='testacc1', jid=JID.from_string('other@conference.org')))
+
+        for i in range(8):
+            storage.store(self._room, self._joined_event(f'nick{i}', i))
+        storage.store(other_room, self._joined_event('nick', 1))
+        storage.flush()
+
+        rows = cast(list[events.MUCUserJoined], storage.load(
+            self._room, False, self._timestamp.timestamp(), 50))
+        self.assertEqual([row.nick for row in rows],
+                         [f'nick{i}' for i in range(3, 8)])
+
+        rows = storage.load(
+            other_room, False, self._timestamp.timestamp(), 50)
+        self.assertEqual(len(rows), 1)
+
+    def test_prune_by_age(self) -> None:
+        storage = EventStorage(max_age=timedelta(minutes=30))
+        storage.init()
+
+        storage.store(self._room, self._joined_event('nick1', 0))
+        storage.flush()
+        storage.store(self._room, events.MUCUserJoined(
+            timestamp=datetime.now(timezone.utc),
+            is_self=False,
+            nick='nick2',
+            status_codes=None))
+        storage.flush()
+
+        rows = cast(list[events.MUCUserJoined], storage.load(
+            self._room, False, self._timestamp.timestamp(), 50))
+        self.assertEqual([row.nick for row in rows], ['nick2'])
+
+    def test_load_unknown_chat(self) -> None:
+        rows = self._storage.load(
+            self._room, True, datetime.now(timezone.utc).timestamp(), 50)
+        self.assertEqual(rows, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
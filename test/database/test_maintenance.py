@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import sqlalchemy as sa
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+from gajim.common.util.datetime import utc_now
+
+
+class MaintenanceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._archive = MessageArchiveStorage(
+            path=Path(self._tmp_dir.name) / 'logs.db')
+        self._archive.init()
+
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account('testacc1')
+        app.settings.set_account_setting('testacc1', 'name', 'user')
+        app.settings.set_account_setting('testacc1', 'hostname', 'domain.org')
+
+    def tearDown(self) -> None:
+        self._archive.shutdown()
+        self._tmp_dir.cleanup()
+
+    def _pragma(self, name: str) -> int:
+        with self._archive.get_engine().connect() as con:
+            return con.scalar(sa.text(f'PRAGMA {name}'))
+
+    def test_incremental_vacuum(self) -> None:
+        self.assertEqual(self._pragma('auto_vacuum'), 2)
+
+        remote_jid = JID.from_string('remote@jid.org')
+        for i in range(500):
+            self._archive.insert_object(Message(
+                account_='testacc1',
+                remote_jid_=remote_jid,
+                resource='res',
+                type=MessageType.CHAT,
+                direction=ChatDirection.INCOMING,
+                timestamp=utc_now(),
+                state=MessageState.ACKNOWLEDGED,
+                id=f'messageid{i}',
+                text='x' * 1000,
+            ))
+
+        self._archive.remove_history_for_jid('testacc1', remote_jid)
+        freelist_count = self._pragma('freelist_count')
+        self.assertGreater(freelist_count, 0)
+
+        stats = self._archive.run_maintenance()
+        self.assertFalse(stats.full_vacuum)
+        self.assertEqual(stats.freelist_count, freelist_count)
+        self.assertGreater(stats.freed_pages, 0)
+        self.assertIs(self._archive.get_maintenance_stats(), stats)
+
+        stats = self._archive.run_maintenance(allow_full_vacuum=True)
+        self.assertEqual(self._pragma('freelist_count'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+from datetime import timezone
+from unittest.mock import MagicMock
+
+import nbxmpp
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common.modules.mam import MAM
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+ACCOUNT = 'testacc1'
+OWN_JID = JID.from_string('user@domain.org')
+REMOTE_JID = JID.from_string('remote@jid.org')
+QUERY_ID = 'queryid1'
+
+
+class MAMTest(unittest.TestCase):
+    def setUp(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account(ACCOUNT)
+        app.settings.set_account_setting(ACCOUNT, 'name', 'user')
+        app.settings.set_account_setting(ACCOUNT, 'hostname', 'domain.org')
+
+        app.storage.archive = MessageArchiveStorage(in_memory=True)
+        app.storage.archive.init()
+
+        client = MagicMock(account=ACCOUNT)
+        client.get_own_jid.return_value = OWN_JID
+        self._mam = MAM(client)
+        self._mam._mam_query_ids[OWN_JID] = QUERY_ID
+
+    @staticmethod
+    def _create_properties(stanza_id: str) -> MagicMock:
+        properties = MagicMock(is_mam_message=True, remote_jid=REMOTE_JID)
+        properties.type.is_groupchat = False
+        properties.mam.archive = OWN_JID
+        properties.mam.query_id = QUERY_ID
+        properties.mam.id = stanza_id
+        return properties
+
+    def _receive(self, stanza_id: str) -> bool:
+        '''
+        Returns True if the message is passed on to the next handlers
+        '''
+
+        try:
+            self._mam._mam_message_received(
+                MagicMock(), MagicMock(), self._create_properties(stanza_id))
+        except nbxmpp.NodeProcessed:
+            return False
+        return True
+
+    def test_duplicated_message(self) -> None:
+        self.assertTrue(self._receive('stanzaid1'))
+
+        # Duplicate within the same result page
+        self.assertFalse(self._receive('stanzaid1'))
+        self.assertTrue(self._receive('stanzaid2'))
+
+        app.storage.archive.insert_object(Message(
+            account_=ACCOUNT,
+            remote_jid_=REMOTE_JID,
+            resource='res',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=datetime.now(timezone.utc),
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid1',
+            stanza_id='stanzaid1',
+            text='message'))
+        self._mam._store_page(OWN_JID)
+
+        # Duplicate of an already stored message in an overlapping page
+        self.assertFalse(self._receive('stanzaid1'))
+        self.assertTrue(self._receive('stanzaid2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
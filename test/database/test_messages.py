@@ -2,16 +2,23 @@
 
 import unittest
 from datetime import datetime
+from datetime import timedelta
 from datetime import timezone
 
+import sqlalchemy as sa
 from nbxmpp.protocol import JID
+from sqlalchemy import select
 
 from gajim.common import app
 from gajim.common.settings import Settings
 from gajim.common.storage.archive.const import ChatDirection
 from gajim.common.storage.archive.const import MessageState
 from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Encryption
+from gajim.common.storage.archive.models import MAMArchiveState
 from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.models import Occupant
+from gajim.common.storage.archive.models import Thread
 from gajim.common.storage.archive.storage import MessageArchiveStorage
 
 
@@ -52,5 +59,67 @@ def _create_base_message(
             text='message',
         )
 
+    def test_insert_mam_page(self) -> None:
+        self._archive.insert_object(self._create_base_message('1', 'stanzaid1'))
+
+        timestamp = datetime.now(timezone.utc)
+        messages: list[Message] = []
+        for i in range(1, 6):
+            message = self._create_base_message(str(i), f'stanzaid{i}')
+            message.type = MessageType.GROUPCHAT
+            message.encryption_ = Encryption(protocol=1, key='key', trust=1)
+            message.thread_id_ = 'thread1'
+            message.occupant_ = Occupant(
+                account_=self._account,
+                remote_jid_=self._remote_jid,
+                id=self._occupant_id,
+                real_remote_jid_=JID.from_string('real@jid.org'),
+                nickname=f'nick{i}',
+                updated_at=timestamp + timedelta(seconds=i),
+            )
+            messages.append(message)
+
+        # Duplicate inside the page
+        messages.append(self._create_base_message('5', 'stanzaid5'))
+
+        state = MAMArchiveState(
+            account_=self._account,
+            remote_jid_=self._remote_jid,
+            to_stanza_id='stanzaid5',
+        )
+
+        pks = self._archive.insert_mam_page(self._account, messages, state)
+        self.assertEqual(pks[0], -1)
+        self.assertEqual(pks[-1], -1)
+        self.assertNotIn(-1, pks[1:5])
+
+        with self._archive.get_session() as s:
+            count = s.scalar(select(sa.func.count(Message.pk)))
+            self.assertEqual(count, 5)
+
+            occupants = s.scalars(select(Occupant)).all()
+            self.assertEqual(len(occupants), 1)
+            self.assertEqual(occupants[0].nickname, 'nick5')
+            assert occupants[0].real_remote is not None
+            self.assertEqual(
+                occupants[0].real_remote.jid, JID.from_string('real@jid.org'))
+
+            self.assertEqual(len(s.scalars(select(Encryption)).all()), 1)
+            self.assertEqual(len(s.scalars(select(Thread)).all()), 1)
+
+        for pk in pks[1:5]:
+            message = self._archive.get_message_with_pk(pk)
+            assert message is not None
+            assert message.occupant is not None
+            assert message.encryption is not None
+            assert message.thread is not None
+            self.assertEqual(message.occupant.id, self._occupant_id)
+            self.assertEqual(message.thread.id, 'thread1')
+
+        state = self._archive.get_mam_archive_state(self._account, self._remote_jid)
+        assert state is not None
+        self.assertEqual(state.to_stanza_id, 'stanzaid5')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+from typing import Any
+
 import datetime as dt
 import unittest
 from datetime import datetime
 from datetime import timedelta
 from datetime import timezone
 
+import sqlalchemy as sa
 import sqlalchemy.exc
 from nbxmpp.protocol import JID
 from sqlalchemy import select
@@ -21,6 +24,7 @@
 from gajim.common.storage.archive.models import Message
 from gajim.common.storage.archive.models import MessageError
 from gajim.common.storage.archive.models import Moderation
+from gajim.common.storage.archive.storage import HistoryCleanupStats
 from gajim.common.storage.archive.storage import MessageArchiveStorage
 from gajim.common.util.datetime import utc_now
 
@@ -149,6 +153,37 @@ def test_get_conversation_before_after(self) -> None:
         self.assertEqual(messages[0].id, 'messageid0')
         self.assertEqual(messages[1].id, 'messageid1')
 
+    def test_get_conversation_before_after_keyset(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        timestamp = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, timestamp=timestamp, count=10
+        )
+
+        # Page through messages which all share the same timestamp
+        ids: list[str] = []
+        cursor_timestamp = datetime.now(timezone.utc)
+        cursor_pk = None
+        while True:
+            messages = self._archive.get_conversation_before_after(
+                'testacc1', remote_jid, True, cursor_timestamp, 3, pk=cursor_pk
+            )
+            if not messages:
+                break
+            ids.extend(message.id for message in messages)
+            cursor_timestamp = messages[-1].timestamp
+            cursor_pk = messages[-1].pk
+
+        self.assertEqual(ids, [f'messageid{i}' for i in range(9, -1, -1)])
+
+        messages = self._archive.get_conversation_before_after(
+            'testacc1', remote_jid, False, cursor_timestamp, 20, pk=cursor_pk
+        )
+        self.assertEqual(
+            [message.id for message in messages],
+            [f'messageid{i}' for i in range(1, 10)],
+        )
+
     def test_get_last_conversation_row(self) -> None:
         remote_jid = JID.from_string('remote1@jid.org')
         self._insert_messages(
@@ -163,19 +198,235 @@ def test_get_last_conversation_row(self) -> None:
 
         self.assertEqual(message.id, 'messageid9')
 
+    def test_get_last_conversation_rows(self) -> None:
+        remote_jid1 = JID.from_string('remote1@jid.org')
+        remote_jid2 = JID.from_string('remote2@jid.org')
+        timestamp = datetime.now(timezone.utc)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid1, timestamp=timestamp, count=10
+        )
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid2, timestamp=timestamp, count=3
+        )
+        self._insert_messages(
+            'testacc2', remote_jid=remote_jid1, timestamp=timestamp, count=5
+        )
+
+        # Corrections are not the last line of a conversation
+        correction = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid1,
+            resource='res',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=timestamp + timedelta(seconds=1),
+            state=MessageState.ACKNOWLEDGED,
+            id='correction1',
+            text='corrected',
+            correction_id='messageid9',
+        )
+        self._archive.insert_object(correction)
+
+        chats = [
+            ('testacc1', remote_jid1),
+            ('testacc1', remote_jid2),
+            ('testacc2', remote_jid1),
+            ('testacc2', remote_jid2),
+            ('testacc1', JID.from_string('unknown@jid.org')),
+        ]
+        messages = self._archive.get_last_conversation_rows(chats)
+
+        self.assertEqual(
+            {key: message.id for key, message in messages.items()},
+            {
+                ('testacc1', remote_jid1): 'messageid9',
+                ('testacc1', remote_jid2): 'messageid2',
+                ('testacc2', remote_jid1): 'messageid4',
+            },
+        )
+
+        message = messages[('testacc1', remote_jid1)]
+        self.assertEqual(message.get_last_correction().text, 'corrected')
+
+        for account, jid in chats:
+            single = self._archive.get_last_conversation_row(account, jid)
+            bulk = messages.get((account, jid))
+            self.assertEqual(
+                None if single is None else single.pk,
+                None if bulk is None else bulk.pk,
+            )
+
+        self.assertEqual(self._archive.get_last_conversation_rows([]), {})
+
     def test_get_last_correctable_message(self) -> None:
         # TODO
         pass
 
     def test_search_archive(self) -> None:
-        # TODO
-        return
-        # remote_jid = JID.from_string(f'remote1@jid.org')
-        # self._insert_messages(
-        #     'testacc1', remote_jid=remote_jid, message='test', count=100)
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='hello world', count=5)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, message='other text', count=5)
+        self._insert_messages(
+            'testacc2', remote_jid=remote_jid, message='hello world', count=5)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'hello'))
+        self.assertEqual(len(messages), 5)
+
+        messages = list(self._archive.search_archive(None, None, 'hello'))
+        self.assertEqual(len(messages), 10)
+
+        # Prefix search, all words have to match
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'wor hel'))
+        self.assertEqual(len(messages), 5)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'hello text'))
+        self.assertEqual(len(messages), 0)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'orld'))
+        self.assertEqual(len(messages), 0)
+
+        messages = list(
+            self._archive.search_archive(
+                'testacc1', remote_jid, 'hello', from_users=['RES1']))
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].resource, 'res1')
+
+        messages = list(
+            self._archive.search_archive(
+                'testacc1',
+                remote_jid,
+                'hello',
+                before=datetime.now(timezone.utc) - timedelta(days=1)))
+        self.assertEqual(len(messages), 0)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, '"AND" *'))
+        self.assertEqual(len(messages), 0)
+
+    def test_search_archive_ranking(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid,
+            message='gajim is mentioned once in this long message text',
+            message_id='messageid1',
+            count=1)
+        self._insert_messages(
+            'testacc1',
+            remote_jid=remote_jid,
+            message='gajim gajim',
+            message_id='messageid2',
+            count=1)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'gajim'))
+        self.assertEqual(
+            [m.id for m in messages], ['messageid2', 'messageid1'])
+
+    def test_search_archive_corrections(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        timestamp = datetime.now(timezone.utc) - timedelta(minutes=1)
+
+        original = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res1',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=timestamp,
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid1',
+            text='helo wrld',
+        )
+        pk = self._archive.insert_object(original)
+
+        correction = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res1',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=utc_now(),
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid2',
+            text='hello world',
+            correction_id='messageid1',
+        )
+        self._archive.insert_object(correction)
+
+        for query in ('helo', 'hello', 'helo wrld', 'hello world'):
+            messages = list(
+                self._archive.search_archive('testacc1', remote_jid, query))
+            self.assertEqual([m.pk for m in messages], [pk], msg=query)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'wrld hello'))
+        self.assertEqual(messages, [])
 
-        # iterator = self._archive.search_archive('testacc1', remote_jid, 'test')
-        # messages = list(iterator)
+    def test_search_archive_index_sync(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        m = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res1',
+            type=MessageType.GROUPCHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=utc_now(),
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid1',
+            stanza_id='stanzaid1',
+            text='moderated text',
+        )
+        self._archive.insert_object(m)
+
+        m = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res1',
+            type=MessageType.GROUPCHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=utc_now(),
+            state=MessageState.ACKNOWLEDGED,
+            id='messageid2',
+            stanza_id='stanzaid2',
+            text='deleted text',
+        )
+        pk = self._archive.insert_object(m)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'text'))
+        self.assertEqual(len(messages), 2)
+
+        mod = Moderation(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            occupant_=None,
+            stanza_id='stanzaid1',
+            by=None,
+            reason=None,
+            timestamp=utc_now(),
+        )
+        self._archive.insert_object(mod)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'moderated'))
+        self.assertEqual(messages, [])
+
+        self._archive.delete_message(pk)
+
+        messages = list(
+            self._archive.search_archive('testacc1', remote_jid, 'text'))
+        self.assertEqual(messages, [])
+
+        with self._archive.get_session() as s:
+            count = s.scalar(sa.text('SELECT count(*) FROM message_fts'))
+            self.assertEqual(count, 0)
 
     def test_get_days_containing_messages(self) -> None:
         localtime = datetime(2023, 12, 31, 23, 59, 59, tzinfo=timezone.utc).astimezone()
@@ -385,6 +636,101 @@ def test_remove_history(self) -> None:
             result = s.scalar(select(Message))
             self.assertIsNone(result)
 
+    def test_cleanup_chat_history(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        old = utc_now() - timedelta(days=10)
+
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, timestamp=old, count=7)
+        self._insert_messages('testacc1', remote_jid=remote_jid, count=3)
+        self._insert_messages(
+            'testacc2', remote_jid=remote_jid, timestamp=old, count=2)
+
+        correction = Message(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            resource='res1',
+            type=MessageType.CHAT,
+            direction=ChatDirection.INCOMING,
+            timestamp=utc_now(),
+            state=MessageState.ACKNOWLEDGED,
+            id='correctionid1',
+            correction_id='messageid1',
+            text='corrected',
+        )
+        self._archive.insert_object(correction)
+
+        error = MessageError(
+            account_='testacc1',
+            remote_jid_=remote_jid,
+            message_id='messageid2',
+            by=None,
+            type='modify',
+            text='text',
+            condition='somecond',
+            condition_text='somecondtext',
+            timestamp=old,
+        )
+        self._archive.insert_object(error)
+
+        app.settings.set_account_setting(
+            'testacc1', 'chat_history_max_age', 86400)
+
+        results: list[HistoryCleanupStats] = []
+        self._archive.cleanup_chat_history(
+            chunk_size=3, callback=results.append)
+        stats = results[0]
+        self.assertTrue(stats.complete)
+        self.assertEqual(stats.messages, 7)
+        self.assertEqual(stats.corrections, 1)
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(stats.chunks, 3)
+        self.assertIs(self._archive.get_last_cleanup_stats(), stats)
+
+        with self._archive.get_session() as s:
+            messages = s.scalars(select(Message)).all()
+            self.assertEqual(len(messages), 5)
+            self.assertTrue(all(m.timestamp > old for m in messages
+                                if m.account.jid.localpart == 'user1'))
+            self.assertIsNone(s.scalar(select(MessageError)))
+
+        # Nothing left to remove
+        self._archive.cleanup_chat_history(callback=results.append)
+        self.assertEqual(results[1].messages, 0)
+
+    def test_cleanup_chat_history_jobs(self) -> None:
+        remote_jid = JID.from_string('remote1@jid.org')
+        old = utc_now() - timedelta(days=10)
+        self._insert_messages(
+            'testacc1', remote_jid=remote_jid, timestamp=old, count=5)
+
+        app.settings.set_account_setting(
+            'testacc1', 'chat_history_max_age', 86400)
+
+        # Every chunk is its own job, the next one is only queued after
+        # the previous finished so other jobs can run in between
+        jobs: list[Any] = []
+
+        def run_async(func: Any, *args: Any, **kwargs: Any) -> None:
+            jobs.append((func, args, kwargs))
+
+        self._archive.run_async = run_async  # pyright: ignore
+
+        results: list[HistoryCleanupStats] = []
+        self._archive.cleanup_chat_history(
+            chunk_size=2, callback=results.append)
+
+        chunks = 0
+        while jobs:
+            self.assertEqual(len(jobs), 1)
+            func, args, kwargs = jobs.pop()
+            kwargs['callback'](func(*args))
+            chunks += 1
+
+        self.assertEqual(chunks, 3)
+        self.assertEqual(results[0].messages, 5)
+        self.assertTrue(results[0].complete)
+
     def test_check_if_stanza_id_exists(self) -> None:
         remote_jid = JID.from_string('remote1@jid.org')
         m = Message(
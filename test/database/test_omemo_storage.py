@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+from omemo_dr.state.sessionrecord import SessionRecord
+from omemo_dr.state.sessionstate import SessionState
+
+from gajim.common.modules.util import LogAdapter
+from gajim.common.storage.omemo import OMEMOStorage
+
+
+class OMEMOStorageTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self._db_path = Path(self._tmp_dir.name) / 'omemo.db'
+        self._log = LogAdapter(logging.getLogger('test'), {'account': 'test'})
+        self._storage = OMEMOStorage('testacc1', self._db_path, self._log)
+
+    def tearDown(self) -> None:
+        self._storage.shutdown()
+        self._tmp_dir.cleanup()
+
+    @staticmethod
+    def _create_record(version: int) -> SessionRecord:
+        state = SessionState()
+        state.set_session_version(version)
+        return SessionRecord(session_state=state)
+
+    def test_session_cache(self) -> None:
+        record = self._create_record(3)
+        self._storage.store_session('remote@jid.org', 1, record)
+
+        self.assertIs(self._storage.load_session('remote@jid.org', 1), record)
+        self.assertEqual(self._storage.stats.session_hits, 1)
+        self.assertTrue(self._storage.contains_session('remote@jid.org', 1))
+
+        # A changed record which was not stored again is discarded
+        record.get_session_state().set_session_version(4)
+        self._storage.discard_unstored_sessions()
+        loaded = self._storage.load_session('remote@jid.org', 1)
+        self.assertIsNot(loaded, record)
+        self.assertEqual(loaded.get_session_state().get_session_version(), 3)
+
+        self.assertEqual(self._storage.get_active_device_tuples(),
+                         [('remote@jid.org', 1)])
+
+    def test_discard_unstored_sessions(self) -> None:
+        self._storage.store_session(
+            'remote@jid.org', 1, self._create_record(3))
+        self._storage.store_session(
+            'remote@jid.org', 2, self._create_record(3))
+
+        # Loaded and stored again, like after a successful encryption
+        stored = self._storage.load_session('remote@jid.org', 1)
+        stored.get_session_state().set_session_version(4)
+        self._storage.store_session('remote@jid.org', 1, stored)
+
+        # Loaded and changed, but encryption failed before it was stored
+        failed = self._storage.load_session('remote@jid.org', 2)
+        failed.get_session_state().set_session_version(4)
+
+        self._storage.discard_unstored_sessions()
+        self.assertIs(self._storage.load_session('remote@jid.org', 1), stored)
+
+        loaded = self._storage.load_session('remote@jid.org', 2)
+        self.assertIsNot(loaded, failed)
+        self.assertEqual(loaded.get_session_state().get_session_version(), 3)
+
+    def test_delayed_commit(self) -> None:
+        for device_id in range(10):
+            self._storage.store_session(
+                'remote@jid.org', device_id, self._create_record(3))
+
+        self.assertEqual(self._storage.stats.session_writes, 10)
+        self.assertEqual(self._storage.stats.commits, 0)
+
+        self._storage.flush()
+        self.assertEqual(self._storage.stats.commits, 1)
+
+        storage = OMEMOStorage('testacc1', self._db_path, self._log)
+        self.assertEqual(len(storage.get_active_device_tuples()), 10)
+        storage.shutdown()
+
+        self._storage.delete_all_sessions('remote@jid.org')
+        self.assertTrue(
+            self._storage.load_session('remote@jid.org', 1).is_fresh())
+
+        self._storage.flush()
+        storage = OMEMOStorage('testacc1', self._db_path, self._log)
+        self.assertEqual(storage.get_active_device_tuples(), [])
+        storage.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import unittest
+
+from gajim.common import app
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+from gajim.common.storage.base import StorageWorker
+
+
+class StorageWorkerTest(unittest.TestCase):
+    def test_jobs_are_ordered(self) -> None:
+        worker = StorageWorker()
+        results: list[int] = []
+        threads: set[str] = set()
+
+        def job(i: int) -> None:
+            threads.add(threading.current_thread().name)
+            results.append(i)
+
+        for i in range(100):
+            worker.submit(job, (i,), {}, None, None)
+
+        worker.shutdown()
+        self.assertEqual(results, list(range(100)))
+        self.assertEqual(threads, {'StorageWorker'})
+
+        # The worker starts again after shutdown
+        worker.submit(job, (100,), {}, None, None)
+        worker.shutdown()
+        self.assertEqual(results[-1], 100)
+
+    def test_failing_job(self) -> None:
+        worker = StorageWorker()
+        results: list[int] = []
+
+        def job() -> None:
+            raise ValueError
+
+        worker.submit(job, (), {}, None, None)
+        worker.submit(results.append, (1,), {}, None, None)
+        worker.shutdown()
+        self.assertEqual(results, [1])
+
+    def test_run_async_in_memory(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account('testacc1')
+        app.settings.set_account_setting('testacc1', 'name', 'user')
+        app.settings.set_account_setting('testacc1', 'hostname', 'domain.org')
+
+        archive = MessageArchiveStorage(in_memory=True)
+        archive.init()
+
+        results: list[object] = []
+        errors: list[Exception] = []
+        archive.run_async(
+            archive.get_conversation_jids,
+            'testacc1',
+            callback=results.append,
+            error_callback=errors.append,
+        )
+        self.assertEqual(results, [[]])
+
+        def fail() -> None:
+            raise ValueError
+
+        archive.run_async(fail, error_callback=errors.append)
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
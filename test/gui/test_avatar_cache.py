@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import patch
+
+from gajim.gtk.avatar import AvatarSurfaceCache
+
+
+class FakeSurface:
+    def __init__(self, size: int) -> None:
+        self._size = size
+
+    def get_stride(self) -> int:
+        return self._size * 4
+
+    def get_height(self) -> int:
+        return self._size
+
+
+class Test(unittest.TestCase):
+    def test_lru_eviction(self):
+        # Room for four 32x32 surfaces
+        cache = AvatarSurfaceCache(max_bytes=4 * 32 * 32 * 4)
+
+        with patch('gajim.gtk.avatar.AVATAR_CACHE_PROTECT_SECONDS', 0):
+            for i in range(4):
+                cache.set((f'jid{i}', 32, 1, None, None), FakeSurface(32))
+
+            self.assertIsNotNone(cache.get(('jid0', 32, 1, None, None)))
+            cache.set(('jid4', 32, 1, None, None), FakeSurface(32))
+
+        self.assertIsNone(cache.get(('jid1', 32, 1, None, None)))
+        self.assertIsNotNone(cache.get(('jid0', 32, 1, None, None)))
+        self.assertEqual(cache.size, 4 * 32 * 32 * 4)
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(cache.misses, 1)
+
+    def test_largest_bucket_is_evicted_first(self):
+        cache = AvatarSurfaceCache(max_bytes=2 * 64 * 64 * 4)
+
+        with patch('gajim.gtk.avatar.AVATAR_CACHE_PROTECT_SECONDS', 0):
+            cache.set(('jid0', 16, 1, None, None), FakeSurface(16))
+            cache.set(('jid0', 64, 1, None, None), FakeSurface(64))
+            cache.set(('jid1', 64, 1, None, None), FakeSurface(64))
+
+        self.assertIsNotNone(cache.get(('jid0', 16, 1, None, None)))
+        self.assertIsNone(cache.get(('jid0', 64, 1, None, None)))
+        self.assertIsNotNone(cache.get(('jid1', 64, 1, None, None)))
+
+    def test_recently_used_surfaces_are_protected(self):
+        cache = AvatarSurfaceCache(max_bytes=2 * 32 * 32 * 4)
+        for i in range(3):
+            cache.set((f'jid{i}', 32, 1, None, None), FakeSurface(32))
+
+        # Only recently used surfaces are left, they are evicted as a
+        # last resort
+        self.assertEqual(cache.evictions, 1)
+        self.assertEqual(cache.size, 2 * 32 * 32 * 4)
+
+    def test_invalidate(self):
+        cache = AvatarSurfaceCache()
+        cache.set(('jid0', 32, 1, None, None), FakeSurface(32))
+        cache.set(('jid0', 32, 2, 'online', None), FakeSurface(64))
+        cache.set(('jid1', 32, 1, None, None), FakeSurface(32))
+
+        cache.invalidate('jid0')
+        self.assertIsNone(cache.get(('jid0', 32, 1, None, None)))
+        self.assertIsNone(cache.get(('jid0', 32, 2, 'online', None)))
+        self.assertEqual(cache.size, 32 * 32 * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
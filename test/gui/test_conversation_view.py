@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import cast
+
+import unittest
+from collections.abc import Callable
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from gajim.common.storage.archive.const import ChatDirection
+
+from gajim.gtk.conversation.row_index import RowIndex
+from gajim.gtk.conversation.view import ConversationView
+from gajim.gtk.conversation.view import MAX_ROW_COUNT
+
+ACCOUNT = 'testacc1'
+DAY = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ROW_HEIGHT = 10
+
+
+def get_timestamp(day: int, minute: int = 0) -> datetime:
+    # Messages are sent at noon, so their day does not depend on the
+    # local timezone the date rows are created in
+    return DAY + timedelta(days=day, hours=12, minutes=minute)
+
+
+class FakeListBox:
+    '''
+    Keeps rows sorted by timestamp, like the sort func of ConversationView
+    '''
+
+    def __init__(self) -> None:
+        self.rows: list[FakeRow] = []
+
+    def add(self, row: FakeRow) -> None:
+        index = len(self.rows)
+        while index > 0 and self.rows[index - 1].timestamp > row.timestamp:
+            index -= 1
+        self.rows.insert(index, row)
+        row.list_box = self
+
+    def get_children(self) -> list[FakeRow]:
+        return list(self.rows)
+
+    def get_row_at_index(self, index: int) -> FakeRow | None:
+        if 0 <= index < len(self.rows):
+            return self.rows[index]
+        return None
+
+    def destroy(self) -> None:
+        for row in self.get_children():
+            row.destroy()
+
+
+class FakeRow:
+    def __init__(self, timestamp: datetime) -> None:
+        self.timestamp = timestamp
+        self.direction = ChatDirection.INCOMING
+        self.pk: int | None = None
+        self.list_box: FakeListBox | None = None
+        self._destroy_handlers: list[Callable[[FakeRow], None]] = []
+
+    def connect(self,
+                signal_name: str,
+                handler: Callable[[FakeRow], None]
+                ) -> None:
+
+        assert signal_name == 'destroy'
+        self._destroy_handlers.append(handler)
+
+    def get_index(self) -> int:
+        assert self.list_box is not None
+        return self.list_box.rows.index(self)
+
+    def get_allocated_height(self) -> int:
+        return ROW_HEIGHT
+
+    def destroy(self) -> None:
+        assert self.list_box is not None
+        self.list_box.rows.remove(self)
+        for handler in self._destroy_handlers:
+            handler(self)
+
+
+class FakeDateRow(FakeRow):
+    def __init__(self, _account: str, timestamp: datetime) -> None:
+        FakeRow.__init__(self, timestamp)
+
+
+class FakeMessageRow(FakeRow):
+    def __init__(self, timestamp: datetime, text: str) -> None:
+        FakeRow.__init__(self, timestamp)
+        self.text = text
+        self.is_merged = False
+        self.stanza_id: str | None = None
+        self.orig_pk: int | None = None
+        self._message: Any = None
+
+    @classmethod
+    def from_db_row(cls, _contact: Any, message: Any) -> FakeMessageRow:
+        row = cls(message.timestamp, message.text)
+        row.direction = message.direction
+        row.stanza_id = message.stanza_id
+        row.orig_pk = message.pk
+        row._message = message
+        row.refresh()
+        return row
+
+    def refresh(self) -> None:
+        message = self._message
+        if message.corrections:
+            message = message.get_last_correction()
+        self.pk = message.pk
+        self.text = message.text
+
+    def set_merged(self, merged: bool) -> None:
+        self.is_merged = merged
+
+    def set_acknowledged(self, stanza_id: str | None) -> None:
+        self.stanza_id = stanza_id
+
+
+class FakeReadMarkerRow(FakeRow):
+    def hide(self) -> None:
+        pass
+
+    def set_last_incoming_timestamp(self, _timestamp: datetime) -> None:
+        pass
+
+
+class FakeScrollHintRow(FakeRow):
+    pass
+
+
+class FakeAdjustment:
+    def __init__(self, upper: float, value: float) -> None:
+        self.upper = upper
+        self.value = value
+
+    def get_upper(self) -> float:
+        return self.upper
+
+    def get_page_size(self) -> float:
+        return 100
+
+    def get_value(self) -> float:
+        return self.value
+
+    def set_value(self, value: float) -> None:
+        self.value = value
+
+
+def create_message(pk: int,
+                   timestamp: datetime,
+                   stanza_id: str | None = None,
+                   corrections: list[Any] | None = None
+                   ) -> Any:
+
+    corrections = corrections or []
+    return SimpleNamespace(
+        pk=pk,
+        id=f'id{pk}',
+        stanza_id=stanza_id,
+        timestamp=timestamp,
+        direction=ChatDirection.INCOMING,
+        text=f'message{pk}',
+        correction_id=None,
+        corrections=corrections,
+        markers=[],
+        get_last_correction=lambda: corrections[-1])
+
+
+class FakeView:
+    '''
+    Holds the state the row handling of ConversationView works on, without
+    the need for a realized ConversationView. Rows are added through the
+    methods of ConversationView, merging is left out.
+    '''
+
+    def __init__(self) -> None:
+        self.contact = SimpleNamespace(account=ACCOUNT)
+        self._list_box = FakeListBox()
+        self._max_row_count = MAX_ROW_COUNT
+        self._active_date_rows: set[datetime] = set()
+        self._row_index: RowIndex[Any] = RowIndex()
+        self._read_marker_row: FakeReadMarkerRow | None = None
+        self._scroll_hint_row: FakeScrollHintRow | None = None
+        self._trimmed_above = 0
+        self._trimmed_below = 0
+        self._current_upper: float = 0
+        self._autoscroll = False
+        self._request_history_at_upper: float | None = None
+        self._upper_complete = False
+        self._lower_complete = True
+        self._requesting: str | None = None
+        self._request_finished = False
+        self._block_signals = False
+        self.history_complete: list[tuple[bool, bool]] = []
+
+    def set_history_complete(self, before: bool, complete: bool) -> None:
+        self.history_complete.append((before, complete))
+
+    def set_kinetic_scrolling(self, _enabled: bool) -> None:
+        pass
+
+    def _emit(self, *_args: Any) -> None:
+        pass
+
+    def _check_for_merge(self, _message: Any) -> None:
+        pass
+
+    def _reset_list_box(self) -> None:
+        self._list_box.destroy()
+        self._list_box = FakeListBox()
+
+    def add_day(self, day: int, count: int) -> None:
+        timestamp = DAY + timedelta(days=day)
+        self._list_box.add(FakeDateRow(ACCOUNT, timestamp))
+        self._active_date_rows.add(timestamp)
+
+        for i in range(count):
+            row = FakeMessageRow(get_timestamp(day, i), f'{day}-{i}')
+            self._list_box.add(row)
+            # Consecutive messages of a day are merged with the first one
+            row.set_merged(i != 0)
+
+    def add_read_marker(self, timestamp: datetime) -> None:
+        self._read_marker_row = FakeReadMarkerRow(timestamp)
+        self._list_box.add(self._read_marker_row)
+
+    @property
+    def rows(self) -> list[FakeRow]:
+        return self._list_box.rows
+
+    @property
+    def active_date_rows(self) -> set[datetime]:
+        return self._active_date_rows
+
+    @property
+    def trimmed(self) -> tuple[int, int]:
+        return self._trimmed_above, self._trimmed_below
+
+    def get_texts(self) -> list[str]:
+        return [row.text for row in self.rows
+                if isinstance(row, FakeMessageRow)]
+
+    def _insert_message(self, message: Any) -> None:
+        ConversationView._insert_message(cast(Any, self), message)
+
+    def _index_row(self, row: Any) -> None:
+        ConversationView._index_row(cast(Any, self), row)
+
+    def _on_row_destroy(self, row: Any) -> None:
+        ConversationView._on_row_destroy(cast(Any, self), row)
+
+    def _add_date_row(self, timestamp: datetime) -> None:
+        ConversationView._add_date_row(cast(Any, self), timestamp)
+
+    def _get_row_by_message_id(self, id_: str) -> Any:
+        return ConversationView._get_row_by_message_id(cast(Any, self), id_)
+
+    def get_row_by_pk(self, pk: int) -> Any:
+        return ConversationView.get_row_by_pk(cast(Any, self), pk)
+
+    def add_message_from_db(self, message: Any) -> None:
+        ConversationView.add_message_from_db(cast(Any, self), message)
+
+    def correct_message(self, message: Any) -> None:
+        ConversationView.correct_message(cast(Any, self), message)
+
+    def acknowledge_message(self, pk: int, stanza_id: str) -> None:
+        ConversationView.acknowledge_message(
+            cast(Any, self), cast(Any, SimpleNamespace(pk=pk,
+                                                       stanza_id=stanza_id)))
+
+    def remove_message(self, pk: int) -> None:
+        ConversationView.remove_message(cast(Any, self), pk)
+
+    def reset(self) -> None:
+        ConversationView._reset(cast(Any, self))
+
+    def reduce_message_count(self, before: bool) -> bool:
+        return ConversationView.reduce_message_count(cast(Any, self), before)
+
+    def finish_history_request(self, rows_added: bool) -> None:
+        ConversationView.finish_history_request(cast(Any, self), rows_added)
+
+    def change_upper(self, upper: float) -> float:
+        '''
+        Returns the scroll position after upper changed from 1000 to upper,
+        the position was 600 before
+        '''
+
+        self._current_upper = 1000
+
+        adj = FakeAdjustment(upper=upper, value=600)
+        ConversationView._on_adj_upper_changed(  # pyright: ignore
+            cast(Any, self), cast(Any, adj), cast(Any, None))
+
+        assert self.trimmed == (0, 0)
+        assert self._current_upper == upper
+        return adj.value
+
+    def upper_changed(self,
+                      requesting: str,
+                      upper: float,
+                      trimmed_above: int = 0,
+                      trimmed_below: int = 0
+                      ) -> float:
+        '''
+        Like change_upper(), for the upper change of the rows of a finished
+        history request
+        '''
+
+        self._requesting = requesting
+        self._trimmed_above = trimmed_above
+        self._trimmed_below = trimmed_below
+        self.finish_history_request(True)
+
+        value = self.change_upper(upper)
+        assert self._requesting is None
+        return value
+
+
+class ConversationViewTest(unittest.TestCase):
+    def setUp(self) -> None:
+        patcher = patch.multiple('gajim.gtk.conversation.view',
+                                 DateRow=FakeDateRow,
+                                 MessageRow=FakeMessageRow,
+                                 ReadMarkerRow=FakeReadMarkerRow,
+                                 ScrollHintRow=FakeScrollHintRow)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self._view = FakeView()
+
+    def test_nothing_to_trim(self) -> None:
+        self._view.add_day(0, MAX_ROW_COUNT - 1)
+        self.assertFalse(self._view.reduce_message_count(True))
+        self.assertEqual(len(self._view.get_texts()), MAX_ROW_COUNT - 1)
+        self.assertEqual(self._view.history_complete, [])
+
+    def test_trim_above(self) -> None:
+        self._view.add_day(0, 5)
+        self._view.add_read_marker(get_timestamp(0, 30))
+        self._view.add_day(1, MAX_ROW_COUNT)
+
+        # 2 date rows and 205 messages, 7 messages are removed from the
+        # top, which leaves the first day without messages
+        self.assertTrue(self._view.reduce_message_count(True))
+
+        texts = self._view.get_texts()
+        self.assertEqual(len(texts), MAX_ROW_COUNT - 2)
+        self.assertEqual(texts[0], '1-2')
+        self.assertEqual(texts[-1], f'1-{MAX_ROW_COUNT - 1}')
+
+        rows = self._view.rows
+        self.assertIsInstance(rows[0], FakeReadMarkerRow)
+        self.assertIsInstance(rows[1], FakeDateRow)
+        self.assertEqual(self._view.active_date_rows, {DAY + timedelta(days=1)})
+
+        # The new first message lost its ancestor
+        self.assertFalse(cast(FakeMessageRow, rows[2]).is_merged)
+        self.assertTrue(cast(FakeMessageRow, rows[3]).is_merged)
+
+        # 7 messages and one date row
+        self.assertEqual(self._view.trimmed, (8 * ROW_HEIGHT, 0))
+        self.assertEqual(self._view.history_complete, [(True, False)])
+
+    def test_trim_below(self) -> None:
+        self._view.add_day(0, MAX_ROW_COUNT - 4)
+        self._view.add_day(1, 3)
+        self._view.add_day(2, 2)
+
+        # 3 date rows and 201 messages, 4 messages are removed from the
+        # bottom, which leaves the last day without messages
+        self.assertTrue(self._view.reduce_message_count(False))
+
+        texts = self._view.get_texts()
+        self.assertEqual(texts[0], '0-0')
+        self.assertEqual(texts[-1], '1-0')
+        self.assertIsInstance(self._view.rows[-1], FakeMessageRow)
+        self.assertEqual(self._view.active_date_rows,
+                         {DAY, DAY + timedelta(days=1)})
+
+        # 4 messages and one date row
+        self.assertEqual(self._view.trimmed, (0, 5 * ROW_HEIGHT))
+        self.assertEqual(self._view.history_complete, [(False, False)])
+
+    def test_scroll_correction(self) -> None:
+        # Rows added below have the same height as the rows trimmed above
+        self.assertEqual(
+            self._view.upper_changed('after', 1000, trimmed_above=50), 550)
+
+        # Rows added above have the same height as the rows trimmed below
+        self.assertEqual(
+            self._view.upper_changed('before', 1000, trimmed_below=50), 650)
+
+        self.assertEqual(
+            self._view.upper_changed('before', 1200, trimmed_below=50), 850)
+        self.assertEqual(self._view.upper_changed('before', 1200), 800)
+        self.assertEqual(self._view.upper_changed('after', 1200), 600)
+
+    def test_upper_change_during_request(self) -> None:
+        self._view._requesting = 'before'
+
+        # A resized preview does not end the pending request
+        self.assertEqual(self._view.change_upper(1050), 650)
+        self.assertEqual(self._view._requesting, 'before')
+
+        # The requested rows are added above and keep the position
+        self._view.finish_history_request(True)
+        self.assertEqual(self._view.change_upper(1200), 800)
+        self.assertIsNone(self._view._requesting)
+
+        # A request without rows ends right away
+        self._view._requesting = 'before'
+        self._view.finish_history_request(False)
+        self.assertIsNone(self._view._requesting)
+
+    def _assert_index_consistent(self) -> None:
+        rows = self._view._list_box.get_children()
+        message_rows = [row for row in rows
+                        if isinstance(row, FakeMessageRow)]
+
+        # Only rows shown in the list box are indexed
+        index = self._view._row_index
+        self.assertEqual(len(index), len(message_rows))
+        for row in message_rows:
+            self.assertIn(row, index)
+            self.assertIs(index.get_by_pk(cast(int, row.pk)), row)
+            self.assertIs(index.get_by_pk(cast(int, row.orig_pk)), row)
+            self.assertIs(index.get_by_message_id(f'id{row.orig_pk}'), row)
+            if row.stanza_id is not None:
+                self.assertIs(index.get_by_stanza_id(row.stanza_id), row)
+
+    def test_row_index(self) -> None:
+        index = self._view._row_index
+        self._view.add_read_marker(DAY)
+
+        # 30 messages on 3 days, the last one is not acknowledged yet
+        messages = [create_message(pk,
+                                   get_timestamp(pk // 10, pk % 10),
+                                   stanza_id=f'stanzaid{pk}')
+                    for pk in range(30)]
+        messages[-1].stanza_id = None
+        for message in messages:
+            self._view.add_message_from_db(message)
+        self._assert_index_consistent()
+
+        self._view.acknowledge_message(29, 'stanzaid29')
+        self.assertIs(index.get_by_stanza_id('stanzaid29'),
+                      self._view.get_row_by_pk(29))
+        self._assert_index_consistent()
+
+        # The corrected row is found by the pks and ids of both messages
+        row = self._view.get_row_by_pk(4)
+        correction = create_message(100, messages[4].timestamp)
+        correction.correction_id = 'id4'
+        messages[4].corrections.append(correction)
+        self._view.correct_message(correction)
+        self.assertEqual(cast(FakeMessageRow, row).text, 'message100')
+        self.assertIs(self._view.get_row_by_pk(100), row)
+        self.assertIs(index.get_by_message_id('id100'), row)
+        self._assert_index_consistent()
+
+        self._view.remove_message(3)
+        self.assertIsNone(self._view.get_row_by_pk(3))
+        self.assertIsNone(index.get_by_stanza_id('stanzaid3'))
+        self._assert_index_consistent()
+
+        # Trimming removes the corrected row with all its keys
+        self._view._max_row_count = 20
+        self.assertTrue(self._view.reduce_message_count(True))
+        self.assertIsNone(self._view.get_row_by_pk(4))
+        self.assertIsNone(self._view.get_row_by_pk(100))
+        self.assertIsNone(index.get_by_message_id('id100'))
+        self.assertIs(index.get_by_stanza_id('stanzaid29'),
+                      self._view.get_row_by_pk(29))
+        self._assert_index_consistent()
+
+        self._view.reset()
+        self.assertEqual(self._view._list_box.get_children(), [])
+        self.assertEqual(len(index), 0)
+        self.assertIsNone(self._view.get_row_by_pk(29))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from gajim.gtk.emoji_data_gtk import EmojiIndex
+from gajim.gtk.emoji_data_gtk import load_cached_emoji_data
+from gajim.gtk.emoji_data_gtk import store_cached_emoji_data
+
+EMOJI_DATA = {
+    'cat': {'cat': '🐈', 'cat face': '🐱'},
+    'cat face': {'cat face': '🐱'},
+    'face': {'cat face': '🐱', 'grinning face': '😀'},
+    'grinning face': {'grinning face': '😀'},
+    'grinning': {'grinning face': '😀'},
+    'thumbs up': {'thumbs up': '👍'},
+    'thumbs up, dark skin tone': {'thumbs up, dark skin tone': '👍🏿'},
+    'thumbs up, light skin tone': {'thumbs up, light skin tone': '👍🏻'},
+    'yes': {'thumbs up': '👍'},
+}
+
+
+class EmojiIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._index = EmojiIndex(EMOJI_DATA)
+
+    def test_short_names_first(self) -> None:
+        self.assertEqual(self._index.search('cat', 6), [
+            ('🐈', '🐈 cat'),
+            ('🐱', '🐱 cat face'),
+        ])
+        self.assertEqual(self._index.search('grin', 6), [
+            ('😀', '😀 grinning face'),
+        ])
+
+    def test_keyword_matches(self) -> None:
+        self.assertEqual(self._index.search('fa', 6), [
+            ('🐱', '🐱 cat face  [face]'),
+            ('😀', '😀 grinning face  [face]'),
+        ])
+        self.assertEqual(self._index.search('ye', 6), [
+            ('👍', '👍 thumbs up  [yes]'),
+        ])
+
+    def test_limit(self) -> None:
+        self.assertEqual(self._index.search('thumbs', 2), [
+            ('👍', '👍 thumbs up'),
+            ('👍🏿', '👍🏿 thumbs up, dark skin tone'),
+        ])
+        self.assertEqual(len(self._index.search('', 6)), 6)
+
+    def test_no_match(self) -> None:
+        self.assertEqual(self._index.search('zebra', 6), [])
+        self.assertEqual(self._index.search('thumbs upx', 6), [])
+
+    def test_cache(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / 'emoji_data_en.json'
+            self.assertIsNone(load_cached_emoji_data(path, '1:en:abc'))
+
+            store_cached_emoji_data(path, '1:en:abc', EMOJI_DATA)
+            self.assertEqual(
+                load_cached_emoji_data(path, '1:en:abc'), EMOJI_DATA)
+            self.assertIsNone(load_cached_emoji_data(path, '1:de:abc'))
+
+            path.write_text('{', encoding='utf-8')
+            self.assertIsNone(load_cached_emoji_data(path, '1:en:abc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
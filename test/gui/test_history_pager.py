@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Any
+from typing import cast
+
+import unittest
+from collections.abc import Sequence
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from nbxmpp.protocol import JID
+
+from gajim.common import app
+from gajim.common import configpaths
+from gajim.common.events import MessageReceived
+from gajim.common.settings import Settings
+from gajim.common.storage.archive.const import ChatDirection
+from gajim.common.storage.archive.const import MessageState
+from gajim.common.storage.archive.const import MessageType
+from gajim.common.storage.archive.models import Message
+from gajim.common.storage.archive.storage import MessageArchiveStorage
+
+from gajim.gtk.conversation.pager import HistoryCursor
+from gajim.gtk.conversation.pager import HistoryPager
+
+configpaths.init()
+
+ACCOUNT = 'testacc1'
+REMOTE_JID = JID.from_string('remote@jid.org')
+
+
+class HistoryPagerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        app.settings = Settings(in_memory=True)
+        app.settings.init()
+        app.settings.add_account(ACCOUNT)
+        app.settings.set_account_setting(ACCOUNT, 'name', 'user')
+        app.settings.set_account_setting(ACCOUNT, 'hostname', 'domain.org')
+
+        app.storage.archive = MessageArchiveStorage(in_memory=True)
+        app.storage.archive.init()
+
+        # Every message has the same timestamp, only the pk orders them
+        timestamp = datetime.now(timezone.utc) - timedelta(minutes=1)
+        for i in range(25):
+            app.storage.archive.insert_object(Message(
+                account_=ACCOUNT,
+                remote_jid_=REMOTE_JID,
+                resource='res',
+                type=MessageType.CHAT,
+                direction=ChatDirection.INCOMING,
+                timestamp=timestamp,
+                state=MessageState.ACKNOWLEDGED,
+                id=f'messageid{i}',
+                text='message'))
+
+        self._contact = cast(Any, SimpleNamespace(account=ACCOUNT,
+                                                  jid=REMOTE_JID))
+        self._pager = HistoryPager(10)
+
+    def tearDown(self) -> None:
+        self._pager.unregister_events()
+
+    def _request(self, cursor: HistoryCursor | None) -> Sequence[Message]:
+        pages: list[Sequence[Message]] = []
+        self._pager.request(self._contact, True, cursor, pages.append)
+        self.assertEqual(len(pages), 1)
+        return pages[0]
+
+    def test_paging_with_prefetch(self) -> None:
+        ids: list[str] = []
+        cursor = None
+        with patch.object(app.storage.archive,
+                          'get_conversation_before_after',
+                          wraps=app.storage.archive.get_conversation_before_after
+                          ) as query:
+            while True:
+                page = self._request(cursor)
+                ids.extend(message.id for message in page)
+                if len(page) < 10:
+                    break
+                cursor = HistoryCursor(page[-1].timestamp, page[-1].pk)
+
+            # Latest page, two prefetched pages, no extra query
+            self.assertEqual(query.call_count, 3)
+
+        self.assertEqual(ids, [f'messageid{i}' for i in range(24, -1, -1)])
+
+    def test_latest_page_cache(self) -> None:
+        page = self._request(None)
+        with patch.object(app.storage.archive,
+                          'get_conversation_before_after') as query:
+            self.assertIs(self._request(None), page)
+            query.assert_not_called()
+
+    def test_invalidate_on_event(self) -> None:
+        page = self._request(None)
+        app.ged.raise_event(MessageReceived(account=ACCOUNT,
+                                            jid=REMOTE_JID,
+                                            m_type=MessageType.CHAT,
+                                            from_mam=False,
+                                            pk=1))
+        self.assertIsNot(self._request(None), page)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import unittest
+from dataclasses import dataclass
+from dataclasses import field
+
+from gajim.gtk.conversation.row_index import RowIndex
+
+
+@dataclass(eq=False)
+class FakeRow:
+    pk: int | None
+    stanza_id: str | None = None
+    message_ids: list[str] = field(default_factory=list)
+
+
+class RowIndexTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._index: RowIndex[FakeRow] = RowIndex()
+        self._rows: list[FakeRow] = []
+
+    def _add(self, row: FakeRow) -> None:
+        self._rows.append(row)
+        self._index.add_pk(row, row.pk)
+        self._index.add_stanza_id(row, row.stanza_id)
+        for message_id in row.message_ids:
+            self._index.add_message_id(row, message_id)
+
+    def _remove(self, row: FakeRow) -> None:
+        self._rows.remove(row)
+        self._index.remove(row)
+
+    def _assert_consistent(self) -> None:
+        # Every lookup must return what a scan of the rows would return
+        self.assertEqual(len(self._index), len(
+            [row for row in self._rows
+             if row.pk is not None or row.stanza_id or row.message_ids]))
+
+        for pk in range(100):
+            expected = next(
+                (row for row in self._rows if row.pk == pk), None)
+            self.assertIs(self._index.get_by_pk(pk), expected)
+
+        for row in self._rows:
+            if row.stanza_id is not None:
+                self.assertIs(self._index.get_by_stanza_id(row.stanza_id), row)
+            for message_id in row.message_ids:
+                self.assertIs(self._index.get_by_message_id(message_id), row)
+
+    def test_add_and_remove(self) -> None:
+        for pk in range(50):
+            self._add(FakeRow(pk, f'stanza-{pk}', [f'id-{pk}']))
+        self._add(FakeRow(None))
+        self._assert_consistent()
+
+        for row in list(self._rows[:20]):
+            self._remove(row)
+        self._assert_consistent()
+        self.assertIsNone(self._index.get_by_stanza_id('stanza-0'))
+        self.assertIsNone(self._index.get_by_message_id('id-19'))
+
+        for row in list(self._rows[-10:]):
+            self._remove(row)
+        self._assert_consistent()
+
+    def test_update_keys(self) -> None:
+        row = FakeRow(1, None, ['id-1'])
+        self._add(row)
+
+        # Acknowledgement and correction add keys to an existing row
+        row.stanza_id = 'stanza-1'
+        self._index.add_stanza_id(row, row.stanza_id)
+        row.pk = 2
+        self._index.add_pk(row, row.pk)
+        row.message_ids.append('id-2')
+        self._index.add_message_id(row, 'id-2')
+
+        self.assertIs(self._index.get_by_pk(1), row)
+        self.assertIs(self._index.get_by_pk(2), row)
+        self.assertIs(self._index.get_by_stanza_id('stanza-1'), row)
+        self.assertIs(self._index.get_by_message_id('id-2'), row)
+
+        self._remove(row)
+        self.assertEqual(len(self._index), 0)
+        self.assertIsNone(self._index.get_by_pk(1))
+        self.assertIsNone(self._index.get_by_pk(2))
+        self.assertIsNone(self._index.get_by_message_id('id-1'))
+
+    def test_key_taken_over(self) -> None:
+        old_row = FakeRow(1, 'stanza-1')
+        self._add(old_row)
+        new_row = FakeRow(2, 'stanza-1')
+        self._add(new_row)
+
+        self._remove(old_row)
+        self.assertIs(self._index.get_by_stanza_id('stanza-1'), new_row)
+        self._assert_consistent()
+
+    def test_clear(self) -> None:
+        for pk in range(10):
+            self._add(FakeRow(pk, f'stanza-{pk}'))
+
+        self._index.clear()
+        self._rows.clear()
+        self.assertNotIn(FakeRow(1), self._index)
+        self._assert_consistent()
+
+
+if __name__ == '__main__':
+    unittest.main()